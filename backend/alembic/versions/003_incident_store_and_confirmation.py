@@ -0,0 +1,29 @@
+"""Add store_id and confirmed_at to incidents
+
+Revision ID: 003_incident_store_and_confirmation
+Revises: 002_add_users_table
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003_incident_store_and_confirmation'
+down_revision = '002_add_users_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('incidents', sa.Column('store_id', sa.String(), nullable=True))
+    op.add_column('incidents', sa.Column('confirmed_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_incidents_store_id'), 'incidents', ['store_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_incidents_store_id'), table_name='incidents')
+    with op.batch_alter_table('incidents') as batch_op:
+        batch_op.drop_column('confirmed_at')
+        batch_op.drop_column('store_id')
@@ -0,0 +1,39 @@
+"""Store detection boxes as numeric columns
+
+Revision ID: 004_detection_box_columns
+Revises: 003_incident_store_and_confirmation
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_detection_box_columns'
+down_revision = '003_incident_store_and_confirmation'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # La tabla no tenía escritores: se reemplaza el JSON sin migrar datos
+    with op.batch_alter_table('detections') as batch_op:
+        batch_op.drop_column('box_coordinates')
+        batch_op.add_column(sa.Column('x1', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('y1', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('x2', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('y2', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('track_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('zone', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('detections') as batch_op:
+        batch_op.drop_column('zone')
+        batch_op.drop_column('track_id')
+        batch_op.drop_column('y2')
+        batch_op.drop_column('x2')
+        batch_op.drop_column('y1')
+        batch_op.drop_column('x1')
+        batch_op.add_column(sa.Column('box_coordinates', sa.Text(), nullable=True))
@@ -0,0 +1,29 @@
+"""Composite indexes for incident listings, plus resolved_at
+
+Revision ID: 005_incident_listing_indexes
+Revises: 004_detection_box_columns
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_incident_listing_indexes'
+down_revision = '004_detection_box_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('incidents', sa.Column('resolved_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_incidents_camera_timestamp', 'incidents', ['camera_id', 'timestamp'], unique=False)
+    op.create_index('ix_incidents_status_risk_timestamp', 'incidents', ['status', 'risk_level', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_incidents_status_risk_timestamp', table_name='incidents')
+    op.drop_index('ix_incidents_camera_timestamp', table_name='incidents')
+    with op.batch_alter_table('incidents') as batch_op:
+        batch_op.drop_column('resolved_at')
@@ -0,0 +1,68 @@
+"""Minute, hour and day rollups per camera and zone for analytics
+
+Revision ID: 006_analytics_rollups
+Revises: 005_incident_listing_indexes
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_analytics_rollups'
+down_revision = '005_incident_listing_indexes'
+branch_labels = None
+depends_on = None
+
+TABLES = {'minute': 'rollups_minute', 'hour': 'rollups_hour', 'day': 'rollups_day'}
+# Mismo formato de texto que SQLAlchemy usa para DateTime en SQLite
+SQLITE_FORMATS = {'minute': '%Y-%m-%d %H:%M:00.000000', 'hour': '%Y-%m-%d %H:00:00.000000', 'day': '%Y-%m-%d 00:00:00.000000'}
+
+
+def _backfill(table: str, granularity: str) -> None:
+    """Rollups of the rows already in detections and incidents"""
+    if op.get_bind().dialect.name == 'postgresql':
+        bucket = f"date_trunc('{granularity}', timestamp)"
+        incident_zone = "coalesce(detection_data::json->>'zone', '')"
+    else:
+        bucket = f"strftime('{SQLITE_FORMATS[granularity]}', timestamp)"
+        incident_zone = "coalesce(json_extract(detection_data, '$.zone'), '')"
+    levels = ('low', 'medium', 'high', 'critical')
+    incident_counters = ', '.join(f"CASE WHEN risk_level = '{level}' THEN 1 ELSE 0 END" for level in levels)
+    op.execute(f"""
+        INSERT INTO {table} (bucket_start, camera_id, zone, detections, {', '.join(f'incidents_{level}' for level in levels)})
+        SELECT bucket_start, camera_id, zone, sum(d), {', '.join(f'sum(i_{level})' for level in levels)}
+        FROM (
+            SELECT {bucket} AS bucket_start, camera_id, coalesce(zone, '') AS zone, 1 AS d,
+                   {', '.join(f'0 AS i_{level}' for level in levels)}
+            FROM detections
+            UNION ALL
+            SELECT {bucket}, camera_id, {incident_zone}, 0, {incident_counters}
+            FROM incidents
+            WHERE risk_level IN ({', '.join(f"'{level}'" for level in levels)})
+        ) AS counted
+        GROUP BY bucket_start, camera_id, zone
+    """)
+
+
+def upgrade() -> None:
+    for granularity, table in TABLES.items():
+        op.create_table(
+            table,
+            sa.Column('bucket_start', sa.DateTime(), nullable=False),
+            sa.Column('camera_id', sa.String(), nullable=False),
+            sa.Column('zone', sa.String(), nullable=False),
+            sa.Column('detections', sa.Integer(), nullable=False),
+            sa.Column('incidents_low', sa.Integer(), nullable=False),
+            sa.Column('incidents_medium', sa.Integer(), nullable=False),
+            sa.Column('incidents_high', sa.Integer(), nullable=False),
+            sa.Column('incidents_critical', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('bucket_start', 'camera_id', 'zone')
+        )
+        _backfill(table, granularity)
+
+
+def downgrade() -> None:
+    for table in TABLES.values():
+        op.drop_table(table)
@@ -1,7 +1,8 @@
 """Analytics and ROI Dashboard Endpoints"""
+import logging
 from fastapi import APIRouter, Query
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Dict, Optional
 from app.schemas import (
     ROIMetricsResponse,
     DetectionMetricsResponse,
@@ -12,16 +13,113 @@ from app.schemas import (
     RiskPattern,
     OperationalSuggestion
 )
-from app.utils.helpers import calculate_roi, calculate_detection_metrics
+from app.config import settings
+from app.utils.helpers import calculate_roi, calculate_detection_metrics, camera_resolution
 from app.data import generate_analytics_data
+from app.api.routes.incidents import incident_logger
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+RISK_LEVELS = ("critical", "high", "medium", "low")
+
+
+def _incident_total(counters: Dict[str, int]) -> int:
+    return sum(counters[f"incidents_{level}"] for level in RISK_LEVELS)
+
+
+async def _from_rollups(query):
+    """
+    Run query(session, rollups) against the rollup tables
+
+    Returns:
+        Its result, or None without persistence or if the query fails (the
+        endpoints then fall back to their previous data)
+    """
+    if not incident_logger.persistent:
+        return None
+    from app.database.database import AsyncSessionLocal
+    from app.services import rollups
+
+    try:
+        async with AsyncSessionLocal() as session:
+            return await query(session, rollups)
+    except Exception as e:
+        logger.warning(f"Rollups no disponibles, usando datos de respaldo: {e}")
+        return None
+
+
+async def _dashboard(days: int):
+    async def query(session, rollups):
+        now = datetime.utcnow()
+        start = now - timedelta(days=days)
+        by_zone = await rollups.totals(session, start, now, by=("zone",))
+        if not by_zone:
+            return None
+        previous = await rollups.totals(session, start - timedelta(days=days), start, by=("zone",))
+        hourly = await rollups.series(session, now - timedelta(hours=23), now, "hour")
+        today = await rollups.totals(session, rollups.truncate(now, "day"), now, by=("camera_id",))
+        return now, by_zone, previous, hourly, today
+
+    result = await _from_rollups(query)
+    if result is None:
+        return None
+    now, by_zone, previous, hourly, today = result
+
+    # Lo que los rollups no cubren (uptime, almacenamiento) sigue saliendo de los datos de ejemplo
+    data = generate_analytics_data()
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+    hourly_detections = []
+    for i in range(24):
+        bucket = current_hour - timedelta(hours=i)
+        counters = hourly.get(bucket)
+        hourly_detections.append({
+            "hour": bucket.strftime("%H:00"),
+            "detections": counters["detections"] if counters else 0,
+            "incidents": _incident_total(counters) if counters else 0
+        })
+
+    zone_detections = []
+    for (zone,), counters in sorted(by_zone.items(), key=lambda item: item[1]["detections"], reverse=True):
+        if not zone:
+            continue
+        before = previous.get((zone,), {}).get("detections", 0)
+        zone_detections.append({
+            "zone": zone,
+            "detections": counters["detections"],
+            "risk_level": next((level for level in RISK_LEVELS if counters[f"incidents_{level}"]), "low"),
+            "trend": f"{(counters['detections'] - before) / before * 100:+.0f}%" if before else "n/d"
+        })
+
+    window_detections = sum(counters["detections"] for counters in by_zone.values())
+    for camera in data["camera_stats"]:
+        counters = today.get((camera["camera_id"],))
+        camera["detections_today"] = counters["detections"] if counters else 0
+        camera["incidents_today"] = _incident_total(counters) if counters else 0
+
+    data["summary"].update({
+        "total_detections_24h": sum(h["detections"] for h in hourly_detections),
+        "total_incidents_24h": sum(h["incidents"] for h in hourly_detections),
+        "period_days": days,
+        "total_detections": window_detections,
+        "total_incidents": sum(_incident_total(counters) for counters in by_zone.values())
+    })
+    data["hourly_detections"] = hourly_detections
+    data["zone_detections"] = zone_detections
+    # El detector solo reporta personas
+    data["object_detections"] = [{"class": "person", "count": window_detections, "percentage": 100.0}] if window_detections else []
+    data["alerts"] = {
+        level: sum(counters[f"incidents_{level}"] for counters in by_zone.values())
+        for level in RISK_LEVELS
+    }
+    return data
+
 
 @router.get("/analytics/dashboard")
-async def get_analytics_dashboard():
+async def get_analytics_dashboard(days: int = Query(1, ge=1, le=365)):
     """Obtener datos completos del dashboard de analíticas"""
-    return generate_analytics_data()
+    return await _dashboard(days) or generate_analytics_data()
 
 
 @router.get("/analytics/roi", response_model=ROIMetricsResponse)
@@ -53,14 +151,41 @@ async def get_roi_metrics(
 @router.get("/analytics/heatmap", response_model=HeatmapResponse)
 async def get_heatmap_data(
     camera_id: str = Query(...),
-    days: int = Query(7, ge=1, le=90)
+    days: int = Query(7, ge=1, le=365)
 ):
     """Get hotspot detection heatmap data"""
-    high_risk_zones = [
-        HotZone(x=100, y=150, intensity=0.9, zone_name="Entrance"),
-        HotZone(x=250, y=300, intensity=0.7, zone_name="Parking"),
-        HotZone(x=400, y=200, intensity=0.5, zone_name="Storage"),
-    ]
+    from app.services.zone_mapper import zone_registry, zone_statistics
+    
+    zone_map = zone_registry.get(camera_id, *camera_resolution(camera_id))
+    
+    if zone_map is not None:
+        # Intensidad = detecciones del periodo (cajas x frames, proporcional a la
+        # permanencia) relativas a la zona más concurrida
+        async def query(session, rollups):
+            now = datetime.utcnow()
+            return await rollups.totals(session, now - timedelta(days=days), now, by=("zone",), camera_id=camera_id)
+
+        by_zone = await _from_rollups(query) or {}
+        weights = {zone: counters["detections"] for (zone,), counters in by_zone.items()}
+        if not any(weights.values()):
+            # Sin detecciones persistidas: permanencia acumulada desde el arranque
+            weights = {name: z["dwell_seconds"] for name, z in zone_statistics.camera_summary(camera_id).items()}
+        max_weight = max(weights.values(), default=0)
+        high_risk_zones = [
+            HotZone(
+                x=round(x, 1),
+                y=round(y, 1),
+                intensity=round(weights.get(name, 0) / max_weight, 3) if max_weight else 0.0,
+                zone_name=name
+            )
+            for name, (x, y) in zone_map.centroids().items()
+        ]
+    else:
+        high_risk_zones = [
+            HotZone(x=100, y=150, intensity=0.9, zone_name="Entrance"),
+            HotZone(x=250, y=300, intensity=0.7, zone_name="Parking"),
+            HotZone(x=400, y=200, intensity=0.5, zone_name="Storage"),
+        ]
     
     return HeatmapResponse(
         camera_id=camera_id,
@@ -103,18 +228,56 @@ async def get_risk_patterns(
     days: int = Query(30, ge=1, le=365)
 ):
     """Identify risk patterns and trends"""
-    pattern = RiskPattern(
-        peak_risk_hours=["20:00-22:00", "02:00-04:00"],
-        risk_by_zone={
+    from app.services.zone_mapper import zone_statistics
+    
+    async def query(session, rollups):
+        from sqlalchemy import select
+        from app.database.models import Camera
+        
+        # Solo las cámaras registradas de la tienda
+        cameras = (await session.execute(select(Camera.id).where(Camera.store_id == store_id))).scalars().all()
+        now = datetime.utcnow()
+        start = now - timedelta(days=days)
+        by_zone = await rollups.totals(session, start, now, by=("zone",), camera_ids=cameras)
+        hourly = await rollups.series(session, start, now, "hour", camera_ids=cameras)
+        return cameras, by_zone, rollups.by_local_hour(hourly, settings.store_timezone)
+
+    # Sin consulta (sin persistencia o con error) no se sabe qué cámaras son de la tienda
+    cameras, by_zone, by_hour = await _from_rollups(query) or ([], {}, {})
+    weights = {zone: counters["detections"] for (zone,), counters in by_zone.items() if zone}
+    if not any(weights.values()):
+        # Permanencia en vivo, solo de las cámaras de esta tienda
+        weights = zone_statistics.dwell_by_zone(set(cameras))
+    
+    total_weight = sum(weights.values())
+    if total_weight > 0:
+        risk_by_zone = {zone: round(weight / total_weight, 3) for zone, weight in weights.items()}
+    else:
+        risk_by_zone = {
             "entrance": 0.45,
             "storage": 0.65,
             "parking": 0.80,
             "checkout": 0.30
-        },
+        }
+    
+    # Perfil por hora local del día: incidentes, o detecciones si no hubo incidentes
+    incident_profile = {hour: _incident_total(counters) for hour, counters in by_hour.items()}
+    detection_profile = {hour: counters["detections"] for hour, counters in by_hour.items()}
+    profile = incident_profile if any(incident_profile.values()) else detection_profile
+    peak_hours = [
+        f"{hour:02d}:00-{(hour + 1) % 24:02d}:00"
+        for hour in sorted(profile, key=profile.get, reverse=True)[:2]
+    ] or ["20:00-22:00", "02:00-04:00"]
+    top_zone = max(risk_by_zone, key=risk_by_zone.get)
+    
+    pattern = RiskPattern(
+        peak_risk_hours=peak_hours,
+        timezone=settings.store_timezone,
+        risk_by_zone=risk_by_zone,
         equipment_concerns=["loitering", "theft_attempts", "suspicious_vehicles"],
         recommendations=[
-            "Increase security during 20:00-22:00 hours",
-            "Focus on parking area monitoring",
+            f"Increase security during {peak_hours[0]} hours",
+            f"Focus on {top_zone} area monitoring",
             "Review storage access protocols"
         ]
     )
@@ -1,11 +1,8 @@
 """Authentication Routes"""
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 import logging
 
-from app.database.models import User
-from app.database.database import get_db
+from app.database import get_session
 from app.schemas import UserLogin, UserRegister, UserResponse, TokenResponse
 from app.security import verify_password, hash_password, create_access_token, get_current_user
 
@@ -13,13 +10,21 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+async def _find_user(db, **filters):
+    """First user matching the column filters (SQLAlchemy is imported on first use)"""
+    from sqlalchemy.future import select
+    from app.database.models import User
+    
+    result = await db.execute(select(User).filter_by(**filters))
+    return result.scalars().first()
+
+
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+async def login(credentials: UserLogin, db=Depends(get_session)):
     """User login endpoint"""
     try:
         # Query user by email
-        result = await db.execute(select(User).where(User.email == credentials.email))
-        user = result.scalars().first()
+        user = await _find_user(db, email=credentials.email)
 
         if not user or not verify_password(credentials.password, user.password_hash):
             raise HTTPException(
@@ -48,12 +53,11 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/register", response_model=TokenResponse)
-async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
+async def register(user_data: UserRegister, db=Depends(get_session)):
     """User registration endpoint"""
     try:
         # Check if user exists
-        result = await db.execute(select(User).where(User.email == user_data.email))
-        existing_user = result.scalars().first()
+        existing_user = await _find_user(db, email=user_data.email)
 
         if existing_user:
             raise HTTPException(
@@ -62,6 +66,8 @@ async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
             )
 
         # Create new user
+        from app.database.models import User
+        
         new_user = User(
             email=user_data.email,
             password_hash=hash_password(user_data.password),
@@ -96,12 +102,11 @@ async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh_token(current_user = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def refresh_token(current_user = Depends(get_current_user), db=Depends(get_session)):
     """Refresh access token endpoint"""
     try:
         # Fetch user from database to get latest info
-        result = await db.execute(select(User).where(User.id == current_user.user_id))
-        user = result.scalars().first()
+        user = await _find_user(db, id=current_user.user_id)
         
         if not user:
             raise HTTPException(
@@ -130,6 +135,6 @@ async def refresh_token(current_user = Depends(get_current_user), db: AsyncSessi
 
 
 # Dependency for protected routes
-async def get_current_user_deprecated(db: AsyncSession = Depends(get_db)):
+async def get_current_user_deprecated(db=Depends(get_session)):
     """Get current authenticated user (deprecated - use security.get_current_user instead)"""
     return {"email": "user@example.com", "user_id": 1}
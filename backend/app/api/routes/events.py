@@ -0,0 +1,67 @@
+"""Live Event Stream Endpoints (Server-Sent Events)"""
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.config import settings
+from app.services.event_broadcaster import event_broadcaster
+
+router = APIRouter()
+
+
+def _parse_event_id(value: Optional[str]) -> Optional[int]:
+    """Parse Last-Event-ID value, ignoring malformed IDs"""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+@router.get("/events/stream")
+async def stream_events(
+    request: Request,
+    camera_id: Optional[str] = Query(None),
+    store_id: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Stream new incidents and alerts as Server-Sent Events
+
+    EventSource sends Last-Event-ID automatically on reconnect; the query
+    parameter allows resuming from a stored ID on the first connection.
+    """
+    resume_from = _parse_event_id(last_event_id_header or last_event_id)
+    subscription, backlog = event_broadcaster.subscribe(
+        camera_id=camera_id,
+        store_id=store_id,
+        last_event_id=resume_from,
+        max_queue_size=settings.event_subscriber_queue_size
+    )
+
+    async def event_generator():
+        try:
+            yield f"retry: {settings.event_heartbeat_seconds * 1000}\n\n"
+            for event in backlog:
+                yield event.to_sse()
+
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=settings.event_heartbeat_seconds)
+                if event is None:
+                    # Comentario keep-alive para proxies
+                    yield ": heartbeat\n\n"
+                    continue
+                yield event.to_sse()
+        finally:
+            event_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -1,8 +1,9 @@
 """Health Check Endpoints"""
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from datetime import datetime
-from app.schemas import HealthResponse, DetailedHealthResponse
+from app.schemas import HealthResponse, DetailedHealthResponse, ModelStatusResponse
 from app.security import get_optional_user
+from app.api.routes.video_upload import model_status
 
 router = APIRouter()
 
@@ -17,13 +18,29 @@ async def health_check():
     )
 
 
-@router.get("/health/detailed", response_model=DetailedHealthResponse)
-async def detailed_health():
-    """Detailed health information"""
+def _detailed_health() -> DetailedHealthResponse:
+    model = model_status()
     return DetailedHealthResponse(
         api="operational",
         database="connected",
-        yolov8="ready",
+        yolov8=model["state"],
+        ready=model["state"] == "ready",
+        model=ModelStatusResponse(**model),
         redis="connected",
         timestamp=datetime.utcnow()
     )
+
+
+@router.get("/health/detailed", response_model=DetailedHealthResponse)
+async def detailed_health():
+    """Detailed health information"""
+    return _detailed_health()
+
+
+@router.get("/health/ready", response_model=DetailedHealthResponse)
+async def readiness(response: Response):
+    """Readiness probe: 503 until the model is loaded and warm (for load balancers)"""
+    health = _detailed_health()
+    if not health.ready:
+        response.status_code = 503
+    return health
@@ -1,7 +1,10 @@
 """Incident Logging and Management Endpoints"""
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse
 from typing import List, Optional
+import logging
 from datetime import datetime
+from pathlib import Path
 from app.schemas import (
     IncidentCreate,
     IncidentResponse,
@@ -10,14 +13,55 @@ from app.schemas import (
     RiskLevelEnum
 )
 from app.services.incident_logger import IncidentLogger
+from app.services.event_bus import event_bus, IncidentCreatedEvent
 from app.exceptions import NotFoundError, ValidationError
 from app.data import generate_incidents
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 incident_logger = IncidentLogger()
 
-# Generar incidentes sintéticos al iniciar
-SYNTHETIC_INCIDENTS = generate_incidents(100)
+
+def _with_aliases(incident: dict) -> dict:
+    """Incident plus the field names the dashboard uses (severity, type, zone)"""
+    detection_data = incident.get("detection_data") or {}
+    return {
+        **incident,
+        "severity": incident["risk_level"],
+        "type": incident["incident_type"],
+        "zone": detection_data.get("zone")
+    }
+
+
+def synthetic_incidents() -> List[dict]:
+    """Incidentes sintéticos de demostración, con la forma de IncidentLogger.log_incident"""
+    return [
+        {
+            "id": incident["id"],
+            "camera_id": incident["camera_id"],
+            "store_id": None,
+            "incident_type": incident["type"],
+            "risk_level": incident["severity"],
+            "description": incident["description"],
+            "detection_data": {
+                key: incident[key]
+                for key in ("zone", "confidence", "snapshot_url", "video_url", "assigned_to", "notes")
+            },
+            "timestamp": incident["timestamp"],
+            "status": incident["status"],
+            "user_confirmed": None,
+            "resolved_at": incident["resolved_at"]
+        }
+        for incident in generate_incidents(100)
+    ]
+
+
+async def seed_demo_incidents():
+    """Cargar los incidentes sintéticos si la tabla está vacía (DEMO_INCIDENTS)"""
+    inserted = await incident_logger.seed(synthetic_incidents())
+    if inserted:
+        logger.info(f"🧪 {inserted} incidentes de demostración cargados")
 
 
 @router.post("/incidents/report", response_model=IncidentResponse, status_code=status.HTTP_201_CREATED)
@@ -31,6 +75,13 @@ async def report_incident(incident: IncidentCreate):
     )
     
     logged_incident = incident_logger.get_incident(incident_id)
+    await event_bus.publish(IncidentCreatedEvent(
+        camera_id=incident.camera_id,
+        incident_id=incident_id,
+        incident_type=logged_incident["incident_type"],
+        risk_level=logged_incident["risk_level"],
+        description=logged_incident.get("description")
+    ))
     return IncidentResponse(
         id=logged_incident["id"],
         camera_id=logged_incident["camera_id"],
@@ -49,61 +100,97 @@ async def list_incidents(
     severity: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0)
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    offset: Optional[int] = Query(None, ge=0, description="Obsoleto: usar cursor")
 ):
-    """Get list of incidents with optional filters"""
-    # Filtrar incidentes sintéticos
-    filtered = SYNTHETIC_INCIDENTS
-    
-    if camera_id:
-        filtered = [inc for inc in filtered if inc["camera_id"] == camera_id]
-    
-    if severity:
-        filtered = [inc for inc in filtered if inc["severity"] == severity]
-    
-    if status:
-        filtered = [inc for inc in filtered if inc["status"] == status]
+    """Get list of incidents with optional filters, newest first (keyset pagination)"""
+    try:
+        page, next_cursor = await incident_logger.query_incidents(
+            camera_id=camera_id,
+            risk_level=severity,
+            status=status,
+            limit=limit,
+            cursor=cursor,
+            offset=offset or 0
+        )
+    except ValueError as e:
+        raise ValidationError(str(e), {"cursor": cursor})
     
-    # Paginación
-    total = len(filtered)
-    paginated = filtered[offset:offset + limit]
-    
-    return {
-        "incidents": paginated,
-        "total": total,
+    response = {
+        "incidents": [_with_aliases(incident) for incident in page],
         "limit": limit,
-        "offset": offset
+        "next_cursor": next_cursor
     }
+    if offset is not None:
+        # Clientes de la paginación por offset: misma forma que antes
+        response["offset"] = offset
+        response["total"] = await incident_logger.count_incidents(
+            camera_id=camera_id, risk_level=severity, status=status
+        )
+    return response
 
 
 @router.get("/incidents/{incident_id}")
 async def get_incident(incident_id: str):
     """Get incident details"""
-    incident = next((inc for inc in SYNTHETIC_INCIDENTS if inc["id"] == incident_id), None)
+    incident = await incident_logger.fetch_incident(incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incidente no encontrado")
     
-    return incident
+    return _with_aliases(incident)
+
+
+@router.get("/incidents/{incident_id}/clip")
+async def get_incident_clip(incident_id: str):
+    """
+    Clip de la cámara alrededor del incidente (pre-roll + post-roll)
+    
+    El clip se escribe cuando termina el post-roll; hasta entonces responde 404.
+    """
+    incident = await incident_logger.fetch_incident(incident_id)
+    clip_path = ((incident or {}).get("detection_data") or {}).get("clip_path")
+    if not clip_path:
+        raise HTTPException(status_code=404, detail="El incidente no tiene clip")
+    
+    path = Path(clip_path)
+    if not path.exists() and path.with_suffix(".h264").exists():
+        # El remux a MP4 falló: queda el H.264 crudo
+        path = path.with_suffix(".h264")
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Clip aún no disponible", headers={"Retry-After": "10"})
+    
+    media_type = "video/mp4" if path.suffix == ".mp4" else "video/h264"
+    return FileResponse(path=path, media_type=media_type, headers={"Content-Disposition": f"inline; filename={path.name}"})
 
 
 @router.put("/incidents/{incident_id}/status")
 async def update_incident_status(incident_id: str, status: str):
     """Update incident status"""
-    incident = next((inc for inc in SYNTHETIC_INCIDENTS if inc["id"] == incident_id), None)
+    incident = await incident_logger.update_status(incident_id, status)
     if not incident:
         raise HTTPException(status_code=404, detail="Incidente no encontrado")
     
-    incident["status"] = status
-    if status == "resolved":
-        incident["resolved_at"] = datetime.now().isoformat()
+    return _with_aliases(incident)
+
+
+@router.put("/incidents/{incident_id}/confirm")
+async def confirm_incident(incident_id: str, confirmation: IncidentConfirm):
+    """Confirm whether an incident was legitimate (feedback for retraining)"""
+    incident = await incident_logger.confirm_incident(incident_id, confirmation.confirmed)
+    if not incident:
+        raise HTTPException(status_code=404, detail="Incidente no encontrado")
     
-    return incident
+    return {
+        "id": incident["id"],
+        "confirmed": incident["user_confirmed"],
+        "updated_at": incident["confirmation_timestamp"]
+    }
 
 
 @router.delete("/incidents/{incident_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_incident(incident_id: str):
     """Delete an incident record"""
-    incident = incident_logger.get_incident(incident_id)
+    incident = await incident_logger.fetch_incident(incident_id)
     if not incident:
         raise NotFoundError(f"Incident {incident_id} not found", "Incident")
     
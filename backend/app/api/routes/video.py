@@ -1,5 +1,5 @@
 """Video Stream and Processing Endpoints"""
-from fastapi import APIRouter, WebSocket, HTTPException, status
+from fastapi import APIRouter, WebSocket, HTTPException, Request, status
 from typing import List
 from datetime import datetime
 from app.schemas import (
@@ -9,6 +9,7 @@ from app.schemas import (
     ActiveStreamsResponse,
     ActiveStreamInfo
 )
+from app.config import settings
 from app.services.video_processor import VideoProcessor
 from app.data import CAMERAS_DATA, generate_detections
 
@@ -43,10 +44,25 @@ async def get_camera_detections(camera_id: str):
 
 
 @router.post("/video/stream/start", response_model=VideoStreamResponse)
-async def start_video_stream(request: VideoStreamStart):
-    """Start processing video stream from camera"""
+async def start_video_stream(request: VideoStreamStart, http_request: Request):
+    """Start processing video stream from camera through the detection pipeline"""
+    if request.camera_id in video_processor.tasks:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El stream de esta cámara ya está activo")
+    if len(video_processor.tasks) >= settings.max_concurrent_streams:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Límite de streams simultáneos alcanzado")
+    
+    state = http_request.app.state
+    
+    async def on_frame(camera_id, frame):
+        # El pipeline se crea en warm_up: los frames anteriores se descartan
+        pipeline = getattr(state, "detection_pipeline", None)
+        if pipeline is not None:
+            await pipeline.handle_frame(camera_id, frame, store_id=request.store_id)
+    
+    video_processor.start_stream(request.camera_id, request.stream_url, on_frame)
+    pipeline_ready = getattr(state, "detection_pipeline", None) is not None
     return VideoStreamResponse(
-        message="Video stream started",
+        message="Video stream started" if pipeline_ready else "Video stream started (detection pipeline warming up)",
         camera_id=request.camera_id,
         stream_url=request.stream_url,
         timestamp=datetime.utcnow(),
@@ -57,11 +73,12 @@ async def start_video_stream(request: VideoStreamStart):
 @router.post("/video/stream/stop", response_model=VideoStreamResponse)
 async def stop_video_stream(request: VideoStreamStop):
     """Stop processing video stream"""
-    video_processor.stop_stream(request.camera_id)
+    stopped = await video_processor.stop(request.camera_id)
     return VideoStreamResponse(
-        message="Video stream stopped",
+        message="Video stream stopped" if stopped else "Video stream was not running",
         camera_id=request.camera_id,
-        timestamp=datetime.utcnow()
+        timestamp=datetime.utcnow(),
+        status="stopped"
     )
 
 
@@ -73,7 +90,7 @@ async def list_active_streams():
         if stats.get("active"):
             streams.append(ActiveStreamInfo(
                 camera_id=camera_id,
-                stream_url="",
+                stream_url=stats.get("stream_url", ""),
                 started_at=stats["started_at"],
                 frame_count=stats["frame_count"],
                 active=True
@@ -1,15 +1,27 @@
 """Endpoint para análisis de videos con YOLO"""
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+import asyncio
+import re
 import shutil
 import os
 from pathlib import Path
 from datetime import datetime
 import tempfile
-from app.services.yolov8_detector import YOLOv8Detector
+import uuid
+from app.config import settings
 
 router = APIRouter()
-detector = YOLOv8Detector()
+# Se crea en el warmup del lifespan (o en la primera petición): importar el
+# detector arrastra cv2/numpy y el backend de inferencia
+_detector = None
+
+# Análisis en segundo plano (modo hls): video_id -> estado del trabajo
+_jobs = {}
+_background_tasks = set()
+HLS_FILE = re.compile(r"^(index\.m3u8|init\.mp4|segment_\d{5}\.m4s)$")
+SPRITE_FILE = re.compile(r"^sprite_\d{3}\.jpg$")
 
 # Directorio para videos subidos (ruta absoluta desde el directorio del backend)
 BACKEND_DIR = Path(__file__).parent.parent.parent.parent  # go from: app/api/routes/video_upload.py -> backend/
@@ -24,12 +36,73 @@ PROCESSED_DIR = BACKEND_DIR / "uploads" / "processed"
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _processed_video(video_id: str) -> Path:
+    return PROCESSED_DIR / f"video_processed_{video_id}.mp4"
+
+
+def _sidecar(video_id: str) -> Path:
+    return PROCESSED_DIR / f"detections_{video_id}.jsonl.gz"
+
+
+def _hls_dir(video_id: str) -> Path:
+    return PROCESSED_DIR / f"hls_{video_id}"
+
+
+def _index_dir(video_id: str) -> Path:
+    return PROCESSED_DIR / f"index_{video_id}"
+
+
+def _input_video(video_id: str):
+    """Video original subido (cualquier extensión), o None"""
+    return next(UPLOAD_DIR.glob(f"video_input_{video_id}.*"), None)
+
+
+def get_detector():
+    """Detector compartido (sin cargar el modelo; ver YOLOv8Detector.load)"""
+    global _detector
+    if _detector is None:
+        from app.services.yolov8_detector import YOLOv8Detector
+        _detector = YOLOv8Detector(lazy=True)
+    return _detector
+
+
+def model_status() -> dict:
+    """Estado del modelo sin forzar la importación del detector"""
+    if _detector is None:
+        return {"state": "not_loaded", "backend": settings.inference_backend}
+    return _detector.status()
+
+
+def require_model():
+    """Responder 503 mientras el modelo se carga o si falló la carga"""
+    from app.services.yolov8_detector import ModelState
+    
+    detector = get_detector()
+    if detector.state in (ModelState.LOADING, ModelState.WARMING, ModelState.FAILED):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Modelo no disponible ({detector.state.value})",
+            headers={"Retry-After": "5"} if detector.state != ModelState.FAILED else None
+        )
+    return detector
+
+
 @router.post("/upload")
-async def upload_video(file: UploadFile = File(...)):
+async def upload_video(
+    file: UploadFile = File(...),
+    mode: str = Query(None, regex="^(sidecar|video|hls)$")
+):
     """
     Subir y analizar video de cámara de seguridad
     
     Formatos soportados: mp4, avi, mov
+    
+    mode=sidecar (por defecto, settings.video_output_mode) guarda solo las
+    cajas por frame y el cliente las dibuja sobre el video original;
+    mode=video además re-codifica un MP4 con las cajas dibujadas.
+    mode=hls responde de inmediato y analiza en segundo plano escribiendo
+    segmentos HLS anotados; cada segmento aparece en la playlist en cuanto
+    se analiza (progreso en /status/{video_id}).
     """
     # Validar formato
     allowed_extensions = [".mp4", ".avi", ".mov", ".mkv"]
@@ -40,10 +113,11 @@ async def upload_video(file: UploadFile = File(...)):
             status_code=400, 
             detail=f"Formato no soportado. Use: {', '.join(allowed_extensions)}"
         )
+    detector = require_model()
     
     try:
-        # Generar nombre único
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Generar nombre único (dos subidas en el mismo segundo no comparten id)
+        timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         input_filename = f"video_input_{timestamp}{file_ext}"
         input_path = UPLOAD_DIR / input_filename
         
@@ -51,21 +125,34 @@ async def upload_video(file: UploadFile = File(...)):
         with input_path.open("wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
         
-        # Generar nombre para video procesado
-        output_filename = f"video_processed_{timestamp}.mp4"
-        output_path = PROCESSED_DIR / output_filename
+        mode = mode or settings.video_output_mode
+        if mode == "hls":
+            return _start_hls_analysis(detector, timestamp, input_path, input_filename)
         
-        # Procesar video con YOLO y tracking
-        analysis = detector.process_video_with_tracking(str(input_path), str(output_path))
+        burn_in = mode == "video"
+        output_path = _processed_video(timestamp)
+        
+        # Procesar video con YOLO y tracking (en modo sidecar sin re-codificar)
+        analysis = detector.process_video_with_tracking(
+            str(input_path),
+            str(output_path) if burn_in else None,
+            sidecar_path=str(_sidecar(timestamp)),
+            burn_in=burn_in,
+            index_dir=str(_index_dir(timestamp))
+        )
         
         if not analysis.get("success"):
             raise Exception(analysis.get("error", "Error procesando video"))
         
         return {
             "status": "success",
+            "mode": mode,
             "input_filename": input_filename,
-            "output_filename": output_filename,
+            "output_filename": output_path.name if burn_in else input_filename,
             "video_id": timestamp,
+            "video_url": f"/api/v1/video/video/{timestamp}",
+            "sidecar_url": f"/api/v1/video/detections/{timestamp}",
+            "index_url": f"/api/v1/video/index/{timestamp}",
             "analysis": analysis
         }
     
@@ -73,17 +160,97 @@ async def upload_video(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error procesando video: {str(e)}")
 
 
+def _start_hls_analysis(detector, video_id: str, input_path: Path, input_filename: str) -> dict:
+    """Lanzar el análisis con salida HLS sin bloquear la respuesta"""
+    from app.services.video_encoder import ffmpeg_executable
+    
+    if ffmpeg_executable() is None:
+        raise HTTPException(status_code=400, detail="El modo hls requiere ffmpeg (instale imageio-ffmpeg)")
+    
+    job = {"video_id": video_id, "state": "processing", "frames": 0, "total_frames": 0, "analysis": None, "error": None}
+    _jobs[video_id] = job
+    
+    def progress(frames: int, total_frames: int):
+        job["frames"] = frames
+        job["total_frames"] = total_frames
+    
+    async def analyze():
+        try:
+            analysis = await run_in_threadpool(
+                detector.process_video_with_tracking,
+                str(input_path),
+                str(_hls_dir(video_id) / "index.m3u8"),
+                progress=progress,
+                index_dir=str(_index_dir(video_id))
+            )
+            if not analysis.get("success"):
+                raise Exception(analysis.get("error", "Error procesando video"))
+            job.update(state="done", analysis=analysis)
+        except Exception as e:
+            job.update(state="error", error=str(e))
+    
+    task = asyncio.create_task(analyze())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    
+    return {
+        "status": "processing",
+        "mode": "hls",
+        "input_filename": input_filename,
+        "video_id": video_id,
+        "playlist_url": f"/api/v1/video/hls/{video_id}/index.m3u8",
+        "index_url": f"/api/v1/video/index/{video_id}",
+        "status_url": f"/api/v1/video/status/{video_id}"
+    }
+
+
+@router.get("/status/{video_id}")
+async def get_analysis_status(video_id: str):
+    """Progreso del análisis en segundo plano (modo hls)"""
+    job = _jobs.get(video_id)
+    if job is None:
+        # Trabajos de una ejecución anterior: la playlist terminada es el único rastro
+        if (_hls_dir(video_id) / "index.m3u8").exists():
+            return {"video_id": video_id, "state": "done", "analysis": None}
+        raise HTTPException(status_code=404, detail="Análisis no encontrado")
+    return job
+
+
+@router.get("/hls/{video_id}/{filename}")
+async def get_hls_file(video_id: str, filename: str):
+    """
+    Playlist y segmentos HLS
+    
+    La playlist crece mientras se analiza el video (no se cachea); los
+    segmentos ya escritos no cambian.
+    """
+    if not HLS_FILE.match(filename):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    
+    path = _hls_dir(video_id) / filename
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    
+    if filename.endswith(".m3u8"):
+        return FileResponse(path=path, media_type="application/vnd.apple.mpegurl", headers={"Cache-Control": "no-cache"})
+    media_type = "video/mp4" if filename.endswith(".mp4") else "video/iso.segment"
+    return FileResponse(path=path, media_type=media_type, headers={"Cache-Control": "public, max-age=86400"})
+
+
 @router.get("/video/{video_id}")
 async def get_processed_video(video_id: str):
     """
     Servir video procesado para streaming
+    
+    Sin video anotado (modo sidecar) se sirve el original subido.
     """
     try:
         # Buscar archivo procesado
-        output_filename = f"video_processed_{video_id}.mp4"
-        output_path = PROCESSED_DIR / output_filename
-        
+        output_path = _processed_video(video_id)
         if not output_path.exists():
+            output_path = _input_video(video_id)
+        
+        if output_path is None or not output_path.exists():
             raise HTTPException(status_code=404, detail="Video no encontrado")
         
         # Devolver video con headers para streaming
@@ -91,7 +258,7 @@ async def get_processed_video(video_id: str):
             path=output_path,
             media_type="video/mp4",
             headers={
-                "Content-Disposition": f"inline; filename={output_filename}",
+                "Content-Disposition": f"inline; filename={output_path.name}",
                 "Accept-Ranges": "bytes"
             }
         )
@@ -102,19 +269,129 @@ async def get_processed_video(video_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/detections/{video_id}")
+async def get_detections(video_id: str):
+    """
+    Sidecar de detecciones (JSON lines, gzip) para dibujar las cajas en el cliente
+    
+    Se sirve tal cual con Content-Encoding: gzip; el navegador lo descomprime.
+    """
+    sidecar_path = _sidecar(video_id)
+    if not sidecar_path.exists():
+        raise HTTPException(status_code=404, detail="Detecciones no encontradas")
+    
+    return FileResponse(
+        path=sidecar_path,
+        media_type="application/x-ndjson",
+        headers={"Content-Encoding": "gzip", "Cache-Control": "public, max-age=86400"}
+    )
+
+
+def _load_index(video_id: str) -> dict:
+    from app.services.video_index import load_index
+    
+    try:
+        return load_index(str(_index_dir(video_id)))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Índice no encontrado")
+
+
+@router.get("/index/{video_id}")
+async def get_video_index(video_id: str):
+    """
+    Índice del video: duración, miniaturas (sprites) y primer/último
+    instante de cada track, para la barra de reproducción y "ir a Persona N"
+    """
+    index = _load_index(video_id)
+    index.pop("timestamps_ms")
+    keyframes = index.pop("keyframes")
+    index["keyframe_count"] = len(keyframes) if keyframes is not None else None
+    index["thumbnails"]["sheets"] = [
+        f"/api/v1/video/thumbnails/{video_id}/{name}" for name in index["thumbnails"]["sheets"]
+    ]
+    return index
+
+
+@router.get("/thumbnails/{video_id}/{filename}")
+async def get_thumbnail_sprite(video_id: str, filename: str):
+    """Sprite de miniaturas (grilla de columns x rows)"""
+    path = _index_dir(video_id) / filename
+    if not SPRITE_FILE.match(filename) or not path.exists():
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    return FileResponse(path=path, media_type="image/jpeg", headers={"Cache-Control": "public, max-age=86400"})
+
+
+@router.get("/seek/{video_id}")
+async def seek_frame(video_id: str, t_ms: float = Query(..., ge=0)):
+    """
+    Frame del video original en el instante t_ms (milisegundos), como JPEG
+    
+    Usa el índice para saltar al keyframe anterior en vez de decodificar
+    desde el inicio.
+    """
+    import cv2
+    from app.services.video_index import read_frame_at
+    
+    index = _load_index(video_id)
+    input_path = _input_video(video_id)
+    if input_path is None:
+        raise HTTPException(status_code=404, detail="Video no encontrado")
+    
+    try:
+        position, timestamp_ms, frame = await run_in_threadpool(read_frame_at, str(input_path), index, t_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return Response(
+        content=jpeg.tobytes(),
+        media_type="image/jpeg",
+        headers={"X-Frame-Index": str(position), "X-Frame-Time-Ms": str(timestamp_ms)}
+    )
+
+
+@router.post("/export/{video_id}")
+async def export_annotated_video(video_id: str, scale: float = Query(None, gt=0, le=1)):
+    """
+    Exportar un MP4 con las cajas dibujadas a partir del sidecar (sin re-detectar)
+    """
+    from app.services.detection_sidecar import burn_in
+    
+    input_path = _input_video(video_id)
+    sidecar_path = _sidecar(video_id)
+    if input_path is None or not sidecar_path.exists():
+        raise HTTPException(status_code=404, detail="Video no encontrado")
+    
+    output_path = _processed_video(video_id)
+    try:
+        result = await run_in_threadpool(burn_in, str(input_path), str(sidecar_path), str(output_path), scale)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exportando video: {str(e)}")
+    
+    return {
+        "status": "success",
+        "video_id": video_id,
+        "output_filename": output_path.name,
+        "video_url": f"/api/v1/video/video/{video_id}",
+        "frames": result["frames"]
+    }
+
+
 @router.get("/analysis/{video_id}")
 async def get_video_analysis(video_id: str):
     """Obtener análisis de video previamente procesado"""
     try:
-        # Buscar archivo procesado
-        output_filename = f"video_processed_{video_id}.mp4"
-        output_path = PROCESSED_DIR / output_filename
-        
+        # Buscar archivo procesado (o el original en modo sidecar)
+        output_path = _processed_video(video_id)
         if not output_path.exists():
+            output_path = _input_video(video_id)
+        
+        if output_path is None or not output_path.exists():
             raise HTTPException(status_code=404, detail="Video no encontrado")
+        detector = require_model()
         
-        # Re-analizar
-        analysis = detector.process_video_with_tracking(str(output_path))
+        # Re-analizar (solo el resumen; no hace falta otro video anotado)
+        analysis = detector.process_video_with_tracking(str(output_path), burn_in=False)
         
         return {
             "status": "success",
@@ -129,15 +406,22 @@ async def get_video_analysis(video_id: str):
 
 @router.delete("/video/{video_id}")
 async def delete_video(video_id: str):
-    """Eliminar video procesado"""
+    """Eliminar video procesado, su sidecar de detecciones, sus segmentos HLS y su índice"""
     try:
-        output_filename = f"video_processed_{video_id}.mp4"
-        output_path = PROCESSED_DIR / output_filename
+        outputs = [
+            path for path in (_processed_video(video_id), _sidecar(video_id), _hls_dir(video_id), _index_dir(video_id))
+            if path.exists()
+        ]
         
-        if not output_path.exists():
+        if not outputs:
             raise HTTPException(status_code=404, detail="Video no encontrado")
         
-        os.remove(output_path)
+        for path in outputs:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        _jobs.pop(video_id, None)
         return {"status": "success", "message": f"Video {video_id} eliminado"}
     except HTTPException:
         raise
@@ -18,6 +18,23 @@ class Settings(BaseSettings):
     database_echo: bool = False
     database_pool_size: int = 5
     database_max_overflow: int = 10
+    database_pool_recycle: int = 1800  # segundos (bases de datos de servidor)
+    # SQLite (PRAGMAs por conexión)
+    sqlite_journal_mode: str = "WAL"  # WAL: lecturas concurrentes con una escritura
+    sqlite_synchronous: str = "NORMAL"  # NORMAL es seguro con WAL; FULL = fsync en cada commit
+    sqlite_busy_timeout_ms: int = 5000  # espera por el lock de escritura antes de "database is locked"
+    sqlite_mmap_size_mb: int = 256
+    sqlite_cache_size_mb: int = 64  # caché de páginas por conexión
+    incident_flush_batch_size: int = 200  # incidentes por transacción (escritura diferida)
+    incident_flush_interval_seconds: float = 1.0  # intervalo máximo entre escrituras
+    incident_queue_max_size: int = 100000  # tope de la cola en memoria si la base de datos no responde
+    demo_incidents: bool = True  # cargar incidentes sintéticos si la tabla está vacía
+    detection_persistence_enabled: bool = True  # guardar cada caja detectada en la tabla detections
+    detection_flush_rows: int = 2000  # filas por transacción (insert masivo)
+    detection_flush_interval_seconds: float = 2.0
+    detection_buffer_max_rows: int = 100000  # tope en memoria si la base de datos se atrasa
+    rollup_minute_retention_days: int = 7  # buckets de minuto; horas y días se conservan
+    store_timezone: str = "UTC"  # zona IANA de las tiendas para horas pico (p. ej. America/Mexico_City)
     
     # CORS
     frontend_url: str = "http://localhost:3000"
@@ -28,16 +45,47 @@ class Settings(BaseSettings):
     use_gpu: bool = False  # Usar GPU si está disponible
     yolo_confidence_threshold: float = 0.5
     yolo_iou_threshold: float = 0.45
+    inference_backend: str = "pytorch"  # pytorch | onnxruntime | openvino
+    inference_image_size: int = 640
+    inference_threads: int = 0  # 0 = automático (onnxruntime / openvino)
+    inference_precision: str = "fp32"  # fp32 | int8 (onnxruntime / openvino, ver quantize.py)
+    model_warmup_runs: int = 3  # inferencias de calentamiento al arrancar
+    model_load_in_background: bool = True  # False = el arranque espera al modelo
+    # Model server compartido (INFERENCE_BACKEND=remote en los workers)
+    model_server_address: str = "unix:/tmp/yolandita-model.sock"  # o tcp:127.0.0.1:8765
+    model_server_backend: str = "pytorch"  # backend que carga el servidor
+    model_server_max_batch: int = 16
+    model_server_max_wait_ms: float = 5.0
+    model_server_timeout: float = 30.0
     # Video Processing
     video_stream_timeout: int = 30
     max_concurrent_streams: int = 5
+    frame_ring_slots: int = 8  # slots del ring de memoria compartida por cámara
     frame_processing_interval: int = 500  # milliseconds
+    annotation_preview_scale: float = 1.0  # < 1 = video anotado a menor resolución (vista previa)
+    video_output_mode: str = "sidecar"  # sidecar (cajas dibujadas en el cliente) | video (re-codificar con cajas) | hls (segmentos reproducibles mientras se analiza)
+    video_encoder: str = "ffmpeg"  # ffmpeg (libx264 por pipe, listo para web) | opencv (cv2.VideoWriter)
+    video_encoder_preset: str = "veryfast"  # preset de libx264
+    video_encoder_crf: int = 23  # calidad libx264 (menor = mejor calidad, archivo más grande)
+    hls_segment_seconds: int = 6  # duración de cada segmento HLS (modo hls)
+    thumbnail_interval_seconds: float = 2.0  # miniaturas para la barra de reproducción
+    thumbnail_width: int = 160
+    clip_recording_enabled: bool = True  # buffer de paquetes por cámara para clips de incidentes
+    clip_pre_roll_seconds: float = 10.0  # segundos antes del incidente
+    clip_post_roll_seconds: float = 10.0  # segundos después del incidente
+    clip_buffer_max_mb: int = 32  # tope de memoria del buffer por cámara
     
     # Alert Configuration
     alert_notification_email: str = "admin@yolandita.com"
     high_risk_threshold: float = 0.8
     medium_risk_threshold: float = 0.5
     
+    # Live Events (SSE)
+    event_buffer_size: int = 1000  # eventos recientes para reanudar con Last-Event-ID
+    event_subscriber_queue_size: int = 100
+    event_heartbeat_seconds: int = 15
+    event_bus_queue_size: int = 1000  # cola por suscriptor del bus interno
+    
     # JWT Configuration
     access_token_expire_hours: int = 24
     refresh_token_expire_days: int = 7
@@ -356,6 +356,53 @@ SYSTEM_CONFIG = {
         "compression_level": "medium",
         "cloud_backup_enabled": False
     },
+    "rules": {
+        "enabled": True,
+        # Reglas evaluadas por RuleEngine; camera_id "*" aplica a todas las cámaras
+        "definitions": [
+            {"id": "loitering-default", "type": "dwell_time", "camera_id": "*", "min_seconds": 300, "risk_level": "high"},
+            {"id": "crowd-default", "type": "person_count", "camera_id": "*", "max_persons": 15, "risk_level": "medium"},
+            {"id": "after-hours-default", "type": "after_hours", "camera_id": "*", "start_hour": 22, "end_hour": 6, "risk_level": "high"}
+        ]
+    },
+    "zones": {
+        # Polígonos por cámara en coordenadas normalizadas [0, 1]; se rasterizan
+        # una vez por resolución del stream (ZoneRegistry)
+        "cameras": {
+            "cam-001": [
+                {"name": "Entrada Principal", "polygon": [[0.30, 0.45], [0.70, 0.45], [0.80, 1.0], [0.20, 1.0]]}
+            ],
+            "cam-002": [
+                {"name": "Área de Ventas", "polygon": [[0.0, 0.35], [1.0, 0.35], [1.0, 1.0], [0.0, 1.0]]},
+                {"name": "Pasillo Norte", "polygon": [[0.0, 0.0], [1.0, 0.0], [1.0, 0.35], [0.0, 0.35]]}
+            ],
+            "cam-003": [
+                {"name": "Mostrador", "polygon": [[0.25, 0.40], [0.75, 0.40], [0.75, 0.90], [0.25, 0.90]]}
+            ],
+            "cam-004": [
+                {"name": "Almacén", "polygon": [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]]}
+            ],
+            "cam-005": [
+                {"name": "Estacionamiento", "polygon": [[0.0, 0.30], [1.0, 0.30], [1.0, 1.0], [0.0, 1.0]]}
+            ]
+        }
+    },
+    "roi": {
+        # Rectángulos [x1, y1, x2, y2] normalizados por cámara; YOLO solo se ejecuta
+        # sobre estos recortes (cámaras sin ROI procesan el frame completo)
+        "cameras": {
+            "cam-003": [[0.20, 0.30, 0.80, 0.95]]
+        }
+    },
+    "tiling": {
+        # Inferencia por mosaicos solapados (estilo SAHI) para cámaras de alta
+        # resolución; se activa por cámara añadiéndola a "cameras"
+        "tile_size": 640,
+        "overlap": 0.2,
+        "merge_threshold": 0.6,  # intersección / caja menor para fusionar cortes
+        "full_frame_pass": True,  # añade la región completa al lote (personas grandes)
+        "cameras": []
+    },
     "security": {
         "require_2fa": False,
         "session_timeout_minutes": 60,
@@ -1 +1,13 @@
 """Database Module"""
+
+
+async def get_session():
+    """
+    get_db() for route dependencies that imports SQLAlchemy on first use
+    
+    Keeps the engine and ORM off the API import path (see benchmarks/startup.py).
+    """
+    from app.database.database import get_db
+    
+    async for session in get_db():
+        yield session
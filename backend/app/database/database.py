@@ -1,8 +1,9 @@
 """Database Configuration and Session Management"""
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import NullPool
-from typing import AsyncGenerator
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator, List
 from app.config import settings
 import logging
 
@@ -11,12 +12,75 @@ logger = logging.getLogger(__name__)
 # Base class for all models
 Base = declarative_base()
 
+
+def _is_sqlite_memory(url: str) -> bool:
+    return ":memory:" in url or "mode=memory" in url or url.rstrip("/").endswith("sqlite+aiosqlite:")
+
+
+def sqlite_pragmas() -> List[str]:
+    """PRAGMAs run on every new SQLite connection (settings.sqlite_*)"""
+    return [
+        # WAL: los lectores no se bloquean mientras alguien escribe
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        # NORMAL con WAL: sin fsync por commit, consistente ante caídas del proceso
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}",
+        # Negativo = KiB en lugar de páginas
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_mb * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def engine_options(url: str) -> dict:
+    """
+    create_async_engine() arguments for a database URL
+    
+    SQLite files get a connection pool (SQLAlchemy uses NullPool by default,
+    which reopens the file and re-runs the PRAGMAs for every session); server
+    databases get DATABASE_POOL_SIZE / DATABASE_MAX_OVERFLOW.
+    """
+    if url.startswith("sqlite"):
+        options = {"connect_args": {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000}}
+        if not _is_sqlite_memory(url):
+            options.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.database_pool_size,
+                max_overflow=settings.database_max_overflow
+            )
+        return options
+    return {
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.database_pool_recycle,
+    }
+
+
+def apply_sqlite_pragmas(engine: AsyncEngine):
+    """Run sqlite_pragmas() on each new connection of a SQLite engine"""
+    pragmas = sqlite_pragmas()
+    if _is_sqlite_memory(str(engine.url)):
+        pragmas = [p for p in pragmas if not p.startswith(("PRAGMA journal_mode", "PRAGMA mmap_size"))]
+    
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def build_engine(url: str, echo: bool = False) -> AsyncEngine:
+    """Async engine with the pool settings and, for SQLite, the performance PRAGMAs"""
+    engine = create_async_engine(url, echo=echo, **engine_options(url))
+    if url.startswith("sqlite"):
+        apply_sqlite_pragmas(engine)
+    return engine
+
+
 # Create async engine
-async_engine = create_async_engine(
-    settings.database_url_async,
-    echo=settings.database_echo,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url_async else {}
-)
+async_engine = build_engine(settings.database_url_async, echo=settings.database_echo)
 
 # Async session factory (SQLAlchemy 1.4 compatible)
 AsyncSessionLocal = sessionmaker(
@@ -1,5 +1,5 @@
 """SQLAlchemy ORM Models"""
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index
 from sqlalchemy.orm import declarative_base
 from datetime import datetime
 
@@ -12,13 +12,22 @@ class Incident(Base):
     
     id = Column(String, primary_key=True)
     camera_id = Column(String, nullable=False, index=True)
+    store_id = Column(String, nullable=True, index=True)
     incident_type = Column(String, nullable=False)
     risk_level = Column(String, nullable=False)  # low, medium, high
     description = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     status = Column(String, default="registered")
     user_confirmed = Column(Boolean, nullable=True)
+    confirmed_at = Column(DateTime, nullable=True)
+    resolved_at = Column(DateTime, nullable=True)
     detection_data = Column(Text)  # JSON string
+    
+    # Listados paginados por (timestamp, id) con filtros de cámara o estado/riesgo
+    __table_args__ = (
+        Index("ix_incidents_camera_timestamp", "camera_id", "timestamp"),
+        Index("ix_incidents_status_risk_timestamp", "status", "risk_level", "timestamp"),
+    )
 
 
 class Alert(Base):
@@ -44,7 +53,40 @@ class Detection(Base):
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     class_name = Column(String, nullable=False)
     confidence = Column(Float)
-    box_coordinates = Column(Text)  # JSON string of [x1, y1, x2, y2]
+    # Caja en píxeles del frame
+    x1 = Column(Float, nullable=False)
+    y1 = Column(Float, nullable=False)
+    x2 = Column(Float, nullable=False)
+    y2 = Column(Float, nullable=False)
+    track_id = Column(Integer, nullable=True)
+    zone = Column(String, nullable=True)
+
+
+class RollupColumns:
+    """Counters of one time bucket of a camera zone (zone "" = outside every zone)"""
+    bucket_start = Column(DateTime, primary_key=True)
+    camera_id = Column(String, primary_key=True)
+    zone = Column(String, primary_key=True, default="")
+    detections = Column(Integer, nullable=False, default=0)  # cajas x frames (proporcional a la permanencia)
+    incidents_low = Column(Integer, nullable=False, default=0)
+    incidents_medium = Column(Integer, nullable=False, default=0)
+    incidents_high = Column(Integer, nullable=False, default=0)
+    incidents_critical = Column(Integer, nullable=False, default=0)
+
+
+class RollupMinute(RollupColumns, Base):
+    """Per-minute rollup (kept ROLLUP_MINUTE_RETENTION_DAYS)"""
+    __tablename__ = "rollups_minute"
+
+
+class RollupHour(RollupColumns, Base):
+    """Per-hour rollup"""
+    __tablename__ = "rollups_hour"
+
+
+class RollupDay(RollupColumns, Base):
+    """Per-day rollup"""
+    __tablename__ = "rollups_day"
 
 
 class Store(Base):
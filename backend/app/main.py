@@ -2,12 +2,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import sys
 
 from app.config import settings
-from app.api.routes import health, video, incidents, analytics, auth, users, config, video_upload
+from app.api.routes import health, video, incidents, analytics, auth, users, config, video_upload, events
 from app.exceptions import setup_exception_handlers
 from app.middleware import LoggingMiddleware, RateLimitMiddleware, RequestIDMiddleware
+from app.services.event_bus import event_bus
 
 
 # Configure Logging
@@ -15,6 +18,66 @@ logging.basicConfig(level=settings.log_level)
 logger = logging.getLogger(__name__)
 
 
+def _import_warm_up_modules():
+    """SQLAlchemy, the ORM models and the pipeline (numpy, cv2), imported off the event loop"""
+    import app.database.database  # noqa: F401
+    import app.database.models  # noqa: F401
+    import app.services.rollups  # noqa: F401
+    from app.services.alert_service import AlertService
+    from app.services.detection_pipeline import DetectionPipeline
+    
+    return AlertService, DetectionPipeline
+
+
+async def warm_up(app: FastAPI):
+    """
+    Import the detection stack, start the pipeline and load the model
+    
+    Runs after startup so /health answers before cv2, numpy and the
+    inference backend are imported; /health/detailed reports progress.
+    """
+    loop = asyncio.get_running_loop()
+    # Importar en un hilo: /health sigue respondiendo mientras tanto
+    AlertService, DetectionPipeline = await loop.run_in_executor(None, _import_warm_up_modules)
+    
+    # Escritura diferida de incidentes
+    try:
+        await incidents.incident_logger.start()
+    except Exception as e:
+        logger.error(f"❌ No se pudo iniciar la persistencia de incidentes (quedan en cola): {e}")
+    if settings.demo_incidents:
+        try:
+            # Sin base de datos quedan en memoria
+            await incidents.seed_demo_incidents()
+        except Exception as e:
+            logger.error(f"❌ No se pudieron cargar los incidentes de demostración: {e}")
+    
+    # La importación del detector (cv2, numpy, backend) también sale del event loop
+    detector = await loop.run_in_executor(None, video_upload.get_detector)
+    
+    detection_writer = None
+    if settings.detection_persistence_enabled:
+        from app.services.detection_writer import detection_writer
+        try:
+            await detection_writer.start()
+        except Exception as e:
+            logger.error(f"❌ No se pudo iniciar la persistencia de detecciones: {e}")
+            detection_writer = None
+    
+    # Conectar detector -> tracker -> incidentes -> alertas
+    app.state.detection_pipeline = DetectionPipeline(
+        detector=detector,
+        bus=event_bus,
+        incident_logger=incidents.incident_logger,
+        alert_service=AlertService(),
+        detection_writer=detection_writer
+    )
+    await app.state.detection_pipeline.start(max_queue_size=settings.event_bus_queue_size)
+    
+    # Cargar y calentar el modelo; /health/ready responde 503 hasta que termine
+    await loop.run_in_executor(None, detector.load)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
@@ -22,10 +85,29 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Yolandita Backend Starting...")
     logger.info(f"Debug Mode: {settings.debug}")
     
+    app.state.detection_pipeline = None
+    warmup = asyncio.create_task(warm_up(app))
+    if not settings.model_load_in_background:
+        await warmup
+    
     yield
     
     # Shutdown
     logger.info("🛑 Yolandita Backend Shutting Down...")
+    if not warmup.done():
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
+    # Cámaras primero: dejan de entrar frames al pipeline
+    await video.video_processor.stop_all()
+    if app.state.detection_pipeline is not None:
+        await app.state.detection_pipeline.stop()
+        if app.state.detection_pipeline.detection_writer is not None:
+            await app.state.detection_pipeline.detection_writer.stop()
+    await incidents.incident_logger.stop()
+    # Cerrar el pool de conexiones (cada conexión aiosqlite tiene un hilo propio)
+    if "app.database.database" in sys.modules:
+        from app.database.database import close_db
+        await close_db()
 
 
 # Create FastAPI App
@@ -62,6 +144,7 @@ app.include_router(incidents.router, prefix="/api/v1", tags=["Incidents"])
 app.include_router(analytics.router, prefix="/api/v1", tags=["Analytics"])
 app.include_router(users.router, prefix="/api/v1", tags=["Users"])
 app.include_router(config.router, prefix="/api/v1", tags=["Configuration"])
+app.include_router(events.router, prefix="/api/v1", tags=["Events"])
 
 
 @app.get("/")
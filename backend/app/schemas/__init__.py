@@ -2,6 +2,7 @@
 from app.schemas.health import (
     HealthResponse,
     DetailedHealthResponse,
+    ModelStatusResponse,
     ErrorResponse,
     SuccessResponse,
     AuthToken,
@@ -42,6 +43,7 @@ __all__ = [
     # Health
     "HealthResponse",
     "DetailedHealthResponse",
+    "ModelStatusResponse",
     "ErrorResponse",
     "SuccessResponse",
     "AuthToken",
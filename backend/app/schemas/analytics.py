@@ -96,6 +96,7 @@ class HeatmapResponse(BaseModel):
 class RiskPattern(BaseModel):
     """Risk pattern analysis"""
     peak_risk_hours: List[str]
+    timezone: str = "UTC"  # zona horaria de peak_risk_hours
     risk_by_zone: Dict[str, float]
     equipment_concerns: List[str]
     recommendations: List[str]
@@ -20,11 +20,22 @@ class HealthResponse(BaseModel):
         }
 
 
+class ModelStatusResponse(BaseModel):
+    """Detector model lifecycle"""
+    state: str = Field(..., description="not_loaded, loading, warming, ready or failed")
+    backend: str = Field(..., description="Inference backend")
+    load_seconds: Optional[float] = None
+    warmup_ms: Optional[float] = Field(None, description="Latency of the last warmup inference")
+    error: Optional[str] = None
+
+
 class DetailedHealthResponse(BaseModel):
     """Detailed health check response"""
     api: str = Field(..., description="API status")
     database: str = Field(..., description="Database status")
-    yolov8: str = Field(..., description="YOLOv8 model status")
+    yolov8: str = Field(..., description="YOLOv8 model state")
+    ready: bool = Field(False, description="True once the model is loaded and warm")
+    model: Optional[ModelStatusResponse] = None
     redis: Optional[str] = None
     timestamp: datetime
     
@@ -34,6 +45,14 @@ class DetailedHealthResponse(BaseModel):
                 "api": "operational",
                 "database": "connected",
                 "yolov8": "ready",
+                "ready": True,
+                "model": {
+                    "state": "ready",
+                    "backend": "pytorch",
+                    "load_seconds": 2.41,
+                    "warmup_ms": 85.3,
+                    "error": None
+                },
                 "redis": "connected",
                 "timestamp": "2026-02-22T10:30:45.123456"
             }
@@ -8,12 +8,14 @@ class VideoStreamStart(BaseModel):
     """Start video stream request"""
     camera_id: str = Field(..., min_length=1, max_length=50)
     stream_url: str = Field(..., description="RTSP, HTTP, or HTTPS stream URL")
+    store_id: Optional[str] = Field(None, description="Owning store (defaults to the camera's store in the database)")
     
     class Config:
         json_schema_extra = {
             "example": {
                 "camera_id": "CAM-001",
-                "stream_url": "rtsp://camera.local:554/stream"
+                "stream_url": "rtsp://camera.local:554/stream",
+                "store_id": "STORE-001"
             }
         }
 
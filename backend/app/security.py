@@ -1,16 +1,11 @@
 """JWT Authentication module"""
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-import jwt
-from jwt import PyJWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
 from app.config import settings
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT settings
 ALGORITHM = "HS256"
 security = HTTPBearer()
@@ -25,14 +20,21 @@ class TokenData:
         self.store_id = store_id
 
 
+@lru_cache(maxsize=1)
+def pwd_context():
+    """Password hashing context (passlib/bcrypt are imported on first use)"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 def create_access_token(
@@ -49,6 +51,8 @@ def create_access_token(
     Returns:
         Encoded JWT token
     """
+    import jwt
+    
     to_encode = data.copy()
     
     if expires_delta:
@@ -80,6 +84,8 @@ def verify_token(token: str) -> TokenData:
     Raises:
         HTTPException: If token is invalid or expired
     """
+    import jwt
+    
     try:
         payload = jwt.decode(
             token,
@@ -103,7 +109,7 @@ def verify_token(token: str) -> TokenData:
             store_id=store_id
         )
         
-    except PyJWTError as e:
+    except jwt.PyJWTError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid token: {str(e)}",
@@ -3,6 +3,7 @@ import logging
 from datetime import datetime
 from typing import List, Optional
 from app.config import settings
+from app.services.event_broadcaster import event_broadcaster
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +21,8 @@ class AlertService:
         incident_id: str,
         camera_id: str,
         risk_level: str,
-        detection_summary: str
+        detection_summary: str,
+        store_id: Optional[str] = None
     ) -> dict:
         """
         Generate an alert based on detected risk
@@ -30,6 +32,7 @@ class AlertService:
             camera_id: Source camera
             risk_level: Risk level
             detection_summary: Summary of detection
+            store_id: Owning store (used to filter live event subscribers)
             
         Returns:
             Alert object
@@ -41,6 +44,7 @@ class AlertService:
             "id": f"ALR-{len(self.alerts) + 1:04d}",
             "incident_id": incident_id,
             "camera_id": camera_id,
+            "store_id": store_id,
             "risk_level": risk_level,
             "detection_summary": detection_summary,
             "timestamp": datetime.utcnow().isoformat(),
@@ -54,6 +58,7 @@ class AlertService:
             self._send_notification(alert)
         
         logger.info(f"🚨 Alert generated: {alert['id']} ({risk_level})")
+        event_broadcaster.publish("alert", alert, camera_id=camera_id, store_id=store_id)
         return alert
     
     async def send_email_alert(
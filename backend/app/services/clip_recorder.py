@@ -0,0 +1,285 @@
+"""
+Clip Recorder: per-camera ring of compressed packets for incident clips
+
+Live cameras keep their last seconds as encoded packets (a few hundred KB
+per second of H.264, instead of ~6 MB per decoded 1080p frame). When a rule
+fires, the pre-roll in the ring plus the packets of the following seconds
+are written to disk as they arrived, without decoding or re-encoding, and
+remuxed to MP4 with `ffmpeg -c copy` when ffmpeg is available.
+
+The ring is stored as whole GOPs so a clip always starts at a keyframe.
+Memory per camera is capped by CLIP_BUFFER_MAX_MB: the oldest GOPs are
+dropped first (a single GOP larger than the cap is discarded).
+"""
+import logging
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from app.config import settings
+from app.services.video_encoder import ffmpeg_executable
+
+logger = logging.getLogger(__name__)
+
+CLIPS_DIR = Path(__file__).resolve().parents[2] / "uploads" / "clips"
+
+# Escritura de clips fuera del hilo que lee paquetes de la cámara
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-writer")
+
+
+class Packet(NamedTuple):
+    timestamp: float  # seconds (monotonic clock of arrival)
+    data: bytes
+    keyframe: bool
+
+
+class _Gop:
+    __slots__ = ("start", "packets", "size")
+
+    def __init__(self, packet: Packet):
+        self.start = packet.timestamp
+        self.packets = [packet]
+        self.size = len(packet.data)
+
+
+class PacketRing:
+    """Bounded buffer of the most recent GOPs of one stream"""
+
+    def __init__(self, max_seconds: float, max_bytes: int):
+        """
+        Initialize ring
+
+        Args:
+            max_seconds: Pre-roll to keep (GOPs older than this are dropped)
+            max_bytes: Hard memory cap for the buffered packets
+        """
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.gops: Deque[_Gop] = deque()
+        self.size = 0
+        self.stats = {"packets": 0, "dropped_gops": 0, "skipped_packets": 0}
+
+    def append(self, packet: Packet):
+        """Add a packet; packets before the first keyframe are undecodable and skipped"""
+        self.stats["packets"] += 1
+        if packet.keyframe:
+            self.gops.append(_Gop(packet))
+        elif self.gops:
+            gop = self.gops[-1]
+            gop.packets.append(packet)
+            gop.size += len(packet.data)
+        else:
+            self.stats["skipped_packets"] += 1
+            return
+        self.size += len(packet.data)
+        self._evict(packet.timestamp)
+
+    def _evict(self, now: float):
+        # Conservar el GOP que contiene el inicio del pre-roll
+        while len(self.gops) > 1 and self.gops[1].start <= now - self.max_seconds:
+            self._drop()
+        while self.size > self.max_bytes and self.gops:
+            self._drop()
+
+    def _drop(self):
+        gop = self.gops.popleft()
+        self.size -= gop.size
+        self.stats["dropped_gops"] += 1
+
+    def snapshot(self) -> List[Packet]:
+        """Buffered packets, oldest first (starts at a keyframe)"""
+        return [packet for gop in self.gops for packet in gop.packets]
+
+    @property
+    def seconds(self) -> float:
+        """Time span currently buffered"""
+        if not self.gops:
+            return 0.0
+        return self.gops[-1].packets[-1].timestamp - self.gops[0].start
+
+
+class _PendingClip:
+    __slots__ = ("path", "deadline", "packets")
+
+    def __init__(self, path: Path, deadline: float, packets: List[Packet]):
+        self.path = path
+        self.deadline = deadline
+        self.packets = packets
+
+
+def write_clip(packets: List[Packet], path: Path, fps: float) -> Path:
+    """
+    Write an H.264 Annex-B packet sequence to disk without re-encoding
+
+    Args:
+        packets: Packets starting at a keyframe
+        path: Destination (.mp4 is remuxed with ffmpeg, .h264 is written raw)
+        fps: Frame rate used for the MP4 timestamps (Annex-B carries none;
+            streams with B-frames may lose their first frames)
+
+    Returns:
+        Path of the written clip: path, or the raw .h264 next to it if the
+        remux fails (GET /incidents/{id}/clip falls back to it)
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    raw_path = path.with_suffix(".h264")
+    # Nombre temporal: el endpoint nunca ve un .h264 a medio escribir
+    part_path = path.with_name(f"{path.stem}.h264.part")
+    with part_path.open("wb") as f:
+        for packet in packets:
+            f.write(packet.data)
+    if path.suffix == ".h264":
+        part_path.replace(path)
+        return path
+
+    cmd = [
+        ffmpeg_executable(), "-y", "-loglevel", "error",
+        "-f", "h264", "-framerate", str(fps), "-i", str(part_path),
+        "-c", "copy", "-movflags", "+faststart", str(path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        logger.error(f"No se pudo remuxar el clip {path.name}, se conserva el H.264 crudo: {result.stderr[-500:]}")
+        path.unlink(missing_ok=True)
+        part_path.replace(raw_path)
+        return raw_path
+    part_path.unlink()
+    return path
+
+
+class ClipRecorder:
+    """Packet ring of one camera plus the clips waiting for their post-roll"""
+
+    def __init__(
+        self,
+        camera_id: str,
+        fps: float = 30,
+        pre_roll_seconds: Optional[float] = None,
+        post_roll_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Initialize recorder
+
+        Args:
+            camera_id: Camera identifier (used in clip file names)
+            fps: Stream frame rate (MP4 timestamps)
+            pre_roll_seconds: Seconds before the event (default settings)
+            post_roll_seconds: Seconds after the event (default settings)
+            max_bytes: Ring memory cap (default CLIP_BUFFER_MAX_MB)
+        """
+        self.camera_id = camera_id
+        self.fps = fps
+        self.pre_roll_seconds = pre_roll_seconds if pre_roll_seconds is not None else settings.clip_pre_roll_seconds
+        self.post_roll_seconds = post_roll_seconds if post_roll_seconds is not None else settings.clip_post_roll_seconds
+        self.ring = PacketRing(
+            self.pre_roll_seconds,
+            max_bytes if max_bytes is not None else settings.clip_buffer_max_mb * 1024 * 1024
+        )
+        self.pending: List[_PendingClip] = []
+        self._lock = threading.Lock()
+
+    def add_packet(self, data: bytes, keyframe: bool, timestamp: Optional[float] = None):
+        """Buffer one encoded packet (called from the packet reader thread)"""
+        packet = Packet(time.monotonic() if timestamp is None else timestamp, data, keyframe)
+        with self._lock:
+            self.ring.append(packet)
+            if not self.pending:
+                return
+            done = []
+            for clip in self.pending:
+                clip.packets.append(packet)
+                if packet.timestamp >= clip.deadline:
+                    done.append(clip)
+            for clip in done:
+                self.pending.remove(clip)
+                _writer.submit(write_clip, clip.packets, clip.path, self.fps)
+
+    def request_clip(self, now: Optional[float] = None, label: str = "") -> Optional[str]:
+        """
+        Start a clip around an event: the buffered pre-roll plus the post-roll
+
+        Args:
+            now: Event time on the packet clock (monotonic by default)
+            label: Extra file name component (e.g. the rule id)
+
+        Returns:
+            Path where the clip will be written once the post-roll arrives,
+            or None when nothing is buffered yet
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            packets = self.ring.snapshot()
+            if not packets:
+                return None
+            suffix = ".mp4" if ffmpeg_executable() else ".h264"
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            name = "_".join(part for part in ("clip", self.camera_id, label, stamp) if part)
+            path = CLIPS_DIR / f"{name}{suffix}"
+            self.pending.append(_PendingClip(path, now + self.post_roll_seconds, packets))
+        logger.info(f"🎬 Clip solicitado: {path.name} ({self.ring.seconds:.1f}s de pre-roll)")
+        return str(path)
+
+    def flush(self):
+        """Write pending clips with whatever post-roll arrived (stream stopped)"""
+        with self._lock:
+            pending, self.pending = self.pending, []
+        for clip in pending:
+            _writer.submit(write_clip, clip.packets, clip.path, self.fps)
+
+
+class ClipRegistry:
+    """ClipRecorder per camera being recorded"""
+
+    def __init__(self):
+        self.recorders: Dict[str, ClipRecorder] = {}
+
+    def get(self, camera_id: str) -> Optional[ClipRecorder]:
+        return self.recorders.get(camera_id)
+
+    def start(self, camera_id: str, fps: float = 30) -> ClipRecorder:
+        recorder = ClipRecorder(camera_id, fps)
+        self.recorders[camera_id] = recorder
+        return recorder
+
+    def stop(self, camera_id: str):
+        recorder = self.recorders.pop(camera_id, None)
+        if recorder is not None:
+            recorder.flush()
+
+    def request_clip(self, camera_id: str, label: str = "") -> Optional[str]:
+        """Clip path for an event on a camera, or None if it is not being recorded"""
+        recorder = self.recorders.get(camera_id)
+        return recorder.request_clip(label=label) if recorder is not None else None
+
+
+def read_packets(stream_url: str, recorder: ClipRecorder, stop_event: threading.Event):
+    """
+    Feed a recorder with the encoded packets of a stream (blocking; run in a thread)
+
+    Uses OpenCV's raw mode (CAP_PROP_FORMAT = -1): packets come out as
+    H.264/HEVC Annex-B without being decoded.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(stream_url, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    if not cap.isOpened():
+        logger.error(f"No se pudo abrir {stream_url} para grabar clips")
+        return
+    recorder.fps = cap.get(cv2.CAP_PROP_FPS) or recorder.fps
+    try:
+        while not stop_event.is_set():
+            ret, packet = cap.read()
+            if not ret:
+                break
+            recorder.add_packet(packet.tobytes(), bool(cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)))
+    finally:
+        cap.release()
+
+
+clip_registry = ClipRegistry()
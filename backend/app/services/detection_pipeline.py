@@ -0,0 +1,303 @@
+"""Detection Pipeline: camera frames -> tracks -> rules -> incidents -> alerts"""
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+from app.services.event_bus import (
+    EventBus,
+    OverflowPolicy,
+    DetectionEvent,
+    TrackStartedEvent,
+    TrackLoiteringEvent,
+    RuleFiredEvent,
+    IncidentCreatedEvent,
+    AlertRaisedEvent,
+)
+from app.services.clip_recorder import clip_registry
+from app.services.rule_engine import RuleEngine, DwellTimeRule, load_configured_rules
+from app.services.yolov8_detector import PersonTracker
+from app.services.zone_mapper import zone_registry, zone_statistics
+from app.utils.detections import Detections
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionPipeline:
+    """Wires detector, per-camera trackers, IncidentLogger and AlertService through the EventBus"""
+
+    def __init__(
+        self,
+        detector,
+        bus: EventBus,
+        incident_logger,
+        alert_service,
+        rule_engine: Optional[RuleEngine] = None,
+        detection_writer=None
+    ):
+        """
+        Initialize pipeline
+
+        Args:
+            detector: YOLOv8Detector instance
+            bus: Event bus shared by all stages
+            incident_logger: IncidentLogger that records rule incidents
+            alert_service: AlertService that raises alerts for incidents
+            rule_engine: Rules to evaluate (defaults to SYSTEM_CONFIG['rules'])
+            detection_writer: DetectionWriter that stores every tracked box (optional)
+        """
+        self.detector = detector
+        self.bus = bus
+        self.incident_logger = incident_logger
+        self.alert_service = alert_service
+        self.rule_engine = rule_engine or load_configured_rules()
+        self.detection_writer = detection_writer
+        self.trackers: Dict[str, PersonTracker] = {}
+        self.frame_counts: Dict[str, int] = {}
+        self.last_update: Dict[str, float] = {}
+        self.camera_stores: Dict[str, Optional[str]] = {}
+        # Un solo hilo de inferencia para todas las cámaras: el modelo no es thread-safe
+        # y así los frames en espera no ocupan el executor por defecto
+        self.inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+    async def start(self, max_queue_size: int = 1000):
+        """Subscribe incident and alert stages to the bus"""
+        # Incidentes y alertas no se pueden perder: política BLOCK
+        rules_sub = self.bus.subscribe(
+            "incident_logger",
+            TrackLoiteringEvent,
+            RuleFiredEvent,
+            max_queue_size=max_queue_size,
+            policy=OverflowPolicy.BLOCK
+        )
+        incident_sub = self.bus.subscribe(
+            "alert_service",
+            IncidentCreatedEvent,
+            max_queue_size=max_queue_size,
+            policy=OverflowPolicy.BLOCK
+        )
+        self.bus.add_consumer(rules_sub, self._on_rule_fired)
+        self.bus.add_consumer(incident_sub, self._on_incident)
+        if self.detection_writer is not None:
+            # Detecciones con pérdida: si el escritor se atrasa se descartan las más viejas
+            detections_sub = self.bus.subscribe(
+                "detection_writer",
+                DetectionEvent,
+                max_queue_size=max_queue_size
+            )
+            self.bus.add_consumer(detections_sub, self.detection_writer.on_detection_event)
+        logger.info("DetectionPipeline started")
+
+    async def stop(self):
+        """Stop all bus consumers and the inference thread"""
+        await self.bus.stop()
+        self.inference_executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("DetectionPipeline stopped")
+
+    def reload_rules(self):
+        """Rebuild rules from SYSTEM_CONFIG (track state restarts)"""
+        self.rule_engine = load_configured_rules()
+        self.trackers.clear()
+
+    def _get_tracker(self, camera_id: str):
+        """Get or create the tracker for a camera"""
+        tracker = self.trackers.get(camera_id)
+        if tracker is None:
+            tracker = PersonTracker()
+            self.trackers[camera_id] = tracker
+        return tracker
+
+    async def handle_frame(self, camera_id: str, frame, store_id: Optional[str] = None):
+        """
+        Frame callback for VideoProcessor.process_stream
+
+        Inference runs on the pipeline's single inference thread, shared by
+        every camera (restricted to the camera's ROIs when configured); events are published without waiting so slow
+        subscribers never stall the camera loop. store_id, when given,
+        tags the camera's events for per-store subscribers.
+        """
+        if store_id is not None:
+            self.camera_stores[camera_id] = store_id
+        loop = asyncio.get_running_loop()
+        detect = functools.partial(self.detector.detect_objects, frame, camera_id=camera_id, columnar=True)
+        result = await loop.run_in_executor(self.inference_executor, detect)
+        if not result.get("success"):
+            return
+
+        height, width = frame.shape[:2]
+        self.process_detections(camera_id, result["detections"], frame_size=(width, height))
+
+    def process_detections(
+        self,
+        camera_id: str,
+        detections: Union[Detections, list],
+        now: Optional[float] = None,
+        wall_time: Optional[datetime] = None,
+        frame_size: Optional[tuple] = None
+    ):
+        """
+        Track detections for a camera, evaluate rules and publish resulting events
+
+        Args:
+            camera_id: Source camera
+            detections: Detections for one frame (columnar, or a list of dicts)
+            now: Clock in seconds for dwell rules (monotonic time by default)
+            wall_time: Local time for after-hours rules (current time by default)
+            frame_size: (width, height) of the frame, enables zone attribution
+        """
+        frame_index = self.frame_counts.get(camera_id, 0) + 1
+        self.frame_counts[camera_id] = frame_index
+        now = now if now is not None else time.monotonic()
+
+        tracker = self._get_tracker(camera_id)
+        if frame_size is not None:
+            tracker.zone_map = zone_registry.get(camera_id, *frame_size)
+        tracked = tracker.update(detections)
+        self._record_zone_stats(camera_id, tracker, now)
+        matches = self.rule_engine.update(
+            camera_id,
+            tracker,
+            now,
+            wall_time or datetime.now()
+        )
+
+        store_id = self.camera_stores.get(camera_id)
+        self.bus.publish_nowait(DetectionEvent(
+            camera_id=camera_id,
+            store_id=store_id,
+            frame_index=frame_index,
+            detections=tracked
+        ))
+
+        for track_id in tracker.started_tracks:
+            track = tracker.tracks[track_id]
+            self.bus.publish_nowait(TrackStartedEvent(
+                camera_id=camera_id,
+                store_id=store_id,
+                track_id=track_id,
+                name=track["name"],
+                bbox=track["bbox"]
+            ))
+
+        for match in matches:
+            rule = match.rule
+            if rule.rule_type == DwellTimeRule.rule_type:
+                track = tracker.tracks.get(match.track_id, {})
+                self.bus.publish_nowait(TrackLoiteringEvent(
+                    camera_id=camera_id,
+                    store_id=store_id,
+                    track_id=match.track_id,
+                    name=track.get("name", f"Persona {match.track_id}"),
+                    duration_seconds=match.value,
+                    risk_level=rule.risk_level,
+                    bbox=track.get("bbox", ()),
+                    rule_id=rule.rule_id,
+                    zone=match.zone
+                ))
+            else:
+                self.bus.publish_nowait(RuleFiredEvent(
+                    camera_id=camera_id,
+                    store_id=store_id,
+                    rule_id=rule.rule_id,
+                    rule_type=rule.rule_type,
+                    incident_type=rule.incident_type,
+                    risk_level=rule.risk_level,
+                    description=match.description,
+                    track_id=match.track_id,
+                    zone=match.zone,
+                    value=match.value
+                ))
+
+    def _record_zone_stats(self, camera_id: str, tracker: PersonTracker, now: float):
+        """Feed per-zone entries and dwell time into zone_statistics"""
+        if tracker.zone_map is None:
+            return
+        for track_id in tracker.started_tracks:
+            zone_statistics.record_entry(camera_id, tracker.tracks[track_id]["zone"])
+        for _, zone in tracker.zone_changes:
+            zone_statistics.record_entry(camera_id, zone)
+
+        last = self.last_update.get(camera_id)
+        self.last_update[camera_id] = now
+        if last is not None:
+            zone_statistics.record_frame(camera_id, tracker.zone_map, tracker.last_zone_labels, now - last)
+
+    async def _resolve_store(self, camera_id: str) -> Optional[str]:
+        """Store of a camera: the one given at stream start, else the cameras table (cached)"""
+        if camera_id in self.camera_stores:
+            return self.camera_stores[camera_id]
+        store_id = None
+        if getattr(self.incident_logger, "persistent", False):
+            from sqlalchemy import select
+            from app.database.database import AsyncSessionLocal
+            from app.database.models import Camera
+
+            try:
+                async with AsyncSessionLocal() as session:
+                    store_id = await session.scalar(select(Camera.store_id).where(Camera.id == camera_id))
+            except Exception as e:
+                logger.warning(f"No se pudo resolver la tienda de {camera_id}: {e}")
+        self.camera_stores[camera_id] = store_id
+        return store_id
+
+    async def _on_rule_fired(self, event):
+        """Turn a fired rule (TrackLoiteringEvent or RuleFiredEvent) into an incident"""
+        detection_data = {"rule_id": event.rule_id, "track_id": event.track_id, "zone": event.zone}
+        if isinstance(event, TrackLoiteringEvent):
+            minutes = int(event.duration_seconds // 60)
+            seconds = int(event.duration_seconds % 60)
+            where = f" en {event.zone}" if event.zone else " en cámara"
+            incident_type = "loitering"
+            description = f"{event.name} permanece {minutes}m {seconds}s{where}"
+            detection_data.update({
+                "duration_seconds": event.duration_seconds,
+                "bbox": list(event.bbox)
+            })
+        else:
+            incident_type = event.incident_type
+            description = event.description
+            detection_data["value"] = event.value
+
+        # Cámaras en vivo: clip con pre/post-roll desde el buffer de paquetes
+        clip_path = clip_registry.request_clip(event.camera_id, label=event.rule_id)
+        if clip_path:
+            detection_data["clip_path"] = clip_path
+
+        store_id = event.store_id or await self._resolve_store(event.camera_id)
+        incident_id = self.incident_logger.log_incident(
+            camera_id=event.camera_id,
+            incident_type=incident_type,
+            risk_level=event.risk_level,
+            description=description,
+            detection_data=detection_data,
+            store_id=store_id
+        )
+        await self.bus.publish(IncidentCreatedEvent(
+            camera_id=event.camera_id,
+            store_id=store_id,
+            incident_id=incident_id,
+            incident_type=incident_type,
+            risk_level=event.risk_level,
+            description=description
+        ))
+
+    async def _on_incident(self, event: IncidentCreatedEvent):
+        """Raise an alert for a new incident"""
+        alert = self.alert_service.generate_alert(
+            incident_id=event.incident_id,
+            camera_id=event.camera_id,
+            risk_level=event.risk_level,
+            detection_summary=event.description or event.incident_type,
+            store_id=event.store_id
+        )
+        await self.bus.publish(AlertRaisedEvent(
+            camera_id=event.camera_id,
+            store_id=event.store_id,
+            alert_id=alert["id"],
+            incident_id=event.incident_id,
+            risk_level=event.risk_level,
+            notification_sent=alert["notification_sent"]
+        ))
@@ -0,0 +1,177 @@
+"""
+Detection Sidecar: per-frame boxes and tracks stored next to the original video
+
+Instead of re-encoding the whole video to burn boxes in, analysis writes a
+gzip'd JSON-lines file and the frontend draws the overlay on top of the
+original video. Layout:
+
+    {"type": "header", "version": 1, "fps": 30, "width": 1920, "height": 1080}
+    {"f": 12, "b": [[x1, y1, x2, y2], ...], "t": [3, 4], "s": [0, 7], "r": [4]}
+    ...
+    {"type": "tracks", "frames": 900, "tracks": {"3": {"name": "Persona 3", "color": "#1f77b4"}}}
+
+Frame lines are 1-based frame indexes. Only frames with detections are
+written. Per box they hold the track id ("t") and the whole seconds on
+screen ("s"). "r" lists the tracks already flagged by a rule. Burning the
+overlay into an MP4 stays available on demand with burn_in().
+"""
+import gzip
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+
+from app.services.annotation_renderer import HIGH_RISK_COLOR, AnnotationRenderer, track_label
+from app.services.video_encoder import open_video_writer
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+def bgr_to_hex(color: Sequence[int]) -> str:
+    """OpenCV BGR tuple -> '#rrggbb' for the browser"""
+    b, g, r = (int(c) for c in color)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def hex_to_bgr(value: str) -> Tuple[int, int, int]:
+    """'#rrggbb' -> OpenCV BGR tuple"""
+    r, g, b = (int(value[i:i + 2], 16) for i in (1, 3, 5))
+    return b, g, r
+
+
+class SidecarWriter:
+    """Streams one compact JSON line per frame into a .jsonl.gz file"""
+
+    def __init__(self, path: str, fps: float, width: int, height: int, compresslevel: int = 6):
+        """
+        Initialize writer
+
+        Args:
+            path: Destination file (conventionally *.jsonl.gz)
+            fps: Frame rate of the source video
+            width: Source frame width (box coordinates are in this space)
+            height: Source frame height
+            compresslevel: gzip level
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.path, "wt", encoding="utf-8", compresslevel=compresslevel)
+        self._write({"type": "header", "version": FORMAT_VERSION, "fps": fps, "width": width, "height": height})
+        self.frames_written = 0
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, separators=(",", ":")))
+        self._file.write("\n")
+
+    def write_frame(
+        self,
+        frame_index: int,
+        boxes: List[tuple],
+        track_ids: List[int],
+        seconds: List[int],
+        flagged: List[int]
+    ):
+        """Record the tracked boxes of one frame"""
+        record = {"f": frame_index, "b": boxes, "t": track_ids, "s": seconds}
+        if flagged:
+            record["r"] = flagged
+        self._write(record)
+        self.frames_written += 1
+
+    def close(self, tracks: Dict[int, dict], total_frames: int):
+        """
+        Write the track table and close the file
+
+        Args:
+            tracks: {track_id: {name, color (BGR)}} of every track seen
+            total_frames: Frames processed
+        """
+        self._write({
+            "type": "tracks",
+            "frames": total_frames,
+            "tracks": {
+                str(track_id): {"name": info["name"], "color": bgr_to_hex(info["color"])}
+                for track_id, info in tracks.items()
+            }
+        })
+        self._file.close()
+
+
+def read_sidecar(path: str) -> dict:
+    """
+    Load a sidecar file
+
+    Returns:
+        {"header": {...}, "frames": {frame_index: record}, "tracks": {track_id: {...}}}
+    """
+    result = {"header": {}, "frames": {}, "tracks": {}}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            kind = record.get("type")
+            if kind == "header":
+                result["header"] = record
+            elif kind == "tracks":
+                result["tracks"] = {int(k): v for k, v in record["tracks"].items()}
+                result["header"]["frames"] = record.get("frames")
+            else:
+                result["frames"][record["f"]] = record
+    return result
+
+
+def burn_in(video_path: str, sidecar_path: str, output_path: str, scale: Optional[float] = None) -> dict:
+    """
+    Export an annotated video from the original and its sidecar (no inference)
+
+    Args:
+        video_path: Original video the sidecar was computed on
+        sidecar_path: Detection sidecar
+        output_path: Annotated video to write
+        scale: Output scale (< 1 = smaller preview)
+
+    Returns:
+        {"success", "video_path", "frames"}
+    """
+    sidecar = read_sidecar(sidecar_path)
+    tracks = sidecar["tracks"]
+    colors_by_track = {track_id: hex_to_bgr(info["color"]) for track_id, info in tracks.items()}
+
+    cap = cv2.VideoCapture(str(video_path))
+    fps = sidecar["header"].get("fps") or cap.get(cv2.CAP_PROP_FPS) or 30
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    renderer = AnnotationRenderer(scale=scale or 1.0)
+    out = open_video_writer(str(output_path), fps, renderer.output_size(width, height))
+
+    frame_index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_index += 1
+            record = sidecar["frames"].get(frame_index)
+            if record is not None:
+                flagged = set(record.get("r", ()))
+                colors = [
+                    HIGH_RISK_COLOR if track_id in flagged else colors_by_track.get(track_id, (0, 255, 0))
+                    for track_id in record["t"]
+                ]
+                labels = [
+                    track_label(tracks.get(track_id, {}).get("name", f"Persona {track_id}"), secs)
+                    for track_id, secs in zip(record["t"], record["s"])
+                ]
+                frame = renderer.render(frame, record["b"], colors, labels)
+            elif renderer.scale != 1.0:
+                frame = renderer.render(frame, [], [])
+            out.write(frame)
+    finally:
+        cap.release()
+        out.release()
+
+    logger.info(f"🎞️ Video anotado exportado: {output_path} ({frame_index} frames)")
+    return {"success": True, "video_path": str(output_path), "frames": frame_index}
@@ -0,0 +1,216 @@
+"""
+Detection Writer: bulk persistence of per-frame detections
+
+Frames are buffered as columnar Detections (no per-box objects) and turned
+into rows only when a batch is written: one multi-row INSERT (executemany)
+per transaction, triggered when DETECTION_FLUSH_ROWS rows are waiting or
+every DETECTION_FLUSH_INTERVAL_SECONDS. Boxes go to four numeric columns.
+
+Detections are lossy by design (like DetectionEvent on the bus): if the
+database falls behind, the oldest frames beyond DETECTION_BUFFER_MAX_ROWS
+are dropped instead of growing memory without bound.
+
+Each transaction also updates the analytics rollups (see rollups.py), and
+the writer prunes expired minute buckets once an hour.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.detections import CLASS_NAMES, Detections
+
+logger = logging.getLogger(__name__)
+
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+def detection_rows(camera_id: str, timestamp: datetime, detections: Detections) -> List[dict]:
+    """
+    Rows of the detections table for one frame
+
+    Args:
+        camera_id: Source camera
+        timestamp: Frame time (UTC)
+        detections: Columnar detections of the frame
+
+    Returns:
+        One dict per box
+    """
+    count = len(detections)
+    class_ids = detections.class_ids.tolist()
+    track_ids = detections.track_ids.tolist() if detections.track_ids is not None else [None] * count
+    zones = detections.zones if detections.zones is not None else [None] * count
+    return [
+        {
+            "camera_id": camera_id,
+            "timestamp": timestamp,
+            "class_name": CLASS_NAMES.get(class_id, str(class_id)),
+            "confidence": confidence,
+            "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+            "track_id": track_id,
+            "zone": zone,
+        }
+        for (x1, y1, x2, y2), confidence, class_id, track_id, zone in zip(
+            detections.boxes.tolist(), detections.confidences.tolist(), class_ids, track_ids, zones
+        )
+    ]
+
+
+class DetectionWriter:
+    """Buffers detections of every camera and writes them in bulk transactions"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        flush_rows: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_rows: Optional[int] = None
+    ):
+        """
+        Initialize writer
+
+        Args:
+            session_factory: AsyncSession factory (app.database.database.AsyncSessionLocal by default)
+            flush_rows: Buffered rows that trigger a write (default settings)
+            flush_interval: Seconds between writes (default settings)
+            max_rows: Buffer cap; older frames are dropped beyond it (default settings)
+        """
+        self.session_factory = session_factory
+        self.flush_rows = flush_rows or settings.detection_flush_rows
+        self.flush_interval = flush_interval if flush_interval is not None else settings.detection_flush_interval_seconds
+        self.max_rows = max_rows or settings.detection_buffer_max_rows
+        self._frames: Deque[Tuple[str, datetime, Detections]] = deque()
+        self._rows = 0
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"written_rows": 0, "transactions": 0, "dropped_rows": 0, "failed_flushes": 0}
+
+    @property
+    def pending_rows(self) -> int:
+        """Rows waiting to be written"""
+        return self._rows
+
+    def add(self, camera_id: str, detections: Detections, timestamp: Optional[datetime] = None):
+        """Buffer the detections of one frame (frames without boxes are skipped)"""
+        if not len(detections):
+            return
+        self._frames.append((camera_id, timestamp or datetime.utcnow(), detections))
+        self._rows += len(detections)
+        while self._rows > self.max_rows and len(self._frames) > 1:
+            _, _, dropped = self._frames.popleft()
+            self._rows -= len(dropped)
+            self.stats["dropped_rows"] += len(dropped)
+        if self._wakeup is not None and self._rows >= self.flush_rows:
+            self._wakeup.set()
+
+    def on_detection_event(self, event):
+        """Bus handler for DetectionEvent"""
+        if event.detections is not None:
+            self.add(event.camera_id, event.detections, event.timestamp)
+
+    def _session_factory(self) -> Callable:
+        if self.session_factory is None:
+            from app.database.database import AsyncSessionLocal
+            self.session_factory = AsyncSessionLocal
+        return self.session_factory
+
+    async def start(self):
+        """Create the detections table if missing and start the background writer"""
+        if self._task is not None:
+            return
+        from app.database.models import Detection
+        from app.services import rollups
+
+        async with self._session_factory()() as session:
+            await session.run_sync(lambda s: Detection.__table__.create(s.connection(), checkfirst=True))
+            await rollups.create_tables(session)
+            await session.commit()
+
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="detection-writer")
+        logger.info(f"💾 Persistencia de detecciones activa ({self.flush_rows} filas o cada {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the background writer and write what is buffered"""
+        if self._task is not None:
+            # Sin cancelar: una escritura cortada a mitad de transacción deja la base bloqueada
+            task, self._task = self._task, None
+            self._wakeup.set()
+            await asyncio.gather(task, return_exceptions=True)
+        if self._frames and not await self.flush():
+            logger.error(f"❌ {self._rows} detecciones sin escribir al detener")
+
+    async def _run(self):
+        pruned_at = 0.0
+        # wait_for (Python 3.11) puede tragarse la cancelación si el evento se activa a la vez
+        while self._task is not None:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if time.monotonic() - pruned_at >= PRUNE_INTERVAL_SECONDS:
+                pruned_at = time.monotonic()
+                await self._prune_rollups()
+
+    async def _prune_rollups(self):
+        from app.services import rollups
+
+        try:
+            async with self._session_factory()() as session:
+                async with session.begin():
+                    deleted = await rollups.prune_minutes(session)
+        except Exception as e:
+            logger.error(f"Error al purgar rollups de minuto: {e}")
+            return
+        if deleted:
+            logger.info(f"🧹 {deleted} rollups de minuto purgados")
+
+    async def flush(self) -> bool:
+        """
+        Write buffered frames, about flush_rows rows per transaction
+
+        Returns:
+            True if the buffer was drained, False if a transaction failed (its
+            frames stay buffered and are retried on the next flush)
+        """
+        from sqlalchemy import insert
+        from app.database.models import Detection
+        from app.services import rollups
+
+        lock = self._flush_lock or asyncio.Lock()
+        async with lock:
+            while self._frames:
+                frames, rows = [], []
+                for frame in self._frames:
+                    frames.append(frame)
+                    rows.extend(detection_rows(*frame))
+                    if len(rows) >= self.flush_rows:
+                        break
+                try:
+                    async with self._session_factory()() as session:
+                        async with session.begin():
+                            await session.execute(insert(Detection.__table__), rows)
+                            await rollups.apply(session, rollups.count_detections(rows))
+                except Exception as e:
+                    self.stats["failed_flushes"] += 1
+                    logger.error(f"Error al guardar {len(rows)} detecciones (se reintentará): {e}")
+                    return False
+                # Los frames descartados por el tope mientras se escribía ya no están al frente
+                for frame in frames:
+                    if self._frames and self._frames[0] is frame:
+                        self._frames.popleft()
+                        self._rows -= len(frame[2])
+                self.stats["written_rows"] += len(rows)
+                self.stats["transactions"] += 1
+        return True
+
+
+detection_writer = DetectionWriter()
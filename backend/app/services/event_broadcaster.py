@@ -0,0 +1,198 @@
+"""Live Event Broadcasting Service (Server-Sent Events)"""
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+from itertools import islice
+from datetime import datetime
+from typing import Deque, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastEvent:
+    """Single event kept in the replay buffer"""
+
+    __slots__ = ("id", "event_type", "data", "camera_id", "store_id", "timestamp")
+
+    def __init__(
+        self,
+        event_id: int,
+        event_type: str,
+        data: dict,
+        camera_id: Optional[str] = None,
+        store_id: Optional[str] = None
+    ):
+        self.id = event_id
+        self.event_type = event_type
+        self.data = data
+        self.camera_id = camera_id
+        self.store_id = store_id
+        self.timestamp = datetime.utcnow()
+
+    def matches(self, camera_id: Optional[str] = None, store_id: Optional[str] = None) -> bool:
+        """Check event against subscriber filters"""
+        if camera_id and self.camera_id != camera_id:
+            return False
+        if store_id and self.store_id != store_id:
+            return False
+        return True
+
+    def to_sse(self) -> str:
+        """Serialize event in text/event-stream format"""
+        payload = json.dumps(self.data, default=str, ensure_ascii=False)
+        return f"id: {self.id}\nevent: {self.event_type}\ndata: {payload}\n\n"
+
+
+class EventSubscription:
+    """Bounded per-client queue bound to the event loop that created it"""
+
+    def __init__(
+        self,
+        camera_id: Optional[str] = None,
+        store_id: Optional[str] = None,
+        max_queue_size: int = 100
+    ):
+        self.camera_id = camera_id
+        self.store_id = store_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+
+    def _put(self, event: BroadcastEvent):
+        """Enqueue event, discarding the oldest one if the client is lagging"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def deliver(self, event: BroadcastEvent):
+        """Deliver event from any thread"""
+        if not event.matches(self.camera_id, self.store_id):
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self.loop:
+            self._put(event)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self, timeout: float) -> Optional[BroadcastEvent]:
+        """Wait for next event, returns None on timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroadcaster:
+    """Fan-out of incidents and alerts to live subscribers with Last-Event-ID replay"""
+
+    def __init__(self, buffer_size: int = 1000):
+        """
+        Initialize broadcaster
+
+        Args:
+            buffer_size: Number of recent events kept for reconnecting clients
+        """
+        self.buffer: Deque[BroadcastEvent] = deque(maxlen=buffer_size)
+        self.subscribers: List[EventSubscription] = []
+        self.last_event_id = 0
+        self._lock = threading.Lock()
+        logger.info("EventBroadcaster initialized")
+
+    def publish(
+        self,
+        event_type: str,
+        data: dict,
+        camera_id: Optional[str] = None,
+        store_id: Optional[str] = None
+    ) -> int:
+        """
+        Publish an event to the replay buffer and every live subscriber
+
+        Safe to call from synchronous code and from worker threads.
+
+        Args:
+            event_type: SSE event name (incident, alert)
+            data: JSON-serializable payload
+            camera_id: Source camera, used for filtering
+            store_id: Owning store, used for filtering
+
+        Returns:
+            Assigned event ID
+        """
+        with self._lock:
+            self.last_event_id += 1
+            event = BroadcastEvent(self.last_event_id, event_type, data, camera_id, store_id)
+            self.buffer.append(event)
+            subscribers = list(self.subscribers)
+
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+        return event.id
+
+    def subscribe(
+        self,
+        camera_id: Optional[str] = None,
+        store_id: Optional[str] = None,
+        last_event_id: Optional[int] = None,
+        max_queue_size: int = 100
+    ) -> tuple:
+        """
+        Register a subscriber and collect missed events atomically
+
+        Args:
+            camera_id: Only receive events from this camera
+            store_id: Only receive events from this store
+            last_event_id: Last event ID seen by the client (Last-Event-ID)
+            max_queue_size: Per-subscriber queue bound
+
+        Returns:
+            (subscription, list of buffered events newer than last_event_id)
+        """
+        subscription = EventSubscription(camera_id, store_id, max_queue_size)
+        with self._lock:
+            backlog = self._events_since(last_event_id, camera_id, store_id)
+            self.subscribers.append(subscription)
+        return subscription, backlog
+
+    def unsubscribe(self, subscription: EventSubscription):
+        """Remove a subscriber"""
+        with self._lock:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+
+    def replay(
+        self,
+        last_event_id: Optional[int] = None,
+        camera_id: Optional[str] = None,
+        store_id: Optional[str] = None
+    ) -> List[BroadcastEvent]:
+        """Get buffered events newer than last_event_id"""
+        with self._lock:
+            return self._events_since(last_event_id, camera_id, store_id)
+
+    def _events_since(
+        self,
+        last_event_id: Optional[int],
+        camera_id: Optional[str],
+        store_id: Optional[str]
+    ) -> List[BroadcastEvent]:
+        """Collect buffered events newer than last_event_id (lock must be held)"""
+        if last_event_id is None or not self.buffer:
+            return []
+
+        # IDs are consecutive, so the start offset is computed directly
+        start = max(0, last_event_id - self.buffer[0].id + 1)
+        return [e for e in islice(self.buffer, start, None) if e.matches(camera_id, store_id)]
+
+
+event_broadcaster = EventBroadcaster(buffer_size=settings.event_buffer_size)
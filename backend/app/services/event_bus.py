@@ -0,0 +1,287 @@
+"""In-process Event Bus connecting detection, tracking, incidents and alerts"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# EVENT TYPES
+# ============================================================================
+
+@dataclass
+class BusEvent:
+    """Base event; lossy events may be dropped under load instead of blocking"""
+    camera_id: str
+    timestamp: datetime = field(default_factory=datetime.utcnow, init=False)
+    store_id: Optional[str] = None  # tienda de la cámara (filtro del feed SSE)
+
+    lossy = False
+
+
+@dataclass
+class DetectionEvent(BusEvent):
+    """Raw detections for a single frame"""
+    frame_index: int = 0
+    detections: Any = None  # Detections (columnar) con track_ids del frame
+
+    lossy = True
+
+
+@dataclass
+class TrackStartedEvent(BusEvent):
+    """A new person track appeared"""
+    track_id: int = 0
+    name: str = ""
+    bbox: tuple = ()
+
+
+@dataclass
+class TrackLoiteringEvent(BusEvent):
+    """A track stayed longer than a dwell-time rule allows"""
+    track_id: int = 0
+    name: str = ""
+    duration_seconds: float = 0.0
+    risk_level: str = "high"
+    bbox: tuple = ()
+    rule_id: Optional[str] = None
+    zone: Optional[str] = None
+
+
+@dataclass
+class RuleFiredEvent(BusEvent):
+    """A non-dwell rule fired (person count, after hours)"""
+    rule_id: str = ""
+    rule_type: str = ""
+    incident_type: str = ""
+    risk_level: str = "high"
+    description: str = ""
+    track_id: Optional[int] = None
+    zone: Optional[str] = None
+    value: float = 0.0
+
+
+@dataclass
+class IncidentCreatedEvent(BusEvent):
+    """An incident was logged"""
+    incident_id: str = ""
+    incident_type: str = ""
+    risk_level: str = ""
+    description: Optional[str] = None
+
+
+@dataclass
+class AlertRaisedEvent(BusEvent):
+    """An alert was generated for an incident"""
+    alert_id: str = ""
+    incident_id: str = ""
+    risk_level: str = ""
+    notification_sent: bool = False
+
+
+# ============================================================================
+# BUS
+# ============================================================================
+
+class OverflowPolicy(str, Enum):
+    """What to do when a subscriber queue is full"""
+    DROP_OLDEST = "drop_oldest"
+    BLOCK = "block"
+
+
+class Subscription:
+    """Bounded queue receiving a subset of event types"""
+
+    def __init__(
+        self,
+        name: str,
+        event_types: Tuple[Type[BusEvent], ...],
+        max_queue_size: int,
+        policy: OverflowPolicy,
+        max_pending_puts: int = 1000
+    ):
+        self.name = name
+        self.event_types = event_types
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.pending_puts = 0  # puts diferidos en curso (preservan el orden)
+        self.max_pending_puts = max_pending_puts
+
+    def accepts(self, event: BusEvent) -> bool:
+        """Check if subscription wants this event type"""
+        return isinstance(event, self.event_types)
+
+    def put_drop_oldest(self, event: BusEvent):
+        """Enqueue without waiting, discarding the oldest queued event if full"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> BusEvent:
+        """Wait for next event"""
+        return await self.queue.get()
+
+
+class EventBus:
+    """Typed asyncio publish/subscribe bus with per-subscriber bounded queues"""
+
+    def __init__(self):
+        """Initialize event bus"""
+        self.subscriptions: List[Subscription] = []
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: set = set()
+        self._consumers: Dict[str, asyncio.Task] = {}
+        logger.info("EventBus initialized")
+
+    def subscribe(
+        self,
+        name: str,
+        *event_types: Type[BusEvent],
+        max_queue_size: int = 1000,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        max_pending_puts: int = 1000
+    ) -> Subscription:
+        """
+        Register a subscriber
+
+        Args:
+            name: Subscriber name (for logging and stats)
+            event_types: Event classes to receive (all events if empty)
+            max_queue_size: Queue bound
+            policy: Overflow policy for non-lossy events
+            max_pending_puts: BLOCK only: events waiting for room in a full
+                queue before publish_nowait starts dropping them
+
+        Returns:
+            Subscription whose queue receives matching events
+        """
+        subscription = Subscription(name, event_types or (BusEvent,), max_queue_size, policy, max_pending_puts)
+        self.subscriptions.append(subscription)
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber"""
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    async def publish(self, event: BusEvent):
+        """
+        Publish an event, waiting on BLOCK subscribers with full queues
+
+        Lossy events (detections) never wait; they always use drop-oldest.
+        """
+        for subscription in self.subscriptions:
+            if not subscription.accepts(event):
+                continue
+            if event.lossy or subscription.policy == OverflowPolicy.DROP_OLDEST:
+                subscription.put_drop_oldest(event)
+            else:
+                await subscription.queue.put(event)
+
+    def publish_nowait(self, event: BusEvent):
+        """
+        Publish without ever waiting (camera loop hot path)
+
+        A BLOCK subscriber with a full queue gets the event through a
+        pending put task, so it is delayed rather than lost and the
+        publisher is never back-pressured. Pending puts are capped per
+        subscriber; past max_pending_puts the event is dropped and counted.
+        """
+        for subscription in self.subscriptions:
+            if not subscription.accepts(event):
+                continue
+            if event.lossy or subscription.policy == OverflowPolicy.DROP_OLDEST:
+                subscription.put_drop_oldest(event)
+            elif not subscription.queue.full() and not subscription.pending_puts:
+                subscription.queue.put_nowait(event)
+            elif subscription.pending_puts < subscription.max_pending_puts:
+                self._defer_put(subscription, event)
+            else:
+                # Consumidor atascado: no acumular tareas sin límite
+                subscription.dropped += 1
+                logger.warning(
+                    f"⚠️ {subscription.name}: cola llena y {subscription.pending_puts} envíos pendientes, "
+                    f"evento {type(event).__name__} descartado (total descartados: {subscription.dropped})"
+                )
+
+    def _defer_put(self, subscription: Subscription, event: BusEvent):
+        """Queue a put task; asyncio.Queue wakes putters FIFO so order is kept"""
+        async def put():
+            try:
+                await subscription.queue.put(event)
+            finally:
+                subscription.pending_puts -= 1
+
+        subscription.pending_puts += 1
+        task = asyncio.get_running_loop().create_task(put())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def publish_threadsafe(self, event: BusEvent):
+        """Publish from a worker thread (e.g. inference executor)"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.publish_nowait, event)
+
+    def add_consumer(self, subscription: Subscription, handler) -> asyncio.Task:
+        """
+        Run handler(event) for every event delivered to subscription
+
+        Handler errors are logged and do not stop the consumer.
+        """
+        async def consume():
+            while True:
+                event = await subscription.get()
+                try:
+                    result = handler(event)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Error en consumidor {subscription.name}: {e}")
+                finally:
+                    subscription.queue.task_done()
+
+        task = asyncio.get_running_loop().create_task(consume())
+        self._consumers[subscription.name] = task
+        return task
+
+    async def drain(self):
+        """Wait until every subscriber queue has been processed"""
+        while self._pending:
+            await asyncio.gather(*list(self._pending))
+        for subscription in list(self.subscriptions):
+            await subscription.queue.join()
+
+    async def stop(self):
+        """Cancel consumers and drop all subscriptions"""
+        for task in self._consumers.values():
+            task.cancel()
+        await asyncio.gather(*self._consumers.values(), return_exceptions=True)
+        self._consumers.clear()
+        self.subscriptions.clear()
+        self.loop = None
+
+    def get_stats(self) -> dict:
+        """Queue depth and drop counters per subscriber"""
+        return {
+            s.name: {
+                "queued": s.queue.qsize(),
+                "max_queue_size": s.queue.maxsize,
+                "policy": s.policy.value,
+                "pending_puts": s.pending_puts,
+                "dropped": s.dropped
+            }
+            for s in self.subscriptions
+        }
+
+
+event_bus = EventBus()
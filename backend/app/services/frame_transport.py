@@ -0,0 +1,208 @@
+"""Shared-Memory Frame Transport: fixed-size ring buffers of decoded frames between processes"""
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WRITING = -1  # secuencia de un slot mientras el productor lo escribe
+
+
+@dataclass(frozen=True)
+class FrameRef:
+    """
+    Pointer to a frame inside a FrameRing (a few bytes instead of the frame)
+
+    Passed over multiprocessing queues or sockets; the consumer resolves it
+    with FrameRing.read().
+    """
+    ring_name: str
+    slot: int
+    sequence: int
+    camera_id: str
+    frame_index: int
+    timestamp: float
+
+
+class FrameRing:
+    """
+    Ring buffer of equally sized frames in one shared memory block
+
+    Layout: an int64 sequence number per slot followed by the slot pixels.
+    The producer marks a slot as being written, fills it and publishes a
+    new sequence number (seqlock), so a consumer that lags more than
+    `slots` frames behind detects the overwrite instead of reading a torn
+    frame.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, width: int, height: int, channels: int, slots: int, owner: bool):
+        self.shm = shm
+        self.name = shm.name
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.slots = slots
+        self.owner = owner
+        self.frame_shape = (height, width, channels)
+        self.frame_bytes = width * height * channels
+        self._header_bytes = self.header_size(slots)
+        self.sequences = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf)
+        self.frames = np.ndarray(
+            (slots, height, width, channels),
+            dtype=np.uint8,
+            buffer=shm.buf,
+            offset=self._header_bytes
+        )
+        self._next_slot = 0
+        self._next_sequence = 1
+
+    @staticmethod
+    def header_size(slots: int) -> int:
+        """Bytes of the sequence header, aligned to a cache line"""
+        return 64 * ((8 * slots + 63) // 64)
+
+    @classmethod
+    def create(cls, width: int, height: int, channels: int = 3, slots: int = 8) -> "FrameRing":
+        """Allocate a new ring (the creator unlinks it on close)"""
+        size = cls.header_size(slots) + slots * width * height * channels
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        ring = cls(shm, width, height, channels, slots, owner=True)
+        ring.sequences[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, width: int, height: int, channels: int = 3, slots: int = 8) -> "FrameRing":
+        """Open a ring created by another process"""
+        # Solo el creador debe liberar el bloque: abrirlo sin registrarlo en el
+        # resource_tracker, que si no lo borraría al salir este proceso
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args, **kwargs: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, width, height, channels, slots, owner=False)
+
+    def spec(self) -> dict:
+        """Arguments another process needs to attach()"""
+        return {
+            "name": self.name,
+            "width": self.width,
+            "height": self.height,
+            "channels": self.channels,
+            "slots": self.slots
+        }
+
+    # ------------------------------------------------------------------
+    # Producer
+    # ------------------------------------------------------------------
+
+    def acquire(self) -> Tuple[int, np.ndarray]:
+        """
+        Claim the next slot for writing
+
+        Returns:
+            (slot, writable view of the slot) - decode straight into it
+        """
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        self.sequences[slot] = WRITING
+        return slot, self.frames[slot]
+
+    def commit(self, slot: int, camera_id: str, frame_index: int, timestamp: Optional[float] = None) -> FrameRef:
+        """Publish a slot filled after acquire()"""
+        sequence = self._next_sequence
+        self._next_sequence += 1
+        self.sequences[slot] = sequence
+        return FrameRef(self.name, slot, sequence, camera_id, frame_index, timestamp or time.time())
+
+    def write(self, frame: np.ndarray, camera_id: str, frame_index: int = 0) -> FrameRef:
+        """Copy (or resize) a frame into the next slot"""
+        slot, view = self.acquire()
+        if frame.shape == self.frame_shape:
+            np.copyto(view, frame)
+        else:
+            cv2.resize(frame, (self.width, self.height), dst=view)
+        return self.commit(slot, camera_id, frame_index)
+
+    # ------------------------------------------------------------------
+    # Consumer
+    # ------------------------------------------------------------------
+
+    def is_current(self, ref: FrameRef) -> bool:
+        """True while the slot still holds the referenced frame"""
+        return int(self.sequences[ref.slot]) == ref.sequence
+
+    def read(self, ref: FrameRef, copy: bool = False) -> Optional[np.ndarray]:
+        """
+        Resolve a FrameRef
+
+        Args:
+            ref: Reference received from the producer
+            copy: Return a private copy (verified after copying) instead of a view
+
+        Returns:
+            The frame, or None if the producer already overwrote the slot.
+            A view stays valid only while is_current(ref) is True.
+        """
+        if not self.is_current(ref):
+            return None
+        view = self.frames[ref.slot]
+        if not copy:
+            return view
+        frame = view.copy()
+        return frame if self.is_current(ref) else None
+
+    def close(self):
+        """Detach (and free the block if this process created it)"""
+        self.sequences = None
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Aún hay vistas vivas del bloque; se libera al recolectarlas
+            logger.warning(f"Ring {self.name} cerrado con vistas activas")
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class FrameRingRegistry:
+    """Owns one ring per camera, sized to the camera resolution"""
+
+    def __init__(self, slots: int = 8):
+        self.slots = slots
+        self.rings: Dict[str, FrameRing] = {}
+
+    def create_for_camera(self, camera_id: str, width: int, height: int) -> FrameRing:
+        """Create (or recreate on resolution change) the ring of a camera"""
+        ring = self.rings.get(camera_id)
+        if ring is not None and (ring.width, ring.height) == (width, height):
+            return ring
+        if ring is not None:
+            ring.close()
+        ring = FrameRing.create(width, height, slots=self.slots)
+        self.rings[camera_id] = ring
+        logger.info(
+            f"🧩 Ring de frames para {camera_id}: {self.slots} slots de {width}x{height} "
+            f"({ring.shm.size / 1e6:.1f} MB)"
+        )
+        return ring
+
+    def close(self, camera_id: Optional[str] = None):
+        """Close one camera's ring, or all of them"""
+        for key in ([camera_id] if camera_id else list(self.rings)):
+            ring = self.rings.pop(key, None)
+            if ring is not None:
+                ring.close()
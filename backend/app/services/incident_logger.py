@@ -1,46 +1,210 @@
-"""Incident Logging Service"""
+"""
+Incident Logging Service
+
+Incidents are persisted to the `incidents` table through a write-behind
+queue: log_incident() returns the id right away and a background task
+inserts the queued incidents in batches, one transaction per batch, when
+INCIDENT_FLUSH_BATCH_SIZE incidents are waiting or every
+INCIDENT_FLUSH_INTERVAL_SECONDS. Operations are applied in the order they
+were logged and only leave the queue once their transaction commits, so a
+flush that fails (database down, locked) is retried in order. The same
+transaction adds the inserted incidents to the analytics rollups.
+
+The queue lives in memory only: a process crash loses what was not yet
+flushed (at most one interval or batch). A batch rejected by a constraint
+is split until the offending operations are isolated; those are moved to
+dead_letters (and logged) so the rest keeps flowing. If the database stays
+unavailable, operations beyond INCIDENT_QUEUE_MAX_SIZE are dropped, oldest
+first.
+
+Listings use keyset pagination on (timestamp, id), newest first: the
+cursor encodes the last row of a page, so every page is an index range
+scan instead of an OFFSET that grows with the page number. Reads do not
+flush: queued inserts and updates are merged into the results in memory.
+
+SQLAlchemy is imported when the flusher starts, not at import time.
+"""
+import asyncio
+import base64
+import json
 import logging
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Optional
+from itertools import islice
+from types import SimpleNamespace
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 import uuid
 
+from app.config import settings
+from app.services.event_broadcaster import event_broadcaster
+
 logger = logging.getLogger(__name__)
 
 
+def _to_row(incident: dict) -> dict:
+    """Incident dict -> incidents table row"""
+    return {
+        "id": incident["id"],
+        "camera_id": incident["camera_id"],
+        "store_id": incident["store_id"],
+        "incident_type": incident["incident_type"],
+        "risk_level": incident["risk_level"],
+        "description": incident["description"],
+        "detection_data": json.dumps(incident["detection_data"], default=str) if incident["detection_data"] is not None else None,
+        "timestamp": datetime.fromisoformat(incident["timestamp"]),
+        "status": incident["status"],
+        "user_confirmed": incident["user_confirmed"],
+        "resolved_at": datetime.fromisoformat(incident["resolved_at"]) if incident.get("resolved_at") else None,
+    }
+
+
+def _from_row(row) -> dict:
+    """Incident ORM row -> incident dict (same shape as log_incident)"""
+    incident = {
+        "id": row.id,
+        "camera_id": row.camera_id,
+        "store_id": row.store_id,
+        "incident_type": row.incident_type,
+        "risk_level": row.risk_level,
+        "description": row.description,
+        "detection_data": json.loads(row.detection_data) if row.detection_data else None,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+        "status": row.status,
+        "user_confirmed": row.user_confirmed,
+    }
+    if row.confirmed_at is not None:
+        incident["confirmation_timestamp"] = row.confirmed_at.isoformat()
+    if row.resolved_at is not None:
+        incident["resolved_at"] = row.resolved_at.isoformat()
+    return incident
+
+
+def _apply_update(incident: dict, values: dict) -> dict:
+    """Apply a queued "update" operation (table columns) to an incident dict"""
+    if "status" in values:
+        incident["status"] = values["status"]
+    if values.get("resolved_at") is not None:
+        incident["resolved_at"] = values["resolved_at"].isoformat()
+    if "user_confirmed" in values:
+        incident["user_confirmed"] = values["user_confirmed"]
+    if values.get("confirmed_at") is not None:
+        incident["confirmation_timestamp"] = values["confirmed_at"].isoformat()
+    return incident
+
+
+def _sort_key(incident: dict) -> Tuple[datetime, str]:
+    return datetime.fromisoformat(incident["timestamp"]), incident["id"]
+
+
+def encode_cursor(incident: dict) -> str:
+    """Opaque page cursor pointing after an incident (its timestamp and id)"""
+    raw = f"{incident['timestamp']}|{incident['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    (timestamp, id) of a cursor from encode_cursor()
+
+    Raises:
+        ValueError: Malformed cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, incident_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), incident_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
 class IncidentLogger:
     """Handles incident recording and database operations"""
-    
-    def __init__(self):
-        """Initialize incident logger"""
-        self.incidents = {}  # Temporary in-memory storage
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        cache_size: int = 1000
+    ):
+        """
+        Initialize incident logger
+
+        Args:
+            session_factory: AsyncSession factory (app.database.database.AsyncSessionLocal by default)
+            batch_size: Queued operations that trigger a flush (default settings)
+            flush_interval: Seconds between flushes (default settings)
+            cache_size: Recent incidents kept in memory for get_incident()
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.incident_flush_batch_size
+        self.flush_interval = flush_interval if flush_interval is not None else settings.incident_flush_interval_seconds
+        self.cache_size = cache_size
+        self.incidents: "OrderedDict[str, dict]" = OrderedDict()  # incidentes recientes
+        self._queue: Deque[Tuple[str, dict]] = deque()  # ("insert" | "update", datos), en orden
+        self.dead_letters: Deque[Tuple[str, dict]] = deque(maxlen=1000)  # rechazadas por restricciones
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"flushed": 0, "batches": 0, "failed_flushes": 0, "dead_lettered": 0, "dropped": 0}
         logger.info("IncidentLogger initialized")
-    
+
+    @property
+    def persistent(self) -> bool:
+        """True while incidents are written to the database (start() was called)"""
+        return self._task is not None
+
+    @property
+    def pending(self) -> int:
+        """Operations waiting to be written"""
+        return len(self._queue)
+
+    def _enqueue(self, kind: str, data: dict):
+        self._queue.append((kind, data))
+        if len(self._queue) > settings.incident_queue_max_size:
+            # Base de datos caída demasiado tiempo: descartar lo más viejo antes que crecer sin límite
+            dropped = self._queue.popleft()
+            self.stats["dropped"] += 1
+            logger.error(f"❌ Cola de incidentes llena, operación descartada: {dropped[0]} {dropped[1].get('id')}")
+        if self._wakeup is not None and len(self._queue) >= self.batch_size:
+            # log_incident puede llamarse desde hilos del executor
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _remember(self, incident: dict):
+        self.incidents[incident["id"]] = incident
+        while len(self.incidents) > self.cache_size:
+            self.incidents.popitem(last=False)
+
     def log_incident(
         self,
         camera_id: str,
         incident_type: str,
         risk_level: str,
         description: Optional[str] = None,
-        detection_data: Optional[dict] = None
+        detection_data: Optional[dict] = None,
+        store_id: Optional[str] = None
     ) -> str:
         """
-        Log an incident to the database
-        
+        Log an incident (queued for the database; returns immediately)
+
         Args:
             camera_id: Source camera ID
             incident_type: Type of incident (suspicious_behavior, etc.)
             risk_level: Risk level (low, medium, high)
             description: Detailed description
             detection_data: Additional detection information
-            
+            store_id: Owning store (used to filter live event subscribers)
+
         Returns:
             Incident ID
         """
         incident_id = f"INC-{uuid.uuid4().hex[:8].upper()}"
-        
+
         incident = {
             "id": incident_id,
             "camera_id": camera_id,
+            "store_id": store_id,
             "incident_type": incident_type,
             "risk_level": risk_level,
             "description": description,
@@ -49,42 +213,376 @@ class IncidentLogger:
             "status": "registered",
             "user_confirmed": None
         }
-        
-        self.incidents[incident_id] = incident
+
+        self._remember(incident)
+        self._enqueue("insert", _to_row(incident))
         logger.info(f"📋 Incident logged: {incident_id} ({risk_level} - {incident_type})")
-        
+
+        event_broadcaster.publish("incident", incident, camera_id=camera_id, store_id=store_id)
+
         return incident_id
-    
+
     def get_incident(self, incident_id: str) -> Optional[dict]:
-        """Retrieve incident by ID"""
+        """Retrieve a recent incident by ID (memory only, see fetch_incident)"""
         return self.incidents.get(incident_id)
-    
+
+    async def fetch_incident(self, incident_id: str) -> Optional[dict]:
+        """Retrieve incident by ID, from memory or from the database"""
+        incident = self.incidents.get(incident_id)
+        if incident is not None or self._task is None:
+            # Sin persistencia iniciada solo existen los incidentes en memoria
+            return incident
+        from app.database.models import Incident
+
+        inserts, updates = self._pending()
+        if incident_id in inserts:
+            return inserts[incident_id]
+        async with self._session_factory()() as session:
+            row = await session.get(Incident, incident_id)
+        if row is None:
+            return None
+        return _apply_update(_from_row(row), updates.get(incident_id, {}))
+
     def list_incidents(
         self,
         camera_id: Optional[str] = None,
         risk_level: Optional[str] = None,
         limit: int = 50
     ) -> list:
-        """List incidents with optional filters"""
+        """List recent incidents with optional filters"""
         incidents = list(self.incidents.values())
-        
+
         if camera_id:
             incidents = [i for i in incidents if i["camera_id"] == camera_id]
         if risk_level:
             incidents = [i for i in incidents if i["risk_level"] == risk_level]
-        
+
         return incidents[:limit]
-    
-    def confirm_incident(self, incident_id: str, confirmed: bool) -> Optional[dict]:
+
+    @staticmethod
+    def _matches(incident: dict, camera_id: Optional[str], risk_level: Optional[str], status: Optional[str]) -> bool:
+        return (
+            (not camera_id or incident["camera_id"] == camera_id)
+            and (not risk_level or incident["risk_level"] == risk_level)
+            and (not status or incident["status"] == status)
+        )
+
+    def _cached(self, camera_id: Optional[str], risk_level: Optional[str], status: Optional[str]) -> List[dict]:
+        """In-memory incidents matching the filters, newest first (flusher not started)"""
+        incidents = sorted(self.incidents.values(), key=lambda i: (i["timestamp"], i["id"]), reverse=True)
+        return [i for i in incidents if self._matches(i, camera_id, risk_level, status)]
+
+    def _pending(self) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+        """
+        Queued operations not yet written, for merging into reads
+
+        Returns:
+            (inserted incidents by id, with their queued updates applied;
+            merged update values by id)
+        """
+        inserts: Dict[str, dict] = {}
+        updates: Dict[str, dict] = {}
+        for kind, data in list(self._queue):
+            if kind == "insert":
+                # El dict en caché ya lleva las actualizaciones; los sembrados no están en caché
+                inserts[data["id"]] = self.incidents.get(data["id"]) or _from_row(SimpleNamespace(confirmed_at=None, **data))
+            else:
+                updates.setdefault(data["id"], {}).update(data)
+        for incident_id, values in updates.items():
+            if incident_id in inserts:
+                _apply_update(inserts[incident_id], values)
+        return inserts, updates
+
+    async def _pending_for_read(self, status: Optional[str]) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+        """_pending(); a queued status change under a status filter is written first (read-your-writes)"""
+        inserts, updates = self._pending()
+        if status and any("status" in values for incident_id, values in updates.items() if incident_id not in inserts):
+            # Un cambio de estado encolado puede sacar o meter filas del filtro en la base de datos
+            await self.flush()
+            inserts, updates = self._pending()
+        return inserts, updates
+
+    @staticmethod
+    def _filtered(query, camera_id: Optional[str], risk_level: Optional[str], status: Optional[str]):
+        from app.database.models import Incident
+
+        if camera_id:
+            query = query.where(Incident.camera_id == camera_id)
+        if risk_level:
+            query = query.where(Incident.risk_level == risk_level)
+        if status:
+            query = query.where(Incident.status == status)
+        return query
+
+    async def query_incidents(
+        self,
+        camera_id: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        offset: int = 0
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Page of incidents, newest first (keyset pagination)
+
+        Args:
+            camera_id: Filter by camera
+            risk_level: Filter by risk level
+            status: Filter by status
+            limit: Page size
+            cursor: next_cursor of the previous page
+            offset: Rows to skip (legacy offset pagination, cost grows with it)
+
+        Returns:
+            (incidents, next_cursor), next_cursor is None on the last page
+
+        Raises:
+            ValueError: Malformed cursor
+        """
+        after = decode_cursor(cursor) if cursor else None
+        if self._task is None:
+            # Sin persistencia iniciada: mismos resultados sobre los incidentes en memoria
+            incidents = [
+                i for i in self._cached(camera_id, risk_level, status)
+                if after is None or (datetime.fromisoformat(i["timestamp"]), i["id"]) < after
+            ][offset:offset + limit + 1]
+        else:
+            from sqlalchemy import or_, select
+            from app.database.models import Incident
+
+            # Lo encolado se mezcla en memoria: leer no fuerza una escritura
+            inserts, updates = await self._pending_for_read(status)
+            pending = [
+                i for i in inserts.values()
+                if self._matches(i, camera_id, risk_level, status) and (after is None or _sort_key(i) < after)
+            ]
+            query = self._filtered(select(Incident), camera_id, risk_level, status)
+            if after is not None:
+                timestamp, incident_id = after
+                # "timestamp <= t" aparte: SQLite no usa el índice como rango con un OR solo
+                query = query.where(
+                    Incident.timestamp <= timestamp,
+                    or_(Incident.timestamp < timestamp, Incident.id < incident_id)
+                )
+            query = query.order_by(Incident.timestamp.desc(), Incident.id.desc())
+            if pending:
+                # El offset se aplica después de mezclar
+                query = query.limit(offset + limit + 1)
+            else:
+                query = query.offset(offset).limit(limit + 1)
+            async with self._session_factory()() as session:
+                rows = (await session.execute(query)).scalars().all()
+            incidents = [_apply_update(_from_row(row), updates.get(row.id, {})) for row in rows]
+            if pending:
+                # Un lote recién escrito puede seguir en la cola hasta que termina el flush
+                merged = {i["id"]: i for i in incidents}
+                merged.update((i["id"], i) for i in pending)
+                incidents = sorted(merged.values(), key=_sort_key, reverse=True)[offset:offset + limit + 1]
+
+        page = incidents[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(incidents) > limit else None
+        return page, next_cursor
+
+    async def count_incidents(
+        self,
+        camera_id: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> int:
+        """Number of incidents matching the filters (total of the legacy offset listing)"""
+        if self._task is None:
+            return len(self._cached(camera_id, risk_level, status))
+
+        from sqlalchemy import func, select
+        from app.database.models import Incident
+
+        inserts, _ = await self._pending_for_read(status)
+        pending_ids = [i["id"] for i in inserts.values() if self._matches(i, camera_id, risk_level, status)]
+        query = self._filtered(select(func.count()).select_from(Incident), camera_id, risk_level, status)
+        async with self._session_factory()() as session:
+            total = (await session.execute(query)).scalar_one()
+            if pending_ids:
+                # Encolados que aún no están escritos (un flush en curso puede haberlos escrito ya)
+                written = (await session.execute(
+                    select(func.count()).select_from(Incident).where(Incident.id.in_(pending_ids))
+                )).scalar_one()
+                total += len(pending_ids) - written
+        return total
+
+    async def update_status(self, incident_id: str, status: str) -> Optional[dict]:
+        """Change the status of an incident (resolved sets resolved_at)"""
+        incident = await self.fetch_incident(incident_id)
+        if incident is None:
+            return None
+
+        values = {"status": status}
+        incident["status"] = status
+        if status == "resolved":
+            values["resolved_at"] = datetime.utcnow()
+            incident["resolved_at"] = values["resolved_at"].isoformat()
+        self._enqueue("update", {"id": incident_id, **values})
+        return incident
+
+    async def seed(self, incidents: List[dict]) -> int:
+        """
+        Insert incidents (same shape as log_incident) if the table is empty
+
+        Without a started flusher (database unavailable) they are kept in
+        the memory cache instead, so listings still have data.
+
+        Returns:
+            Number of incidents inserted
+        """
+        if self._task is None:
+            if self.incidents:
+                return 0
+            for incident in incidents[-self.cache_size:]:
+                self._remember(dict(incident))
+            return min(len(incidents), self.cache_size)
+
+        from sqlalchemy import select
+        from app.database.models import Incident
+
+        if any(kind == "insert" for kind, _ in self._queue):
+            return 0
+        async with self._session_factory()() as session:
+            if (await session.execute(select(Incident.id).limit(1))).first() is not None:
+                return 0
+        for incident in incidents:
+            self._enqueue("insert", _to_row(incident))
+        # Los escribe el flusher; las lecturas ya los ven desde la cola
+        self._wakeup.set()
+        return len(incidents)
+
+    async def confirm_incident(self, incident_id: str, confirmed: bool) -> Optional[dict]:
         """
         User confirms if incident was legitimate
         This data helps retrain the model
         """
-        if incident_id not in self.incidents:
+        incident = await self.fetch_incident(incident_id)
+        if incident is None:
             return None
-        
-        self.incidents[incident_id]["user_confirmed"] = confirmed
-        self.incidents[incident_id]["confirmation_timestamp"] = datetime.utcnow().isoformat()
+
+        confirmed_at = datetime.utcnow()
+        incident["user_confirmed"] = confirmed
+        incident["confirmation_timestamp"] = confirmed_at.isoformat()
+        self._enqueue("update", {"id": incident_id, "user_confirmed": confirmed, "confirmed_at": confirmed_at})
         logger.info(f"✅ Incident {incident_id} confirmed: {confirmed}")
-        
-        return self.incidents[incident_id]
+
+        return incident
+
+    def _session_factory(self) -> Callable:
+        if self.session_factory is None:
+            from app.database.database import AsyncSessionLocal
+            self.session_factory = AsyncSessionLocal
+        return self.session_factory
+
+    async def start(self):
+        """Create the incidents table if missing and start the background flusher"""
+        if self._task is not None:
+            return
+        from app.database.models import Incident
+        from app.services import rollups
+
+        factory = self._session_factory()
+        async with factory() as session:
+            await session.run_sync(lambda s: Incident.__table__.create(s.connection(), checkfirst=True))
+            await rollups.create_tables(session)
+            await session.commit()
+
+        self._loop = asyncio.get_running_loop()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="incident-flusher")
+        logger.info(f"💾 Persistencia de incidentes activa (lote {self.batch_size}, cada {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the flusher and write everything still queued"""
+        if self._task is not None:
+            # Sin cancelar: una escritura cortada a mitad de transacción deja la base bloqueada
+            task, self._task = self._task, None
+            self._wakeup.set()
+            await asyncio.gather(task, return_exceptions=True)
+        if self._queue and not await self.flush():
+            logger.error(f"❌ {len(self._queue)} operaciones de incidentes sin escribir al detener")
+
+    async def _run(self):
+        # wait_for (Python 3.11) puede tragarse la cancelación si el evento se activa a la vez
+        while self._task is not None:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """
+        Write queued operations, one transaction per batch, in order
+
+        Returns:
+            True if the queue was drained, False if a batch failed (it stays
+            queued and is retried on the next flush)
+        """
+        lock = self._flush_lock or asyncio.Lock()
+        async with lock:
+            while self._queue:
+                batch = list(islice(self._queue, self.batch_size))
+                try:
+                    await self._write_isolating(batch)
+                except Exception as e:
+                    self.stats["failed_flushes"] += 1
+                    logger.error(f"Error al guardar {len(batch)} operaciones de incidentes (se reintentará): {e}")
+                    return False
+        return True
+
+    async def _write_isolating(self, batch: List[Tuple[str, dict]]):
+        """Write batch (head of the queue); constraint violations are split down to single operations"""
+        from sqlalchemy.exc import IntegrityError
+
+        try:
+            await self._write_batch(batch)
+        except IntegrityError as e:
+            if len(batch) > 1:
+                # Cada mitad en su propia transacción, en orden
+                middle = len(batch) // 2
+                await self._write_isolating(batch[:middle])
+                await self._write_isolating(batch[middle:])
+                return
+            self.dead_letters.append(batch[0])
+            self.stats["dead_lettered"] += 1
+            logger.error(f"❌ Operación de incidente rechazada por la base de datos, descartada: {batch[0]} ({e.orig})")
+        else:
+            self.stats["flushed"] += len(batch)
+            self.stats["batches"] += 1
+        self._pop(batch)
+
+    def _pop(self, batch: List[Tuple[str, dict]]):
+        # Solo el flusher saca del frente; lo descartado por el tope mientras se escribía ya no está
+        for operation in batch:
+            if self._queue and self._queue[0] is operation:
+                self._queue.popleft()
+
+    async def _write_batch(self, batch: List[Tuple[str, dict]]):
+        from sqlalchemy import insert, update
+        from app.database.models import Incident
+        from app.services import rollups
+
+        async with self._session_factory()() as session:
+            async with session.begin():
+                # Los rollups se actualizan en la misma transacción que los incidentes
+                await rollups.apply(session, rollups.count_incidents(data for kind, data in batch if kind == "insert"))
+                rows: List[dict] = []
+                for kind, data in batch:
+                    if kind == "insert":
+                        rows.append(data)
+                        continue
+                    # Los inserts anteriores van primero (orden de llegada)
+                    if rows:
+                        await session.execute(insert(Incident), rows)
+                        rows = []
+                    values = {key: value for key, value in data.items() if key != "id"}
+                    await session.execute(update(Incident).where(Incident.id == data["id"]).values(**values))
+                if rows:
+                    await session.execute(insert(Incident), rows)
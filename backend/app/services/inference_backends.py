@@ -0,0 +1,420 @@
+"""
+Pluggable Inference Backends for the person detector (PyTorch, ONNX Runtime, OpenVINO)
+
+onnxruntime and openvino are optional (backend/requirements-inference.txt);
+each backend imports its runtime when it is created.
+"""
+import abc
+import logging
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.utils.boxes import nms
+
+logger = logging.getLogger(__name__)
+
+PERSON_CLASS_ID = 0
+LETTERBOX_COLOR = 114
+
+Prediction = Tuple[np.ndarray, np.ndarray]  # (boxes N x 4 xyxy float32, confidences N float32)
+
+
+# ============================================================================
+# NUMPY PRE/POST-PROCESSING
+# ============================================================================
+
+def load_images(source) -> List[np.ndarray]:
+    """
+    BGR arrays for a predict() source
+
+    Args:
+        source: One image or a list; each an array, a file path or a PIL image
+
+    Returns:
+        List of BGR images
+    """
+    if isinstance(source, (str, Path)) or (isinstance(source, np.ndarray) and source.ndim == 3) or hasattr(source, "convert"):
+        source = [source]
+    images = []
+    for item in source:
+        if isinstance(item, (str, Path)):
+            image = cv2.imread(str(item))
+            if image is None:
+                raise ValueError(f"No se pudo leer la imagen: {item}")
+        elif hasattr(item, "convert"):
+            # PIL: RGB -> BGR como los frames de OpenCV
+            image = cv2.cvtColor(np.asarray(item.convert("RGB")), cv2.COLOR_RGB2BGR)
+        else:
+            image = item
+        images.append(image)
+    return images
+
+
+def letterbox(image: np.ndarray, size: int = 640) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize keeping aspect ratio and pad to a size x size square
+
+    Args:
+        image: BGR image
+        size: Model input size
+
+    Returns:
+        (padded image, scale, (pad_x, pad_y))
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    if (new_w, new_h) != (width, height):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    padded = np.full((size, size, 3), LETTERBOX_COLOR, dtype=np.uint8)
+    padded[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = image
+    return padded, scale, (pad_x, pad_y)
+
+
+def to_input_tensor(images: Sequence[np.ndarray]) -> np.ndarray:
+    """Stack letterboxed BGR images into a normalized RGB NCHW float32 batch"""
+    batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+
+def decode_yolov8(
+    output: np.ndarray,
+    scale: float,
+    pad: Tuple[int, int],
+    image_size: Tuple[int, int],
+    conf_threshold: float,
+    iou_threshold: float,
+    class_id: int = PERSON_CLASS_ID,
+    max_det: int = 300
+) -> Prediction:
+    """
+    Decode one image of raw YOLOv8 output into person boxes
+
+    Args:
+        output: (4 + num_classes) x N array of cx, cy, w, h and class scores
+        scale: Letterbox scale
+        pad: Letterbox (pad_x, pad_y)
+        image_size: Original (width, height), boxes are clipped to it
+        conf_threshold: Minimum class score
+        iou_threshold: NMS IoU threshold
+        class_id: Class to keep (only boxes whose best class it is)
+        max_det: Maximum boxes returned
+
+    Returns:
+        (boxes N x 4 in original image pixels, confidences N)
+    """
+    class_scores = output[4:]
+    scores = class_scores[class_id]
+    mask = (scores > conf_threshold) & (class_scores.argmax(axis=0) == class_id)
+    if not mask.any():
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+    cx, cy, w, h = output[:4, mask]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    scores = scores[mask]
+
+    keep = nms(boxes, scores, iou_threshold)[:max_det]
+    boxes, scores = boxes[keep], scores[keep]
+
+    pad_x, pad_y = pad
+    boxes -= np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+    boxes /= scale
+    width, height = image_size
+    boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+    boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+    return boxes.astype(np.float32), scores.astype(np.float32)
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class InferenceBackend(abc.ABC):
+    """Runs the person detector on a batch of BGR images"""
+
+    name = "base"
+    precisions = ("fp32",)
+
+    def __init__(
+        self,
+        model_path: str,
+        conf_threshold: float = 0.5,
+        iou_threshold: float = 0.45,
+        image_size: int = 640,
+        precision: str = "fp32"
+    ):
+        """
+        Initialize backend
+
+        Args:
+            model_path: Model weights (e.g. yolov8m, yolov8m.pt) or an exported artifact
+            conf_threshold: Minimum confidence
+            iou_threshold: NMS IoU threshold
+            image_size: Model input size
+            precision: "fp32" or "int8" (quantized artifact from ml_models/training/quantize.py)
+        """
+        if precision not in self.precisions:
+            raise ValueError(f"El backend {self.name} no soporta precisión {precision}")
+        self.model_path = model_path
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.image_size = image_size
+        self.precision = precision
+
+    @abc.abstractmethod
+    def predict(self, source: Union[np.ndarray, str, Sequence]) -> List[Prediction]:
+        """
+        Detect persons
+
+        Args:
+            source: One image (array or path) or a list of them
+
+        Returns:
+            Per image, (boxes N x 4 float32, confidences N float32)
+        """
+
+
+class PyTorchBackend(InferenceBackend):
+    """ultralytics YOLO on PyTorch (original implementation)"""
+
+    name = "pytorch"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        from ultralytics import YOLO
+
+        self.model = YOLO(self.model_path)
+        self.model.fuse()
+        self.device = '0' if settings.use_gpu else 'cpu'
+
+    def predict(self, source) -> List[Prediction]:
+        results = self.model(
+            source,
+            conf=self.conf_threshold,
+            iou=self.iou_threshold,
+            imgsz=self.image_size,
+            max_det=300,
+            classes=[PERSON_CLASS_ID],
+            verbose=False,
+            device=self.device
+        )
+
+        outputs = []
+        for result in results:
+            if result.boxes is not None and len(result.boxes):
+                # Una sola copia GPU->CPU por imagen en lugar de una por caja
+                outputs.append((
+                    result.boxes.xyxy.cpu().numpy().astype(np.float32),
+                    result.boxes.conf.cpu().numpy().astype(np.float32)
+                ))
+            else:
+                outputs.append((np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)))
+        return outputs
+
+
+class _NumpyYoloBackend(InferenceBackend):
+    """Exported YOLOv8 graph with NumPy letterbox, decode and NMS"""
+
+    export_format = ""
+    batch_size: Optional[int] = None  # None = batch dinámico
+
+    def predict(self, source) -> List[Prediction]:
+        images = load_images(source)
+        prepared = [letterbox(image, self.image_size) for image in images]
+        raw = self._run_batches(to_input_tensor([p[0] for p in prepared]))
+
+        return [
+            decode_yolov8(
+                raw[i],
+                scale,
+                pad,
+                (image.shape[1], image.shape[0]),
+                self.conf_threshold,
+                self.iou_threshold
+            )
+            for i, (image, (_, scale, pad)) in enumerate(zip(images, prepared))
+        ]
+
+    def _model_file(self) -> Path:
+        """Exported FP32 artifact, or the quantized INT8 model"""
+        if self.precision == "int8":
+            return quantized_model_path(self.model_path)
+        return exported_model_path(self.model_path, self.export_format, self.image_size)
+
+    def _run_batches(self, batch: np.ndarray) -> np.ndarray:
+        """Run the graph, splitting the batch if the model has a fixed batch size"""
+        if self.batch_size is None or len(batch) == self.batch_size:
+            return self._run(batch)
+        return np.concatenate([
+            self._run(batch[i:i + self.batch_size]) for i in range(0, len(batch), self.batch_size)
+        ])
+
+    @abc.abstractmethod
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        """Raw model output, B x (4 + num_classes) x N"""
+
+
+class OnnxRuntimeBackend(_NumpyYoloBackend):
+    """ONNX Runtime CPU (or CUDA) execution of the exported model"""
+
+    name = "onnxruntime"
+    export_format = "onnx"
+    precisions = ("fp32", "int8")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import onnxruntime as ort
+
+        model_file = self._model_file()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.inference_threads:
+            options.intra_op_num_threads = settings.inference_threads
+
+        providers = ["CPUExecutionProvider"]
+        if settings.use_gpu and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+
+        self.session = ort.InferenceSession(str(model_file), sess_options=options, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.batch_size = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoBackend(_NumpyYoloBackend):
+    """OpenVINO CPU execution of the exported model"""
+
+    name = "openvino"
+    export_format = "openvino"
+    precisions = ("fp32", "int8")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import openvino as ov
+
+        # OpenVINO lee directamente el ONNX cuantizado (QDQ) y lo ejecuta en INT8
+        model_file = self._model_file()
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if settings.inference_threads:
+            config["INFERENCE_NUM_THREADS"] = settings.inference_threads
+
+        model = core.read_model(str(model_file))
+        batch = model.inputs[0].get_partial_shape()[0]
+        self.batch_size = None if batch.is_dynamic else batch.get_length()
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.output = self.compiled.output(0)
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self.compiled(batch)[self.output]
+
+
+BACKENDS = {
+    PyTorchBackend.name: PyTorchBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenVinoBackend.name: OpenVinoBackend,
+}
+
+
+# ============================================================================
+# EXPORT CACHE
+# ============================================================================
+
+def _weights_path(model_path: str) -> Path:
+    """ultralytics resolves a bare name such as 'yolov8m' to 'yolov8m.pt'"""
+    path = Path(model_path)
+    return path if path.suffix else path.with_suffix(".pt")
+
+
+def exported_model_path(model_path: str, export_format: str, image_size: int = 640) -> Path:
+    """
+    Exported artifact for model_path, exporting once if it is missing or stale
+
+    ONNX models are cached as <model>.onnx and OpenVINO models as
+    <model>_openvino_model/<model>.xml next to the weights. A path that
+    already points to an exported artifact is used as is.
+
+    Args:
+        model_path: Weights or exported artifact
+        export_format: "onnx" or "openvino"
+        image_size: Export input size
+
+    Returns:
+        Path of the file to load
+    """
+    path = Path(model_path)
+    if path.suffix in (".onnx", ".xml"):
+        return path
+    if path.is_dir() and path.name.endswith("_openvino_model"):
+        return path / f"{path.name[:-len('_openvino_model')]}.xml"
+
+    weights = _weights_path(model_path)
+    if export_format == "onnx":
+        target = weights.with_suffix(".onnx")
+    else:
+        target = weights.parent / f"{weights.stem}_openvino_model" / f"{weights.stem}.xml"
+
+    if target.exists() and (not weights.exists() or target.stat().st_mtime >= weights.stat().st_mtime):
+        return target
+
+    from ultralytics import YOLO
+
+    logger.info(f"📦 Exportando {weights} a {export_format} (una sola vez)...")
+    exported = Path(YOLO(str(weights)).export(format=export_format, imgsz=image_size, dynamic=True))
+    return exported if exported.suffix else exported / f"{weights.stem}.xml"
+
+
+def quantized_model_path(model_path: str) -> Path:
+    """
+    INT8 model produced by ml_models/training/quantize.py (<model>.int8.onnx)
+
+    Raises:
+        FileNotFoundError: If the model has not been quantized yet
+    """
+    path = Path(model_path)
+    if path.name.endswith(".int8.onnx"):
+        target = path
+    else:
+        target = _weights_path(model_path).with_suffix(".int8.onnx")
+    if not target.exists():
+        raise FileNotFoundError(
+            f"Modelo INT8 no encontrado: {target}. Genera uno con ml_models/training/quantize.py"
+        )
+    return target
+
+
+def create_backend(name: Optional[str] = None, model_path: Optional[str] = None) -> InferenceBackend:
+    """
+    Build the configured inference backend
+
+    Args:
+        name: Backend name (defaults to settings.inference_backend)
+        model_path: Weights (defaults to settings.yolo_model_path)
+
+    Returns:
+        Loaded backend
+    """
+    name = (name or settings.inference_backend).lower()
+    if name == "remote" and name not in BACKENDS:
+        import app.services.model_server  # noqa: F401  (registra RemoteBackend)
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de inferencia desconocido: {name} (opciones: {', '.join(BACKENDS)})")
+
+    backend = BACKENDS[name](
+        model_path or settings.yolo_model_path,
+        conf_threshold=settings.yolo_confidence_threshold,
+        iou_threshold=settings.yolo_iou_threshold,
+        image_size=settings.inference_image_size,
+        precision=settings.inference_precision
+    )
+    logger.info(f"Backend de inferencia: {name} ({backend.precision})")
+    return backend
@@ -0,0 +1,342 @@
+"""
+Shared Model Server: one process owns the detector model, API workers send it frames
+
+Run it next to the API (one per host):
+    python -m app.services.model_server
+
+and start the workers with INFERENCE_BACKEND=remote. Requests from every
+connected client are coalesced into a single batch (up to
+model_server_max_batch images, waiting at most model_server_max_wait_ms for
+more), so N workers share one copy of the model and the GPU/CPU sees larger
+batches.
+
+Wire format (both directions): 4-byte big-endian header length, JSON
+header, then raw payload bytes. A predict request carries the shape and
+dtype of each image in the header and the concatenated pixel buffers as
+payload; the response header carries boxes and scores per image.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.inference_backends import BACKENDS, InferenceBackend, Prediction, create_backend, load_images
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct(">I")
+
+
+# ============================================================================
+# PROTOCOL
+# ============================================================================
+
+def parse_address(address: str) -> Tuple[str, object]:
+    """
+    Parse 'unix:/path/to.sock' or 'tcp:host:port' (TCP for platforms without AF_UNIX)
+
+    Returns:
+        ("unix", path) or ("tcp", (host, port))
+    """
+    kind, _, rest = address.partition(":")
+    if kind == "unix":
+        return "unix", rest
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError(f"Dirección de model server inválida: {address}")
+
+
+def encode_images(images: List[np.ndarray]) -> Tuple[dict, List[memoryview]]:
+    """Header and zero-copy payload buffers for a predict request"""
+    arrays = [np.ascontiguousarray(image) for image in images]
+    header = {
+        "op": "predict",
+        "images": [{"shape": list(a.shape), "dtype": a.dtype.str} for a in arrays],
+    }
+    return header, [memoryview(a).cast("B") for a in arrays]
+
+
+def decode_images(header: dict, payload: bytes) -> List[np.ndarray]:
+    """Rebuild the images of a predict request (views over payload, no copy)"""
+    images, offset = [], 0
+    for spec in header["images"]:
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        images.append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset).reshape(spec["shape"]))
+        offset += count * dtype.itemsize
+    return images
+
+
+def payload_size(header: dict) -> int:
+    """Bytes of payload that follow a request header"""
+    return sum(int(np.prod(s["shape"])) * np.dtype(s["dtype"]).itemsize for s in header.get("images", []))
+
+
+def encode_predictions(predictions: List[Prediction]) -> dict:
+    """Response header for predictions"""
+    return {"results": [{"boxes": boxes.tolist(), "scores": scores.tolist()} for boxes, scores in predictions]}
+
+
+def decode_predictions(header: dict) -> List[Prediction]:
+    """Predictions from a response header"""
+    if "error" in header:
+        raise RuntimeError(f"Model server: {header['error']}")
+    return [
+        (np.asarray(r["boxes"], dtype=np.float32).reshape(-1, 4), np.asarray(r["scores"], dtype=np.float32))
+        for r in header["results"]
+    ]
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+@dataclass
+class _PendingRequest:
+    """Images of one client request waiting for the next batch"""
+    images: List[np.ndarray]
+    future: asyncio.Future
+
+
+class ModelServer:
+    """Asyncio socket server that batches predict requests from all clients"""
+
+    def __init__(
+        self,
+        backend: InferenceBackend,
+        address: str,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0
+    ):
+        """
+        Initialize server
+
+        Args:
+            backend: Loaded inference backend (the only copy of the model)
+            address: 'unix:/path' or 'tcp:host:port'
+            max_batch_size: Maximum images per model call
+            max_wait_ms: How long the first request of a batch waits for company
+        """
+        self.backend = backend
+        self.address = address
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: Optional[asyncio.Queue] = None
+        # Un único hilo: el modelo se ejecuta en serie, un lote a la vez
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-server")
+        self.stats = {"requests": 0, "images": 0, "batches": 0, "errors": 0}
+        self._server = None
+        self._batcher = None
+
+    async def start(self):
+        """Bind the socket and start the batching loop"""
+        self.queue = asyncio.Queue()
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._handle_client, path=target)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, *target)
+        self._batcher = asyncio.get_running_loop().create_task(self._batch_loop())
+        logger.info(f"🧠 Model server escuchando en {self.address} (backend {self.backend.name})")
+
+    async def stop(self):
+        """Close the socket and stop batching"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+        kind, target = parse_address(self.address)
+        if kind == "unix" and os.path.exists(target):
+            os.unlink(target)
+
+    async def serve_forever(self):
+        """Start and block until cancelled"""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def get_stats(self) -> dict:
+        """Request, image and batch counters"""
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "avg_batch_size": round(self.stats["images"] / batches, 2) if batches else 0.0,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "backend": self.backend.name,
+        }
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests from one client connection until it closes"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+                except asyncio.IncompleteReadError:
+                    break
+                header = json.loads(await reader.readexactly(length))
+
+                if header.get("op") == "stats":
+                    response = self.get_stats()
+                else:
+                    payload = await reader.readexactly(payload_size(header))
+                    request = _PendingRequest(decode_images(header, payload), loop.create_future())
+                    self.stats["requests"] += 1
+                    await self.queue.put(request)
+                    try:
+                        response = encode_predictions(await request.future)
+                    except Exception as e:
+                        response = {"error": str(e)}
+
+                body = json.dumps(response).encode()
+                writer.write(HEADER.pack(len(body)) + body)
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _batch_loop(self):
+        """Coalesce queued requests into batches and run the model"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            count = len(batch[0].images)
+            deadline = loop.time() + self.max_wait
+
+            while count < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(request)
+                count += len(request.images)
+
+            images = [image for request in batch for image in request.images]
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.backend.predict, images)
+            except Exception as e:
+                logger.error(f"Error en lote de inferencia: {e}")
+                self.stats["errors"] += 1
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["images"] += len(images)
+            offset = 0
+            for request in batch:
+                n = len(request.images)
+                # El cliente pudo desconectarse o cancelar mientras corría el lote
+                if not request.future.done():
+                    request.future.set_result(outputs[offset:offset + n])
+                offset += n
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class RemoteBackend(InferenceBackend):
+    """Inference backend that forwards images to the shared model server"""
+
+    name = "remote"
+    precisions = ("fp32", "int8")  # la precisión la decide el servidor
+
+    def __init__(self, *args, address: Optional[str] = None, timeout: Optional[float] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.address = address or settings.model_server_address
+        self.timeout = timeout or settings.model_server_timeout
+        # Una conexión por hilo: las peticiones de hilos distintos viajan en paralelo
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        kind, target = parse_address(self.address)
+        family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(target)
+        return sock
+
+    def _request(self, header: dict, buffers: List[memoryview] = ()) -> dict:
+        sock = getattr(self._local, "sock", None)
+        for attempt in range(2):
+            try:
+                if sock is None:
+                    sock = self._local.sock = self._connect()
+                body = json.dumps(header).encode()
+                sock.sendall(HEADER.pack(len(body)) + body)
+                for buffer in buffers:
+                    sock.sendall(buffer)
+                (length,) = HEADER.unpack(self._recv_exactly(sock, HEADER.size))
+                return json.loads(self._recv_exactly(sock, length))
+            except (ConnectionError, socket.timeout, OSError):
+                if sock is not None:
+                    sock.close()
+                sock = self._local.sock = None
+                if attempt:
+                    raise
+
+    @staticmethod
+    def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+        chunks, remaining = [], size
+        while remaining:
+            chunk = sock.recv(remaining)
+            if not chunk:
+                raise ConnectionError("Model server cerró la conexión")
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def predict(self, source) -> List[Prediction]:
+        # Rutas e imágenes PIL se decodifican aquí: el servidor solo recibe píxeles
+        header, buffers = encode_images(load_images(source))
+        return decode_predictions(self._request(header, buffers))
+
+    def server_stats(self) -> dict:
+        """Counters reported by the model server"""
+        return self._request({"op": "stats"})
+
+
+BACKENDS[RemoteBackend.name] = RemoteBackend
+
+
+def main():
+    """Load the configured model once and serve it"""
+    logging.basicConfig(level=settings.log_level)
+    backend = create_backend(settings.model_server_backend)
+    server = ModelServer(
+        backend,
+        settings.model_server_address,
+        max_batch_size=settings.model_server_max_batch,
+        max_wait_ms=settings.model_server_max_wait_ms
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Rollups: pre-aggregated detection and incident counters per camera and zone
+
+Every batch written by DetectionWriter and IncidentLogger also increments
+minute, hour and day buckets in the same transaction (an upsert per
+granularity), so analytics never scan the raw detections or incidents
+tables. A time window is answered by covering it with the coarsest
+buckets that fit: whole days, then whole hours, then minutes at the edges,
+which is a handful of index range scans for any window between 1 and 365
+days.
+
+Minute buckets are pruned after ROLLUP_MINUTE_RETENTION_DAYS; windows that
+start before that are rounded down to the hour.
+"""
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, select
+
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+from app.database.models import RollupDay, RollupHour, RollupMinute
+
+GRANULARITIES = ("day", "hour", "minute")  # de la más gruesa a la más fina
+MODELS = {"minute": RollupMinute, "hour": RollupHour, "day": RollupDay}
+STEPS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+COUNTERS = ("detections", "incidents_low", "incidents_medium", "incidents_high", "incidents_critical")
+INCIDENT_COUNTERS = {f"incidents_{level}": level for level in ("low", "medium", "high", "critical")}
+
+# (bucket de minuto, camera_id, zona) -> contadores
+Counts = Dict[Tuple[datetime, str, str], Dict[str, int]]
+
+
+def truncate(timestamp: datetime, granularity: str) -> datetime:
+    """Start of the bucket that contains timestamp"""
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def _ceil(timestamp: datetime, granularity: str) -> datetime:
+    start = truncate(timestamp, granularity)
+    if start == timestamp:
+        return start
+    return start + STEPS[granularity]
+
+
+def cover(start: datetime, end: datetime, granularities: Sequence[str] = GRANULARITIES) -> List[Tuple[str, datetime, datetime]]:
+    """
+    Split [start, end) into ranges of whole buckets, coarsest first
+
+    Returns:
+        [(granularity, bucket_from, bucket_to)]; the finest granularity
+        takes the partial buckets at the edges
+    """
+    if start >= end:
+        return []
+    granularity, finer = granularities[0], granularities[1:]
+    if not finer:
+        return [(granularity, truncate(start, granularity), end)]
+    lo, hi = _ceil(start, granularity), truncate(end, granularity)
+    if lo >= hi:
+        return cover(start, end, finer)
+    return cover(start, lo, finer) + [(granularity, lo, hi)] + cover(hi, end, finer)
+
+
+def count_detections(rows: Iterable[dict]) -> Counts:
+    """Counters of detections table rows (see detection_writer.detection_rows)"""
+    counts: Counts = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for row in rows:
+        counts[(truncate(row["timestamp"], "minute"), row["camera_id"], row["zone"] or "")]["detections"] += 1
+    return counts
+
+
+def count_incidents(rows: Iterable[dict]) -> Counts:
+    """Counters of incidents table rows (risk level per counter, zone from detection_data)"""
+    counts: Counts = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for row in rows:
+        counter = f"incidents_{row['risk_level']}"
+        if counter not in INCIDENT_COUNTERS:
+            continue
+        zone = (json.loads(row["detection_data"]) if row["detection_data"] else {}).get("zone") or ""
+        counts[(truncate(row["timestamp"], "minute"), row["camera_id"], zone)][counter] += 1
+    return counts
+
+
+def _upsert(dialect: str, table):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=["bucket_start", "camera_id", "zone"],
+        set_={counter: table.c[counter] + statement.excluded[counter] for counter in COUNTERS}
+    )
+
+
+async def apply(session, counts: Counts):
+    """Add counters to the minute, hour and day buckets (inside the caller's transaction)"""
+    if not counts:
+        return
+    dialect = (await session.connection()).dialect.name
+    for granularity, model in MODELS.items():
+        merged: Counts = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        for (minute, camera_id, zone), values in counts.items():
+            bucket = merged[(truncate(minute, granularity), camera_id, zone)]
+            for counter, value in values.items():
+                bucket[counter] += value
+        rows = [
+            {"bucket_start": bucket_start, "camera_id": camera_id, "zone": zone, **values}
+            for (bucket_start, camera_id, zone), values in merged.items()
+        ]
+        await session.execute(_upsert(dialect, model.__table__), rows)
+
+
+async def create_tables(session):
+    """Create the rollup tables if missing"""
+    def create(sync_session):
+        for model in MODELS.values():
+            model.__table__.create(sync_session.connection(), checkfirst=True)
+    await session.run_sync(create)
+
+
+async def prune_minutes(session, now: Optional[datetime] = None) -> int:
+    """Delete minute buckets older than ROLLUP_MINUTE_RETENTION_DAYS"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=settings.rollup_minute_retention_days)
+    result = await session.execute(delete(RollupMinute.__table__).where(RollupMinute.bucket_start < cutoff))
+    return result.rowcount
+
+
+def effective_start(start: datetime) -> datetime:
+    """Window start the rollups can answer: rounded down to the hour before the minute retention"""
+    if start < datetime.utcnow() - timedelta(days=settings.rollup_minute_retention_days):
+        return truncate(start, "hour")
+    return start
+
+
+def _for_cameras(query, table, camera_id: Optional[str], camera_ids: Optional[Sequence[str]]):
+    if camera_id:
+        query = query.where(table.c.camera_id == camera_id)
+    if camera_ids is not None:
+        query = query.where(table.c.camera_id.in_(list(camera_ids)))
+    return query
+
+
+async def totals(
+    session,
+    start: datetime,
+    end: datetime,
+    by: Sequence[str] = (),
+    camera_id: Optional[str] = None,
+    camera_ids: Optional[Sequence[str]] = None
+) -> Dict[tuple, Dict[str, int]]:
+    """
+    Summed counters of [start, end)
+
+    Args:
+        session: AsyncSession
+        start: Window start (UTC)
+        end: Window end (UTC)
+        by: Grouping columns, any of "camera_id" and "zone"
+        camera_id: Restrict to one camera
+        camera_ids: Restrict to these cameras (e.g. those of a store)
+
+    Returns:
+        {group values tuple: counters}; a single () key without grouping
+    """
+    result: Dict[tuple, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for granularity, lo, hi in cover(effective_start(start), end):
+        table = MODELS[granularity].__table__
+        group = [table.c[column] for column in by]
+        query = select(*group, *[func.sum(table.c[counter]) for counter in COUNTERS]).where(
+            table.c.bucket_start >= lo, table.c.bucket_start < hi
+        )
+        query = _for_cameras(query, table, camera_id, camera_ids)
+        if group:
+            query = query.group_by(*group)
+        for row in await session.execute(query):
+            sums = row[len(group):]
+            if sums[0] is None:
+                continue  # SUM sin filas
+            key = tuple(row[:len(group)])
+            for counter, value in zip(COUNTERS, sums):
+                result[key][counter] += value
+    return dict(result)
+
+
+async def series(
+    session,
+    start: datetime,
+    end: datetime,
+    granularity: str = "hour",
+    camera_id: Optional[str] = None,
+    camera_ids: Optional[Sequence[str]] = None
+) -> Dict[datetime, Dict[str, int]]:
+    """
+    Counters per bucket of one granularity between start and end
+
+    Returns:
+        {bucket_start: counters} for the buckets that have data
+    """
+    table = MODELS[granularity].__table__
+    query = select(table.c.bucket_start, *[func.sum(table.c[counter]) for counter in COUNTERS]).where(
+        table.c.bucket_start >= truncate(start, granularity), table.c.bucket_start < end
+    )
+    query = _for_cameras(query, table, camera_id, camera_ids)
+    query = query.group_by(table.c.bucket_start)
+    return {
+        # SQLite puede devolver la columna agrupada como texto
+        (row[0] if isinstance(row[0], datetime) else datetime.fromisoformat(row[0])): dict(zip(COUNTERS, row[1:]))
+        for row in await session.execute(query)
+    }
+
+
+def by_local_hour(hourly: Dict[datetime, Dict[str, int]], tz: str = "UTC") -> Dict[int, Dict[str, int]]:
+    """
+    Fold hour buckets (UTC, as returned by series) into hours of the day in a timezone
+
+    Args:
+        hourly: {bucket_start: counters} of granularity "hour"
+        tz: IANA timezone name
+
+    Returns:
+        {local hour 0-23: summed counters}
+    """
+    zone = ZoneInfo(tz)
+    result: Dict[int, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for bucket, counters in hourly.items():
+        hour = bucket.replace(tzinfo=timezone.utc).astimezone(zone).hour
+        for counter, value in counters.items():
+            result[hour][counter] += value
+    return dict(result)
@@ -0,0 +1,341 @@
+"""Incremental Risk Rule Engine evaluated on tracker state changes"""
+import heapq
+import itertools
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ALL_CAMERAS = "*"
+
+
+# ============================================================================
+# RULES
+# ============================================================================
+
+@dataclass
+class Rule:
+    """Base rule; camera_id '*' applies to every camera, zone None to the whole frame"""
+    rule_id: str
+    camera_id: str = ALL_CAMERAS
+    zone: Optional[str] = None
+    risk_level: str = "high"
+    incident_type: str = "suspicious_behavior"
+
+    rule_type = "base"
+
+
+@dataclass
+class DwellTimeRule(Rule):
+    """Fires once per track when it stays longer than min_seconds (in zone if set)"""
+    min_seconds: float = 300.0
+    incident_type: str = "loitering"
+
+    rule_type = "dwell_time"
+
+
+@dataclass
+class PersonCountRule(Rule):
+    """Fires when simultaneous persons exceed max_persons; re-arms when count drops"""
+    max_persons: int = 10
+    incident_type: str = "crowd_formation"
+
+    rule_type = "person_count"
+
+
+@dataclass
+class AfterHoursRule(Rule):
+    """Fires once per track that appears between start_hour and end_hour (local time)"""
+    start_hour: int = 22
+    end_hour: int = 6
+    incident_type: str = "unauthorized_access"
+
+    rule_type = "after_hours"
+
+    def is_active(self, wall_time: datetime) -> bool:
+        """Check if wall_time falls in the after-hours window (may cross midnight)"""
+        hour = wall_time.hour
+        if self.start_hour <= self.end_hour:
+            return self.start_hour <= hour < self.end_hour
+        return hour >= self.start_hour or hour < self.end_hour
+
+
+RULE_TYPES = {
+    DwellTimeRule.rule_type: DwellTimeRule,
+    PersonCountRule.rule_type: PersonCountRule,
+    AfterHoursRule.rule_type: AfterHoursRule,
+}
+
+
+def rule_from_dict(data: dict) -> Rule:
+    """
+    Build a rule from its configuration dict
+
+    Example:
+        {"id": "loitering", "type": "dwell_time", "camera_id": "*", "min_seconds": 300}
+    """
+    config = dict(data)
+    rule_type = config.pop("type")
+    if rule_type not in RULE_TYPES:
+        raise ValueError(f"Tipo de regla desconocido: {rule_type}")
+    config["rule_id"] = config.pop("id", config.get("rule_id"))
+    config.pop("enabled", None)
+    return RULE_TYPES[rule_type](**config)
+
+
+@dataclass
+class RuleMatch:
+    """A rule that fired"""
+    rule: Rule
+    camera_id: str
+    track_id: Optional[int] = None
+    zone: Optional[str] = None
+    value: float = 0.0  # segundos de permanencia o número de personas
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def description(self) -> str:
+        """Human readable summary"""
+        where = f" en {self.zone}" if self.zone else ""
+        if self.rule.rule_type == DwellTimeRule.rule_type:
+            minutes, seconds = int(self.value // 60), int(self.value % 60)
+            return f"Persona {self.track_id} permanece {minutes}m {seconds}s{where}"
+        if self.rule.rule_type == PersonCountRule.rule_type:
+            return f"{int(self.value)} personas simultáneas{where} (máximo {self.rule.max_persons})"
+        return f"Persona {self.track_id} detectada fuera de horario{where}"
+
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+class _TrackState:
+    """Per-track state kept by the engine"""
+    __slots__ = ("started_at", "zone", "zone_since", "zone_epoch")
+
+    def __init__(self, now: float, zone: Optional[str]):
+        self.started_at = now
+        self.zone = zone
+        self.zone_since = now
+        self.zone_epoch = 0
+
+
+class _CameraState:
+    """Per-camera tracks, dwell deadlines and fired rules"""
+
+    def __init__(self):
+        self.tracks: Dict[int, _TrackState] = {}
+        self.zone_counts: Dict[str, int] = defaultdict(int)
+        # (due_time, seq, track_id, rule, zone_epoch)
+        self.deadlines: List[tuple] = []
+        self.fired: Dict[int, set] = defaultdict(set)  # track_id -> rule_ids disparadas
+        self.count_active: set = set()  # rule_ids currently over threshold
+
+
+class RuleEngine:
+    """
+    Evaluates rules incrementally
+
+    Work is only done on tracker transitions (track started/ended, zone
+    changed) and on dwell deadlines popped from a per-camera heap, so the
+    per-frame cost does not grow with the number of tracks or rules.
+    """
+
+    def __init__(self, rules: Iterable[Rule] = ()):
+        """Initialize engine with an optional set of rules"""
+        self.rules_by_camera: Dict[str, List[Rule]] = defaultdict(list)
+        self._resolved: Dict[str, Dict[str, List[Rule]]] = {}
+        self.cameras: Dict[str, _CameraState] = defaultdict(_CameraState)
+        self._seq = itertools.count()
+        for rule in rules:
+            self.add_rule(rule)
+
+    @classmethod
+    def from_config(cls, definitions: Iterable[dict]) -> "RuleEngine":
+        """Build engine from rule definitions (SYSTEM_CONFIG['rules'])"""
+        rules = [rule_from_dict(d) for d in definitions if d.get("enabled", True)]
+        return cls(rules)
+
+    def add_rule(self, rule: Rule):
+        """Register a rule"""
+        self.rules_by_camera[rule.camera_id].append(rule)
+        self._resolved.clear()
+
+    def _rules_for(self, camera_id: str) -> Dict[str, List[Rule]]:
+        """Rules applying to a camera grouped by type (cached)"""
+        resolved = self._resolved.get(camera_id)
+        if resolved is None:
+            resolved = defaultdict(list)
+            rules = self.rules_by_camera.get(ALL_CAMERAS, []) + self.rules_by_camera.get(camera_id, [])
+            for rule in rules:
+                resolved[rule.rule_type].append(rule)
+            self._resolved[camera_id] = resolved
+        return resolved
+
+    # ------------------------------------------------------------------
+    # Tracker transitions
+    # ------------------------------------------------------------------
+
+    def on_track_started(
+        self,
+        camera_id: str,
+        track_id: int,
+        now: float,
+        zone: Optional[str] = None,
+        wall_time: Optional[datetime] = None
+    ) -> List[RuleMatch]:
+        """Register a new track"""
+        state = self.cameras[camera_id]
+        state.tracks[track_id] = _TrackState(now, zone)
+        rules = self._rules_for(camera_id)
+
+        for rule in rules[DwellTimeRule.rule_type]:
+            if rule.zone is None:
+                self._schedule(state, rule, track_id, now + rule.min_seconds, 0)
+        self._schedule_zone_dwell(state, rules, track_id, zone, now, 0)
+
+        matches = self._count_changed(camera_id, state, rules, zone, +1)
+        matches.extend(self._check_after_hours(camera_id, state, rules, track_id, zone, wall_time))
+        return matches
+
+    def on_track_ended(self, camera_id: str, track_id: int) -> List[RuleMatch]:
+        """Forget a track; its pending deadlines become stale"""
+        state = self.cameras[camera_id]
+        track = state.tracks.pop(track_id, None)
+        if track is None:
+            return []
+        rules = self._rules_for(camera_id)
+        matches = self._count_changed(camera_id, state, rules, track.zone, -1)
+        state.fired.pop(track_id, None)
+        return matches
+
+    def on_zone_changed(
+        self,
+        camera_id: str,
+        track_id: int,
+        zone: Optional[str],
+        now: float,
+        wall_time: Optional[datetime] = None
+    ) -> List[RuleMatch]:
+        """Move a track to another zone (None when outside every zone)"""
+        state = self.cameras[camera_id]
+        track = state.tracks.get(track_id)
+        if track is None or track.zone == zone:
+            return []
+
+        rules = self._rules_for(camera_id)
+        matches = self._count_changed(camera_id, state, rules, track.zone, -1)
+        track.zone = zone
+        track.zone_since = now
+        track.zone_epoch += 1
+        self._schedule_zone_dwell(state, rules, track_id, zone, now, track.zone_epoch)
+        matches.extend(self._count_changed(camera_id, state, rules, zone, +1))
+        matches.extend(self._check_after_hours(camera_id, state, rules, track_id, zone, wall_time))
+        return matches
+
+    def advance(self, camera_id: str, now: float) -> List[RuleMatch]:
+        """Fire dwell rules whose deadline has passed"""
+        state = self.cameras.get(camera_id)
+        if state is None:
+            return []
+
+        matches = []
+        deadlines = state.deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, _, track_id, rule, epoch = heapq.heappop(deadlines)
+            track = state.tracks.get(track_id)
+            if track is None or (rule.zone is not None and (track.zone != rule.zone or track.zone_epoch != epoch)):
+                continue  # deadline obsoleto
+            fired = state.fired[track_id]
+            if rule.rule_id in fired:
+                continue
+            fired.add(rule.rule_id)
+            since = track.zone_since if rule.zone is not None else track.started_at
+            matches.append(RuleMatch(rule, camera_id, track_id, track.zone, now - since))
+        return matches
+
+    def update(self, camera_id: str, tracker, now: float, wall_time: Optional[datetime] = None) -> List[RuleMatch]:
+        """
+        Consume the transitions of the last PersonTracker.update() call
+
+        Args:
+            camera_id: Camera the tracker belongs to
+            tracker: PersonTracker after update()
+            now: Clock in seconds (video time or monotonic time)
+            wall_time: Local time for after-hours rules (None disables them)
+
+        Returns:
+            Rules fired by this update
+        """
+        matches = []
+        for track_id in tracker.ended_tracks:
+            matches.extend(self.on_track_ended(camera_id, track_id))
+        for track_id in tracker.started_tracks:
+            zone = tracker.tracks[track_id].get('zone')
+            matches.extend(self.on_track_started(camera_id, track_id, now, zone, wall_time))
+        for track_id, zone in getattr(tracker, 'zone_changes', ()):
+            matches.extend(self.on_zone_changed(camera_id, track_id, zone, now, wall_time))
+        matches.extend(self.advance(camera_id, now))
+        return matches
+
+    def reset_camera(self, camera_id: str):
+        """Drop all state for a camera (e.g. when its stream restarts)"""
+        self.cameras.pop(camera_id, None)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _schedule(self, state: _CameraState, rule: Rule, track_id: int, due: float, epoch: int):
+        heapq.heappush(state.deadlines, (due, next(self._seq), track_id, rule, epoch))
+
+    def _schedule_zone_dwell(self, state, rules, track_id, zone, now, epoch):
+        if zone is None:
+            return
+        for rule in rules[DwellTimeRule.rule_type]:
+            if rule.zone == zone:
+                self._schedule(state, rule, track_id, now + rule.min_seconds, epoch)
+
+    def _count_changed(self, camera_id, state, rules, zone, delta) -> List[RuleMatch]:
+        count_rules = rules[PersonCountRule.rule_type]
+        if zone is not None:
+            state.zone_counts[zone] += delta
+        total = len(state.tracks)
+
+        matches = []
+        for rule in count_rules:
+            count = total if rule.zone is None else state.zone_counts[rule.zone]
+            if count > rule.max_persons:
+                if rule.rule_id not in state.count_active:
+                    state.count_active.add(rule.rule_id)
+                    matches.append(RuleMatch(rule, camera_id, None, rule.zone, count))
+            else:
+                state.count_active.discard(rule.rule_id)
+        return matches
+
+    def _check_after_hours(self, camera_id, state, rules, track_id, zone, wall_time) -> List[RuleMatch]:
+        if wall_time is None:
+            return []
+        matches = []
+        for rule in rules[AfterHoursRule.rule_type]:
+            if rule.zone is not None and rule.zone != zone:
+                continue
+            fired = state.fired[track_id]
+            if rule.rule_id in fired or not rule.is_active(wall_time):
+                continue
+            fired.add(rule.rule_id)
+            matches.append(RuleMatch(rule, camera_id, track_id, zone))
+        return matches
+
+
+def load_configured_rules() -> RuleEngine:
+    """Build a RuleEngine from SYSTEM_CONFIG['rules']"""
+    from app.data import SYSTEM_CONFIG
+
+    rules_config = SYSTEM_CONFIG.get("rules", {})
+    if not rules_config.get("enabled", True):
+        return RuleEngine()
+    return RuleEngine.from_config(rules_config.get("definitions", []))
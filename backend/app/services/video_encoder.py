@@ -0,0 +1,239 @@
+"""
+Video Encoder: output writers for annotated videos
+
+Frames are piped raw (BGR24) into an ffmpeg subprocess that encodes H.264
+(libx264, yuv420p, +faststart), so a single pass produces a small file that
+browsers play directly. The binary comes from imageio_ffmpeg (as in
+frontend/scripts/transcode_videos.py) or the PATH; without one, the
+cv2.VideoWriter H264 -> MJPG -> default codec chain is used.
+
+An output path ending in .m3u8 produces HLS instead: ffmpeg closes a
+fMP4 segment every HLS_SEGMENT_SECONDS of video and appends it to an
+"event" playlist, so the first minutes of a long recording can be played while the
+rest is still being analyzed. The H.264 level is the lowest one whose frame
+size and macroblock rate limits fit the video; players read it back from
+the avcC box of init.mp4.
+"""
+import logging
+import math
+import shutil
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_executable() -> Optional[str]:
+    """Path to an ffmpeg binary (imageio_ffmpeg first, then PATH), or None"""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which("ffmpeg")
+
+
+class FFmpegWriter:
+    """
+    cv2.VideoWriter-compatible writer that pipes raw frames into ffmpeg
+
+    Args:
+        output_path: Destination file (.mp4)
+        fps: Frames per second
+        size: (width, height) of the frames that will be written
+        preset: libx264 preset
+        crf: libx264 constant rate factor (lower = better quality, bigger file)
+        executable: ffmpeg binary (default: ffmpeg_executable())
+        output_args: Muxer options placed before output_path (default: faststart MP4)
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        fps: float,
+        size: Tuple[int, int],
+        preset: str = "veryfast",
+        crf: int = 23,
+        executable: Optional[str] = None,
+        output_args: Optional[List[str]] = None
+    ):
+        self.output_path = output_path
+        self.size = tuple(size)
+        width, height = self.size
+        cmd = [
+            executable or ffmpeg_executable(),
+            "-y",
+            "-loglevel", "error",
+            "-f", "rawvideo",
+            "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}",
+            "-r", str(fps),
+            "-i", "-",
+            "-an",
+            # yuv420p requiere dimensiones pares
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", "libx264",
+            "-preset", preset,
+            "-crf", str(crf),
+            "-pix_fmt", "yuv420p",
+            *(output_args if output_args is not None else ["-movflags", "+faststart"]),
+            output_path,
+        ]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def isOpened(self) -> bool:
+        return self.process.poll() is None
+
+    def write(self, frame: np.ndarray):
+        """Send one BGR frame of the configured size to the encoder"""
+        if frame.shape[1::-1] != self.size:
+            raise ValueError(f"Frame {frame.shape[1]}x{frame.shape[0]} no coincide con {self.size}")
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            raise RuntimeError(f"ffmpeg terminó inesperadamente: {self._stderr()}")
+
+    def release(self):
+        """Flush the pipe and wait for ffmpeg to finish the file"""
+        if self.process.stdin and not self.process.stdin.closed:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg falló ({self.process.returncode}): {self._stderr()}")
+
+    def _stderr(self) -> str:
+        self.process.wait()
+        return self.process.stderr.read().decode(errors="replace")[-1200:]
+
+
+def _open_cv2_writer(output_path: str, fps: float, size: Tuple[int, int]) -> cv2.VideoWriter:
+    """cv2.VideoWriter, falling back from H264 to MJPG to OpenCV's choice"""
+    # Usar codec H.264 que es más rápido y compatible
+    # Si falla, intentar con MJPEG
+    try:
+        fourcc = cv2.VideoWriter_fourcc(*'H264')
+        out = cv2.VideoWriter(output_path, fourcc, fps, size)
+
+        if not out.isOpened():
+            logger.warning("H264 falló, intentando con MJPEG...")
+            fourcc = cv2.VideoWriter_fourcc(*'MJPG')
+            out = cv2.VideoWriter(output_path, fourcc, fps, size)
+    except Exception:
+        # Fallback a MJPEG
+        logger.warning("Usando MJPEG como fallback...")
+        fourcc = cv2.VideoWriter_fourcc(*'MJPG')
+        out = cv2.VideoWriter(output_path, fourcc, fps, size)
+
+    if not out.isOpened():
+        logger.error("No se pudo abrir VideoWriter. Probando sin codec específico...")
+        fourcc = -1  # Dejar que OpenCV elija
+        out = cv2.VideoWriter(output_path, fourcc, fps, size)
+
+    if not out.isOpened():
+        raise Exception(f"No se pudo crear VideoWriter para: {output_path}")
+    return out
+
+
+# H.264 Anexo A, tabla A-1: (nivel, MaxFS macrobloques por frame, MaxMBPS macrobloques por segundo)
+H264_LEVELS = (
+    ("3.0", 1620, 40500),
+    ("3.1", 3600, 108000),
+    ("3.2", 5120, 216000),
+    ("4.0", 8192, 245760),
+    ("4.2", 8704, 522240),
+    ("5.0", 22080, 589824),
+    ("5.1", 36864, 983040),
+    ("5.2", 36864, 2073600),
+    ("6.0", 139264, 4177920),
+    ("6.1", 139264, 8355840),
+    ("6.2", 139264, 16711680),
+)
+
+
+def h264_level(width: int, height: int, fps: float) -> str:
+    """
+    Lowest H.264 level (3.0 or above) that allows this frame size and rate
+
+    Raises:
+        ValueError: The video exceeds level 6.2
+    """
+    mbs_w, mbs_h = math.ceil(width / 16), math.ceil(height / 16)
+    for level, max_fs, max_mbps in H264_LEVELS:
+        # Ningún lado puede superar sqrt(8 * MaxFS) macrobloques
+        side = math.sqrt(8 * max_fs)
+        if mbs_w * mbs_h <= max_fs and mbs_w <= side and mbs_h <= side and mbs_w * mbs_h * fps <= max_mbps:
+            return level
+    raise ValueError(f"{width}x{height} a {fps} fps supera el nivel H.264 6.2")
+
+
+def hls_output_args(playlist_path: str, fps: float, segment_seconds: int, size: Tuple[int, int]) -> List[str]:
+    """
+    ffmpeg options for an HLS event playlist that grows as segments are encoded
+
+    Args:
+        playlist_path: Destination .m3u8 (segments are written next to it)
+        fps: Frames per second of the input
+        segment_seconds: Target segment duration
+        size: (width, height) of the frames
+
+    Returns:
+        Arguments to place before the output path
+    """
+    segment_pattern = str(Path(playlist_path).with_name("segment_%05d.m4s"))
+    return [
+        "-profile:v", "high",
+        "-level:v", h264_level(*size, fps),
+        # Un keyframe exacto en cada corte para que los segmentos sean independientes
+        "-g", str(max(1, round(fps * segment_seconds))),
+        "-sc_threshold", "0",
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds})",
+        "-f", "hls",
+        "-hls_time", str(segment_seconds),
+        "-hls_playlist_type", "event",
+        # fMP4: reproducible con HLS nativo y con Media Source Extensions
+        "-hls_segment_type", "fmp4",
+        "-hls_fmp4_init_filename", "init.mp4",
+        "-hls_segment_filename", segment_pattern,
+    ]
+
+
+def open_video_writer(output_path: str, fps: float, size: Tuple[int, int], encoder: Optional[str] = None):
+    """
+    Open a writer for annotated frames (write(frame) / release())
+
+    Args:
+        output_path: Destination file (.m3u8 = HLS playlist, requires ffmpeg)
+        fps: Frames per second
+        size: (width, height) of the frames that will be written
+        encoder: "ffmpeg" or "opencv" (default settings.video_encoder)
+
+    Returns:
+        An FFmpegWriter, or an opened cv2.VideoWriter when ffmpeg is unavailable
+    """
+    encoder = encoder or settings.video_encoder
+    hls = output_path.endswith(".m3u8")
+    if encoder == "ffmpeg" or hls:
+        executable = ffmpeg_executable()
+        if executable:
+            return FFmpegWriter(
+                output_path,
+                fps,
+                size,
+                preset=settings.video_encoder_preset,
+                crf=settings.video_encoder_crf,
+                executable=executable,
+                output_args=hls_output_args(output_path, fps, settings.hls_segment_seconds, size) if hls else None
+            )
+        if hls:
+            raise RuntimeError("La salida HLS requiere ffmpeg (instale imageio-ffmpeg)")
+        logger.warning("ffmpeg no disponible (instale imageio-ffmpeg); usando cv2.VideoWriter")
+    return _open_cv2_writer(output_path, fps, size)
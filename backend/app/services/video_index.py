@@ -0,0 +1,208 @@
+"""
+Video Index: timestamps, keyframes, thumbnail sprites and track times of a video
+
+Built while the video is decoded for analysis, so seeking and scrubbing
+never have to decode from the start again. Layout of <index_dir>/:
+
+    index.json        fps, size, per-frame timestamps, keyframes, thumbnails, tracks
+    sprite_000.jpg    thumbnail sprite sheets (columns x rows grid)
+
+Frame positions are 0-based (cv2.CAP_PROP_POS_FRAMES); times are in ms.
+"""
+import json
+import logging
+import re
+import subprocess
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.video_encoder import ffmpeg_executable
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+PTS_TIME = re.compile(r"pts_time:([0-9.]+)")
+
+
+def scan_keyframes(video_path: str) -> Optional[List[float]]:
+    """
+    Timestamps (ms) of the keyframes, decoding only keyframes with ffmpeg
+
+    Returns:
+        Sorted keyframe times, or None when ffmpeg is unavailable or fails
+    """
+    executable = ffmpeg_executable()
+    if executable is None:
+        return None
+    cmd = [executable, "-hide_banner", "-skip_frame", "nokey", "-i", str(video_path), "-vf", "showinfo", "-f", "null", "-"]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        logger.warning(f"No se pudieron leer los keyframes de {video_path}")
+        return None
+    return sorted(float(match) * 1000 for match in PTS_TIME.findall(result.stderr))
+
+
+class VideoIndexBuilder:
+    """Collects the index frame by frame during the analysis pass"""
+
+    def __init__(
+        self,
+        index_dir: str,
+        fps: float,
+        width: int,
+        height: int,
+        thumbnail_interval_ms: int = 2000,
+        thumbnail_width: int = 160,
+        columns: int = 10,
+        rows: int = 10
+    ):
+        """
+        Initialize builder
+
+        Args:
+            index_dir: Output directory (created if missing)
+            fps: Nominal frame rate
+            width: Frame width
+            height: Frame height
+            thumbnail_interval_ms: Time between thumbnails
+            thumbnail_width: Thumbnail width (height keeps the aspect ratio)
+            columns: Thumbnails per sprite row
+            rows: Rows per sprite sheet
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.thumbnail_interval_ms = thumbnail_interval_ms
+        self.thumb_size = (thumbnail_width, max(2, round(thumbnail_width * height / max(width, 1))))
+        self.columns = columns
+        self.rows = rows
+        self.timestamps_ms: List[float] = []
+        self.tracks: Dict[int, dict] = {}
+        self._thumbnails: List[np.ndarray] = []
+        self._thumbnail_times: List[float] = []
+        self._next_thumbnail_ms = 0.0
+
+    def add_frame(self, frame: np.ndarray, timestamp_ms: float, track_ids: List[int]):
+        """
+        Register one decoded frame (before annotations are drawn on it)
+
+        Args:
+            frame: BGR frame
+            timestamp_ms: Presentation time of the frame
+            track_ids: Tracks visible in the frame
+        """
+        timestamp_ms = round(timestamp_ms, 3)
+        self.timestamps_ms.append(timestamp_ms)
+        if timestamp_ms >= self._next_thumbnail_ms:
+            self._thumbnails.append(cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA))
+            self._thumbnail_times.append(timestamp_ms)
+            self._next_thumbnail_ms = (timestamp_ms // self.thumbnail_interval_ms + 1) * self.thumbnail_interval_ms
+        for track_id in track_ids:
+            track = self.tracks.setdefault(track_id, {"first_ms": timestamp_ms})
+            track["last_ms"] = timestamp_ms
+
+    def _write_sprites(self) -> List[str]:
+        per_sheet = self.columns * self.rows
+        thumb_w, thumb_h = self.thumb_size
+        sheets = []
+        for start in range(0, len(self._thumbnails), per_sheet):
+            batch = self._thumbnails[start:start + per_sheet]
+            rows = -(-len(batch) // self.columns)
+            sheet = np.zeros((rows * thumb_h, min(len(batch), self.columns) * thumb_w, 3), dtype=np.uint8)
+            for i, thumb in enumerate(batch):
+                y, x = divmod(i, self.columns)
+                sheet[y * thumb_h:(y + 1) * thumb_h, x * thumb_w:(x + 1) * thumb_w] = thumb
+            name = f"sprite_{len(sheets):03d}.jpg"
+            cv2.imwrite(str(self.index_dir / name), sheet, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            sheets.append(name)
+        return sheets
+
+    def close(self, video_path: str, track_names: Dict[int, str]) -> str:
+        """
+        Write sprites and index.json
+
+        Args:
+            video_path: Video the index describes (scanned for keyframes)
+            track_names: Display name per track id
+
+        Returns:
+            Path of index.json
+        """
+        keyframe_times = scan_keyframes(video_path)
+        keyframes = None
+        if keyframe_times is not None:
+            # Tiempo del keyframe -> posición del frame (tolerancia de medio frame)
+            half_frame = 500 / (self.fps or 30)
+            keyframes = sorted({
+                max(bisect_right(self.timestamps_ms, t + half_frame) - 1, 0) for t in keyframe_times
+            })
+
+        index = {
+            "version": 1,
+            "fps": self.fps,
+            "width": self.width,
+            "height": self.height,
+            "frames": len(self.timestamps_ms),
+            "duration_ms": self.timestamps_ms[-1] + 1000 / (self.fps or 30) if self.timestamps_ms else 0,
+            "timestamps_ms": self.timestamps_ms,
+            "keyframes": keyframes,
+            "thumbnails": {
+                "interval_ms": self.thumbnail_interval_ms,
+                "width": self.thumb_size[0],
+                "height": self.thumb_size[1],
+                "columns": self.columns,
+                "per_sheet": self.columns * self.rows,
+                "times_ms": self._thumbnail_times,
+                "sheets": self._write_sprites()
+            },
+            "tracks": {
+                str(track_id): {"name": track_names.get(track_id, f"Persona {track_id}"), **times}
+                for track_id, times in sorted(self.tracks.items())
+            }
+        }
+        path = self.index_dir / INDEX_FILE
+        path.write_text(json.dumps(index, separators=(",", ":")))
+        return str(path)
+
+
+def load_index(index_dir: str) -> dict:
+    """Read index.json of a video"""
+    return json.loads((Path(index_dir) / INDEX_FILE).read_text())
+
+
+def frame_at(index: dict, t_ms: float) -> int:
+    """Position of the frame shown at t_ms (last frame whose timestamp <= t_ms)"""
+    return max(bisect_right(index["timestamps_ms"], t_ms) - 1, 0)
+
+
+def read_frame_at(video_path: str, index: dict, t_ms: float) -> Tuple[int, float, np.ndarray]:
+    """
+    Decode the frame shown at t_ms
+
+    Seeks straight to the preceding keyframe and only grabs (no color
+    conversion) the frames between it and the target.
+
+    Returns:
+        (frame position, frame timestamp in ms, BGR frame)
+    """
+    position = frame_at(index, t_ms)
+    keyframes = index.get("keyframes")
+    start = keyframes[max(bisect_right(keyframes, position) - 1, 0)] if keyframes else position
+
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for _ in range(position - start):
+            cap.grab()
+        ok, frame = cap.read()
+    finally:
+        cap.release()
+    if not ok:
+        raise ValueError(f"No se pudo leer el frame {position} de {video_path}")
+    return position, index["timestamps_ms"][position], frame
@@ -1,20 +1,162 @@
 """Video Stream Processing Service"""
 import logging
 import asyncio
-from typing import Optional, Callable
+import multiprocessing
+import queue
+import threading
+from typing import Dict, Optional, Callable
 from datetime import datetime
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
 
+def _capture_worker(stream_url: str, camera_id: str, ring_spec: dict, refs, stop_event, interval_ms: int):
+    """
+    Capture process: decode a stream straight into a shared-memory ring
+    
+    Only FrameRef objects (a few bytes) cross the process boundary; the
+    consumer reads the pixels from the ring without copying.
+    """
+    import cv2
+    import time
+    from app.services.frame_transport import FrameRing
+    
+    ring = FrameRing.attach(**ring_spec)
+    cap = cv2.VideoCapture(stream_url)
+    frame_index = 0
+    try:
+        while not stop_event.is_set():
+            if refs.full():
+                # Consumidor atrasado: descartar el frame sin decodificarlo
+                # (así ningún slot encolado o en uso se sobrescribe)
+                if not cap.grab():
+                    break
+                time.sleep(interval_ms / 1000)
+                continue
+            
+            slot, view = ring.acquire()
+            # Decodificar directamente en el slot si la resolución coincide
+            ret, frame = cap.read(view)
+            if not ret:
+                break
+            if frame is not view:
+                if frame.shape != ring.frame_shape:
+                    cv2.resize(frame, (ring.width, ring.height), dst=view)
+                else:
+                    view[:] = frame
+            frame_index += 1
+            refs.put(ring.commit(slot, camera_id, frame_index))
+            time.sleep(interval_ms / 1000)
+    finally:
+        cap.release()
+        try:
+            refs.put(None, timeout=1)
+        except queue.Full:
+            pass
+        ring.close()
+
+
+def _start_clip_recording(camera_id: str, stream_url: str):
+    """
+    Buffer the camera's encoded packets for incident clips (second, undecoded connection)
+    
+    Returns:
+        (stop_event, future) or None when clip recording is disabled
+    """
+    if not settings.clip_recording_enabled:
+        return None
+    from app.services.clip_recorder import clip_registry, read_packets
+    
+    recorder = clip_registry.start(camera_id)
+    stop_event = threading.Event()
+    future = asyncio.get_running_loop().run_in_executor(None, read_packets, stream_url, recorder, stop_event)
+    return stop_event, future
+
+
+async def _stop_clip_recording(camera_id: str, recording):
+    if recording is None:
+        return
+    from app.services.clip_recorder import clip_registry
+    
+    stop_event, future = recording
+    stop_event.set()
+    await future
+    clip_registry.stop(camera_id)
+
+
 class VideoProcessor:
     """Handles video stream processing and frame extraction"""
     
     def __init__(self):
         """Initialize video processor"""
         self.active_streams = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
         logger.info("VideoProcessor initialized")
     
+    def start_stream(
+        self,
+        camera_id: str,
+        stream_url: str,
+        frame_callback: Callable,
+        interval_ms: Optional[int] = None
+    ) -> bool:
+        """
+        Run process_stream as a background task that stop() can cancel
+        
+        Returns:
+            False if the camera already has a running stream
+        """
+        if camera_id in self.tasks:
+            return False
+        task = asyncio.create_task(
+            self.process_stream(
+                camera_id,
+                stream_url,
+                frame_callback,
+                settings.frame_processing_interval if interval_ms is None else interval_ms
+            ),
+            name=f"stream-{camera_id}"
+        )
+        self.tasks[camera_id] = task
+        
+        def forget(_):
+            if self.tasks.get(camera_id) is task:
+                del self.tasks[camera_id]
+        
+        task.add_done_callback(forget)
+        return True
+    
+    async def stop(self, camera_id: str, timeout: float = 5.0) -> bool:
+        """
+        Stop a stream started with start_stream and wait for it to finish
+        
+        The loop is asked to stop after the current frame and cancelled if
+        it has not finished within timeout seconds.
+        
+        Returns:
+            False if the camera had no running stream
+        """
+        task = self.tasks.get(camera_id)
+        if task is None:
+            return False
+        self.stop_stream(camera_id)
+        if task.get_loop() is not asyncio.get_running_loop():
+            # Tarea de otro event loop (ya cerrado): no se puede esperar
+            self.tasks.pop(camera_id, None)
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return True
+    
+    async def stop_all(self):
+        """Stop every running stream (application shutdown)"""
+        await asyncio.gather(*(self.stop(camera_id) for camera_id in list(self.tasks)))
+    
     async def process_stream(
         self,
         camera_id: str,
@@ -31,20 +173,29 @@ class VideoProcessor:
             frame_callback: Async callback function for each frame
             interval_ms: Processing interval in milliseconds
         """
+        recording = None
+        cap = None
+        self.active_streams[camera_id] = {
+            "started_at": datetime.utcnow(),
+            "frame_count": 0,
+            "active": True,
+            "stream_url": stream_url
+        }
+        loop = asyncio.get_running_loop()
         try:
             import cv2
             
-            cap = cv2.VideoCapture(stream_url)
-            self.active_streams[camera_id] = {
-                "started_at": datetime.utcnow(),
-                "frame_count": 0,
-                "active": True
-            }
+            # Abrir y decodificar bloquea: fuera del event loop
+            cap = await loop.run_in_executor(None, cv2.VideoCapture, stream_url)
+            if not cap.isOpened():
+                logger.warning(f"No se pudo abrir el stream {camera_id}: {stream_url}")
+                return
             
             logger.info(f"📹 Started processing stream: {camera_id}")
+            recording = _start_clip_recording(camera_id, stream_url)
             
             while self.active_streams.get(camera_id, {}).get("active", False):
-                ret, frame = cap.read()
+                ret, frame = await loop.run_in_executor(None, cap.read)
                 if not ret:
                     logger.warning(f"Failed to read frame from {camera_id}")
                     break
@@ -55,13 +206,94 @@ class VideoProcessor:
                 self.active_streams[camera_id]["frame_count"] += 1
                 await asyncio.sleep(interval_ms / 1000)
             
-            cap.release()
             logger.info(f"🛑 Stopped processing stream: {camera_id}")
             
         except Exception as e:
             logger.error(f"Error processing stream {camera_id}: {e}")
-            if camera_id in self.active_streams:
-                del self.active_streams[camera_id]
+        finally:
+            if cap is not None:
+                cap.release()
+            await _stop_clip_recording(camera_id, recording)
+            self.active_streams.pop(camera_id, None)
+    
+    async def process_stream_shared(
+        self,
+        camera_id: str,
+        stream_url: str,
+        frame_callback: Callable,
+        interval_ms: int = 500,
+        resolution: Optional[tuple] = None
+    ):
+        """
+        Process a stream decoded in a separate capture process
+        
+        Frames travel through a shared-memory ring sized to the camera
+        resolution; only slot references are queued. Stale references are
+        skipped so the callback always gets the freshest frame.
+        
+        Args:
+            camera_id: Camera identifier
+            stream_url: Video stream URL
+            frame_callback: Async callback function for each frame
+            interval_ms: Capture interval in milliseconds
+            resolution: (width, height) of the ring (camera config by default)
+        """
+        from app.services.frame_transport import FrameRing
+        from app.utils.helpers import camera_resolution
+        
+        width, height = resolution or camera_resolution(camera_id)
+        ring = FrameRing.create(width, height, slots=settings.frame_ring_slots)
+        context = multiprocessing.get_context("spawn")
+        # Menos referencias en cola que slots: un frame encolado no puede estar sobrescrito
+        refs = context.Queue(maxsize=max(settings.frame_ring_slots - 2, 1))
+        stop_event = context.Event()
+        process = context.Process(
+            target=_capture_worker,
+            args=(stream_url, camera_id, ring.spec(), refs, stop_event, interval_ms),
+            daemon=True,
+            name=f"capture-{camera_id}"
+        )
+        process.start()
+        self.active_streams[camera_id] = {
+            "started_at": datetime.utcnow(),
+            "frame_count": 0,
+            "active": True,
+            "dropped_frames": 0
+        }
+        logger.info(f"📹 Started shared-memory capture: {camera_id} ({width}x{height})")
+        recording = _start_clip_recording(camera_id, stream_url)
+        
+        loop = asyncio.get_running_loop()
+        try:
+            while self.active_streams.get(camera_id, {}).get("active", False):
+                ref = await loop.run_in_executor(None, refs.get)
+                if ref is None:
+                    break
+                # Saltar a la referencia más reciente si el consumidor va atrasado
+                while not refs.empty():
+                    newer = refs.get_nowait()
+                    if newer is None:
+                        break
+                    self.active_streams[camera_id]["dropped_frames"] += 1
+                    ref = newer
+                
+                frame = ring.read(ref)
+                if frame is None:
+                    self.active_streams[camera_id]["dropped_frames"] += 1
+                    continue
+                await frame_callback(camera_id, frame)
+                self.active_streams[camera_id]["frame_count"] += 1
+        except Exception as e:
+            logger.error(f"Error processing stream {camera_id}: {e}")
+        finally:
+            stop_event.set()
+            await loop.run_in_executor(None, process.join, 5)
+            if process.is_alive():
+                process.terminate()
+            ring.close()
+            await _stop_clip_recording(camera_id, recording)
+            self.active_streams.pop(camera_id, None)
+            logger.info(f"🛑 Stopped shared-memory capture: {camera_id}")
     
     def stop_stream(self, camera_id: str):
         """Stop processing a video stream"""
@@ -1,17 +1,39 @@
 """YOLOv8 Detection Service con Person Tracking y Face Recognition Simulado"""
 import logging
+import threading
+import time
 import cv2
 import numpy as np
-from typing import List, Tuple, Dict, Optional
+from typing import Callable, List, Tuple, Dict, Optional
 from collections import defaultdict
+from dataclasses import replace
 from datetime import datetime
+from enum import Enum
 import tempfile
 from pathlib import Path
 from app.config import settings
+from app.utils.boxes import fast_nms, nms, normalized_to_pixels, tile_grid
+from app.utils.detections import Detections
+from app.services.annotation_renderer import HIGH_RISK_COLOR, AnnotationRenderer, track_label
+from app.services.detection_sidecar import SidecarWriter
+from app.services.inference_backends import create_backend
+from app.services.rule_engine import RuleEngine, load_configured_rules
+from app.services.video_encoder import open_video_writer
+from app.services.video_index import VideoIndexBuilder
+from app.services.zone_mapper import zone_registry
 
 logger = logging.getLogger(__name__)
 
 
+class ModelState(str, Enum):
+    """Ciclo de vida del modelo (expuesto en /health/detailed)"""
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+
+
 class PersonTracker:
     """Rastreador de personas con ID persistente y duración en pantalla"""
     
@@ -28,104 +50,134 @@ class PersonTracker:
         self.max_distance = max_distance
         self.max_frames_skip = max_frames_skip
         self.frame_count = 0
+        # Máscara de zonas de la cámara (ZoneMap) para asignar zona por punto de apoyo
+        self.zone_map = None
+        self.last_zone_labels = np.zeros(0, dtype=np.uint8)
+        # Transiciones de la última llamada a update() (consumidas por RuleEngine)
+        self.started_tracks = []
+        self.ended_tracks = []
+        self.zone_changes = []
         
-    def _get_centroid(self, bbox):
-        """Calcular centroide del bounding box"""
-        x1, y1, x2, y2 = bbox
-        return ((x1 + x2) / 2, (y1 + y2) / 2)
-    
-    def _distance(self, pt1, pt2):
-        """Calcular distancia euclidiana"""
-        return np.sqrt((pt1[0] - pt2[0])**2 + (pt1[1] - pt2[1])**2)
-    
-    def update(self, detections):
+    def update(self, detections) -> Detections:
         """
         Actualizar tracks con nuevas detecciones
         
         Args:
-            detections: Lista de {bbox, confidence, class_name}
+            detections: Detections del frame (o lista de {bbox, confidence, class_name})
             
         Returns:
-            Lista de tracks activos con IDs asignados
+            Las mismas detecciones con track_ids (y zones si hay zone_map)
         """
+        if not isinstance(detections, Detections):
+            detections = Detections.from_dicts(detections)
         self.frame_count += 1
+        self.started_tracks = []
+        self.ended_tracks = []
+        self.zone_changes = []
+        self.last_zone_labels = np.zeros(0, dtype=np.uint8)
         
-        if not detections:
-            # Incrementar frames sin detección para tracks existentes
-            for track_id in list(self.tracks.keys()):
-                self.tracks[track_id]['frames_skip'] += 1
-                if self.tracks[track_id]['frames_skip'] > self.max_frames_skip:
-                    del self.tracks[track_id]
-            return []
-        
-        # Calcular centroides de nuevas detecciones
-        detection_centroids = [self._get_centroid(d['bbox']) for d in detections]
-        
-        # Asociar detecciones con tracks existentes
-        matched = set()
-        updated_detections = []
+        count = len(detections)
+        track_ids = np.zeros(count, dtype=np.int64)
+        candidates = list(self.tracks.keys())
         
-        for det_idx, (det, centroid) in enumerate(zip(detections, detection_centroids)):
-            best_track = None
-            best_distance = self.max_distance
+        if count:
+            # Distancias detección x track calculadas de una vez
+            centroids = detections.centroids()
+            bboxes = detections.int_boxes()
+            if candidates:
+                track_centroids = np.array([self.tracks[t]['centroid'] for t in candidates], dtype=np.float32)
+                distances = np.linalg.norm(centroids[:, None, :] - track_centroids[None, :, :], axis=2)
+            available = np.ones(len(candidates), dtype=bool)
             
-            # Buscar track más cercano
-            for track_id, track in self.tracks.items():
-                if track_id in matched:
-                    continue
-                    
-                dist = self._distance(centroid, track['centroid'])
-                if dist < best_distance:
-                    best_distance = dist
-                    best_track = track_id
-            
-            if best_track is not None:
-                # Actualizar track existente
-                self.tracks[best_track]['centroid'] = centroid
-                self.tracks[best_track]['bbox'] = det['bbox']
-                self.tracks[best_track]['frames_count'] += 1
-                self.tracks[best_track]['frames_skip'] = 0
-                matched.add(best_track)
-                
-                updated_detections.append({
-                    **det,
-                    'track_id': best_track,
-                    'name': self.tracks[best_track]['name'],
-                    'duration_seconds': (self.tracks[best_track]['frames_count'] / 30),
-                    'color': self.tracks[best_track]['color']
-                })
-            else:
-                # Crear nuevo track
-                person_id = self.next_id
-                self.next_id += 1
-                color = tuple(np.random.randint(0, 255, 3).tolist())
+            for i in range(count):
+                # Track libre más cercano dentro de max_distance
+                best = None
+                if available.any():
+                    row = np.where(available, distances[i], np.inf)
+                    nearest = int(row.argmin())
+                    if row[nearest] < self.max_distance:
+                        best = nearest
                 
-                self.tracks[person_id] = {
-                    'centroid': centroid,
-                    'bbox': det['bbox'],
-                    'name': f'Persona {person_id}',
-                    'start_frame': self.frame_count,
-                    'frames_count': 1,
-                    'frames_skip': 0,
-                    'color': color
-                }
-                
-                updated_detections.append({
-                    **det,
-                    'track_id': person_id,
-                    'name': f'Persona {person_id}',
-                    'duration_seconds': 0,
-                    'color': color
-                })
-        
-        # Remover tracks sin coincidencias
-        for track_id in list(self.tracks.keys()):
+                centroid = tuple(centroids[i].tolist())
+                if best is not None:
+                    # Actualizar track existente
+                    available[best] = False
+                    track_id = candidates[best]
+                    track = self.tracks[track_id]
+                    track['centroid'] = centroid
+                    track['bbox'] = bboxes[i]
+                    track['frames_count'] += 1
+                    track['frames_skip'] = 0
+                else:
+                    # Crear nuevo track
+                    track_id = self.next_id
+                    self.next_id += 1
+                    self.tracks[track_id] = {
+                        'centroid': centroid,
+                        'bbox': bboxes[i],
+                        'name': f'Persona {track_id}',
+                        'start_frame': self.frame_count,
+                        'frames_count': 1,
+                        'frames_skip': 0,
+                        'color': tuple(np.random.randint(0, 255, 3).tolist()),
+                        'zone': None,
+                        'zone_frames': defaultdict(int)
+                    }
+                    self.started_tracks.append(track_id)
+                track_ids[i] = track_id
+        
+        # Incrementar frames sin detección y cerrar tracks perdidos
+        matched = set(track_ids.tolist())
+        for track_id in candidates:
             if track_id not in matched:
                 self.tracks[track_id]['frames_skip'] += 1
                 if self.tracks[track_id]['frames_skip'] > self.max_frames_skip:
                     del self.tracks[track_id]
+                    self.ended_tracks.append(track_id)
         
-        return updated_detections
+        detections = replace(detections, track_ids=track_ids)
+        if self.zone_map is not None and count:
+            self._assign_zones(detections)
+        return detections
+    
+    def _assign_zones(self, detections: Detections):
+        """Asignar zona a cada track con una sola búsqueda vectorizada en la máscara"""
+        labels = self.zone_map.labels_for_boxes(detections.boxes)
+        self.last_zone_labels = labels
+        started = set(self.started_tracks)
+        detections.zones = [self.zone_map.names[label] for label in labels]
+        
+        for track_id, zone in zip(detections.track_ids.tolist(), detections.zones):
+            track = self.tracks[track_id]
+            if zone is not None:
+                track['zone_frames'][zone] += 1
+            if track['zone'] != zone:
+                track['zone'] = zone
+                if track_id not in started:
+                    self.zone_changes.append((track_id, zone))
+    
+    def describe(self, detections: Detections, fps: float = 30) -> List[Dict]:
+        """
+        Detecciones con tracking como dicts (frontera JSON / eventos)
+        
+        Returns:
+            Lista de {bbox, confidence, class_name, class_id, track_id, zone, name, duration_seconds, color}
+        """
+        rows = detections.to_dicts()
+        for row in rows:
+            track = self.tracks.get(row.get('track_id'))
+            if track is not None:
+                row['name'] = track['name']
+                row['duration_seconds'] = self.duration(row['track_id'], fps)
+                row['color'] = track['color']
+        return rows
+    
+    def duration(self, track_id: int, fps: float = 30) -> float:
+        """Segundos en pantalla de un track activo (0 en su primer frame)"""
+        track = self.tracks[track_id]
+        if track['start_frame'] == self.frame_count:
+            return 0
+        return track['frames_count'] / fps
     
     def get_summary(self, fps=30):
         """Obtener resumen de personas detectadas"""
@@ -140,7 +192,8 @@ class PersonTracker:
                 'duration_seconds': duration,
                 'duration_formatted': f"{int(duration // 60)}m {int(duration % 60)}s",
                 'frames_detected': track['frames_count'],
-                'risk_level': risk
+                'risk_level': risk,
+                'zones': {zone: round(frames / fps, 2) for zone, frames in track['zone_frames'].items()}
             })
         
         return sorted(summary, key=lambda x: x['duration_seconds'], reverse=True)
@@ -149,77 +202,284 @@ class PersonTracker:
 class YOLOv8Detector:
     """YOLOv8 Model Handler optimizado para Cámaras de Seguridad con Person Tracking"""
     
-    def __init__(self):
-        """Initialize YOLO detector optimizado para vigilancia"""
-        try:
-            from ultralytics import YOLO
-            self.model = YOLO(settings.yolo_model_path)
-            self.model.fuse()
-            self.person_tracker = PersonTracker()
-            logger.info("✅ YOLOv8 Model cargado con Person Tracker")
-        except Exception as e:
-            logger.error(f"❌ Error al cargar YOLOv8 model: {e}")
-            self.model = None
-            self.person_tracker = PersonTracker()
+    def __init__(self, backend: Optional[str] = None, lazy: bool = False):
+        """
+        Initialize YOLO detector optimizado para vigilancia
+        
+        Args:
+            backend: Backend de inferencia (por defecto settings.inference_backend)
+            lazy: No cargar el modelo hasta load() o la primera detección
+        """
+        self.person_tracker = PersonTracker()
+        self.backend_name = backend or settings.inference_backend
+        self.model = None
+        self.state = ModelState.NOT_LOADED
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_ms: Optional[float] = None
+        self._load_lock = threading.Lock()
+        # El modelo no es thread-safe: uploads, análisis HLS y cámaras lo comparten
+        self._inference_lock = threading.Lock()
+        if not lazy:
+            self.load()
+    
+    def load(self, warmup_runs: Optional[int] = None) -> bool:
+        """
+        Cargar el backend y calentarlo (bloqueante; idempotente y thread-safe)
+        
+        El modelo solo se publica en self.model cuando ya está calentado, así
+        que las detecciones concurrentes nunca pagan el coste de la primera
+        inferencia.
+        
+        Args:
+            warmup_runs: Inferencias de calentamiento (por defecto settings.model_warmup_runs)
+            
+        Returns:
+            True si el modelo quedó listo
+        """
+        with self._load_lock:
+            if self.state in (ModelState.READY, ModelState.FAILED):
+                return self.state == ModelState.READY
+            
+            self.state = ModelState.LOADING
+            started = time.perf_counter()
+            try:
+                model = create_backend(self.backend_name)
+                self.load_seconds = round(time.perf_counter() - started, 3)
+                
+                self.state = ModelState.WARMING
+                self.warmup_ms = self._warmup(model, settings.model_warmup_runs if warmup_runs is None else warmup_runs)
+            except Exception as e:
+                logger.error(f"❌ Error al cargar YOLOv8 model: {e}")
+                self.state = ModelState.FAILED
+                self.error = str(e)
+                return False
+            
+            self.model = model
+            self.state = ModelState.READY
+            logger.info(
+                f"✅ YOLOv8 Model cargado ({model.name}) en {self.load_seconds:.2f}s, "
+                f"warmup {self.warmup_ms or 0:.0f} ms"
+            )
+            return True
+    
+    @staticmethod
+    def _warmup(model, runs: int) -> Optional[float]:
+        """
+        Ejecutar inferencias sobre un frame vacío del tamaño de entrada configurado
+        
+        Returns:
+            Latencia de la última inferencia en ms (None si runs == 0)
+        """
+        size = settings.inference_image_size
+        frame = np.zeros((size, size, 3), dtype=np.uint8)
+        latency = None
+        for _ in range(runs):
+            started = time.perf_counter()
+            model.predict(frame)
+            latency = round((time.perf_counter() - started) * 1000, 2)
+        return latency
+    
+    def _ensure_loaded(self) -> bool:
+        """Carga perezosa en la primera detección (uso fuera del lifespan: scripts, tests)"""
+        if self.state == ModelState.NOT_LOADED:
+            return self.load()
+        return self.model is not None
+    
+    def status(self) -> Dict:
+        """Estado del modelo para health checks"""
+        return {
+            "state": self.state.value,
+            "backend": self.model.name if self.model is not None else self.backend_name,
+            "load_seconds": self.load_seconds,
+            "warmup_ms": self.warmup_ms,
+            "error": self.error
+        }
+    
+    @staticmethod
+    def camera_rois(camera_id: Optional[str], width: int, height: int) -> List[Tuple[int, int, int, int]]:
+        """
+        Regiones de interés configuradas para una cámara, en píxeles
+        
+        Args:
+            camera_id: Cámara (None = sin ROI)
+            width: Ancho del frame
+            height: Alto del frame
+            
+        Returns:
+            Lista de rectángulos (x1, y1, x2, y2); vacía si se procesa el frame completo
+        """
+        if camera_id is None:
+            return []
+        from app.data import SYSTEM_CONFIG
+        
+        rects = SYSTEM_CONFIG.get("roi", {}).get("cameras", {}).get(camera_id, [])
+        return [normalized_to_pixels(rect, width, height) for rect in rects]
+    
+    def _predict(self, source) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Ejecutar el backend de inferencia sobre una imagen o un lote de imágenes
+        
+        Las llamadas se serializan: varios hilos pueden procesar videos a la
+        vez, pero solo uno usa el modelo en cada momento.
+        
+        Returns:
+            Por imagen, (boxes N x 4 float32, confidences N float32)
+        """
+        with self._inference_lock:
+            return self.model.predict(source)
+    
+    def inference_windows(
+        self,
+        camera_id: Optional[str],
+        width: int,
+        height: int,
+        tiled: Optional[bool] = None
+    ) -> Tuple[np.ndarray, Optional[Dict]]:
+        """
+        Ventanas del frame que se envían al modelo
+        
+        Args:
+            camera_id: Cámara de origen (ROI y mosaicos configurados)
+            width: Ancho del frame
+            height: Alto del frame
+            tiled: Forzar (True) o desactivar (False) mosaicos; None usa la configuración
+            
+        Returns:
+            (ventanas W x 4 en píxeles, configuración de mosaicos o None)
+        """
+        from app.data import SYSTEM_CONFIG
+        
+        regions = self.camera_rois(camera_id, width, height) or [(0, 0, width, height)]
+        tiling = SYSTEM_CONFIG.get("tiling", {})
+        if tiled is None:
+            tiled = camera_id is not None and camera_id in tiling.get("cameras", [])
+        if not tiled:
+            return np.asarray(regions, dtype=np.int64), None
+        
+        windows = []
+        for x1, y1, x2, y2 in regions:
+            tiles = tile_grid(x2 - x1, y2 - y1, tiling.get("tile_size", 640), tiling.get("overlap", 0.2))
+            windows.append(tiles + np.array([x1, y1, x1, y1]))
+            if tiling.get("full_frame_pass", True) and len(tiles) > 1:
+                windows.append(np.array([[x1, y1, x2, y2]]))
+        return np.concatenate(windows), tiling
+    
+    def detect_frame(self, frame: np.ndarray, camera_id: Optional[str] = None, tiled: Optional[bool] = None) -> Detections:
+        """
+        Detectar personas en un frame, solo dentro de las ROI de la cámara si existen
+        
+        Los recortes (ROI y/o mosaicos) se envían al modelo como un único lote
+        y las cajas se trasladan de vuelta a coordenadas del frame completo.
+        
+        Args:
+            frame: Frame BGR
+            camera_id: Cámara de origen (selecciona ROI y mosaicos)
+            tiled: Forzar o desactivar mosaicos (None = según configuración)
+            
+        Returns:
+            Detections (cajas N x 4, confianzas y clases en arrays)
+        """
+        height, width = frame.shape[:2]
+        windows, tiling = self.inference_windows(camera_id, width, height, tiled)
+        
+        if len(windows) == 1 and tuple(windows[0]) == (0, 0, width, height):
+            boxes, scores = self._predict(frame)[0]
+            return Detections.from_arrays(boxes, scores)
+        
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in windows.tolist()]
+        outputs = self._predict(crops)
+        offsets = windows[:, [0, 1, 0, 1]].astype(np.float32)
+        boxes = np.concatenate([b + offsets[i] for i, (b, _) in enumerate(outputs)])
+        scores = np.concatenate([c for _, c in outputs])
+        
+        if len(windows) > 1 and len(boxes):
+            if tiling is not None:
+                # Fusión entre mosaicos: una persona cortada por el borde queda
+                # contenida en la caja completa, por eso se usa intersección/menor
+                keep = fast_nms(boxes, scores, tiling.get("merge_threshold", 0.6), metric="ios")
+            else:
+                # ROIs solapadas pueden detectar la misma persona dos veces
+                keep = nms(boxes, scores, settings.yolo_iou_threshold)
+            boxes, scores = boxes[keep], scores[keep]
+        
+        return Detections.from_arrays(boxes, scores)
     
-    def detect_objects(self, image_path: str, track: bool = False) -> Dict:
+    def detect_objects(
+        self,
+        image_path,
+        track: bool = False,
+        camera_id: Optional[str] = None,
+        columnar: bool = False
+    ) -> Dict:
         """
         Detectar personas en imagen/video
         
         Args:
             image_path: Ruta a archivo de imagen o frame de video
             track: Activar tracking de objetos entre frames
+            camera_id: Cámara de origen; con un frame en memoria aplica sus ROI
+            columnar: Devolver Detections en lugar de la lista de dicts del API
             
         Returns:
             Dictionary con detecciones y scores de confianza
         """
-        if not self.model:
-            return {"error": "Modelo no cargado"}
+        if not self._ensure_loaded():
+            return {"error": f"Modelo no disponible ({self.state.value})"}
         
         try:
-            results = self.model(
-                image_path,
-                conf=0.5,
-                iou=0.45,
-                max_det=300,
-                classes=[0],  # Solo personas
-                verbose=False,
-                device='0' if settings.use_gpu else 'cpu'
-            )
-            
-            detections = []
-            for result in results:
-                if result.boxes:
-                    for box in result.boxes:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        conf = box.conf[0].item()
-                        
-                        detections.append({
-                            'bbox': (int(x1), int(y1), int(x2), int(y2)),
-                            'confidence': conf,
-                            'class_name': 'person',
-                            'class_id': 0
-                        })
+            if isinstance(image_path, np.ndarray):
+                detections = self.detect_frame(image_path, camera_id)
+            else:
+                outputs = self._predict(image_path)
+                detections = Detections.from_arrays(
+                    np.concatenate([boxes for boxes, _ in outputs]) if outputs else np.zeros((0, 4)),
+                    np.concatenate([scores for _, scores in outputs]) if outputs else np.zeros(0)
+                )
             
-            return {"detections": detections, "success": True}
+            return {"detections": detections if columnar else detections.to_dicts(), "success": True}
         
         except Exception as e:
             logger.error(f"Error en detect_objects: {e}")
             return {"error": str(e), "success": False}
     
-    def process_video_with_tracking(self, video_path: str, output_path: Optional[str] = None) -> Dict:
+    def process_video_with_tracking(
+        self,
+        video_path: str,
+        output_path: Optional[str] = None,
+        camera_id: str = "upload",
+        rule_engine: Optional[RuleEngine] = None,
+        preview_scale: Optional[float] = None,
+        sidecar_path: Optional[str] = None,
+        burn_in: bool = True,
+        progress: Optional[Callable[[int, int], None]] = None,
+        index_dir: Optional[str] = None
+    ) -> Dict:
         """
         Procesar video con tracking persistente de personas
         
         Args:
             video_path: Ruta al video de entrada
             output_path: Ruta para guardar video procesado (si None, genera temporal)
+            camera_id: Cámara de origen (selecciona las reglas aplicables)
+            rule_engine: Reglas de riesgo (por defecto SYSTEM_CONFIG['rules'])
+            preview_scale: Escala del video anotado (< 1 = vista previa reducida;
+                por defecto settings.annotation_preview_scale)
+            sidecar_path: Si se indica, guarda las cajas por frame en un
+                sidecar .jsonl.gz para dibujarlas en el cliente
+            burn_in: Dibujar las cajas y codificar un video anotado; con
+                burn_in=False y un sidecar no se re-codifica el video; con
+                output_path *.m3u8 se escriben segmentos HLS a medida que se analizan
+            progress: Callback (frames procesados, total de frames)
+            index_dir: Si se indica, guarda el índice del video (timestamps,
+                keyframes, miniaturas y tiempos de cada track) para seek
             
         Returns:
-            Dict con análisis y ruta del video procesado
+            Dict con análisis, ruta del video procesado (None sin burn_in)
+            y ruta del sidecar
         """
-        if not self.model:
-            return {"error": "Modelo no cargado"}
+        if not self._ensure_loaded():
+            return {"error": f"Modelo no disponible ({self.state.value})"}
         
         try:
             # Abrir video
@@ -229,41 +489,41 @@ class YOLOv8Detector:
             height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             
-            # Generar ruta de salida si no se proporciona
-            if output_path is None:
-                temp_dir = Path(tempfile.gettempdir()) / "yolandita_videos"
-                temp_dir.mkdir(exist_ok=True)
-                output_path = str(temp_dir / f"analyzed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
-            
-            # Crear directorio de salida si no existe
-            output_dir = Path(output_path).parent
-            output_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Usar codec H.264 que es más rápido y compatible
-            # Si falla, intentar con MJPEG
-            try:
-                fourcc = cv2.VideoWriter_fourcc(*'H264')
-                out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            out = None
+            if burn_in:
+                # Generar ruta de salida si no se proporciona
+                if output_path is None:
+                    temp_dir = Path(tempfile.gettempdir()) / "yolandita_videos"
+                    temp_dir.mkdir(exist_ok=True)
+                    output_path = str(temp_dir / f"analyzed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
                 
-                if not out.isOpened():
-                    logger.warning("H264 falló, intentando con MJPEG...")
-                    fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-                    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-            except:
-                # Fallback a MJPEG
-                logger.warning("Usando MJPEG como fallback...")
-                fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-                out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-            
-            if not out.isOpened():
-                logger.error(f"No se pudo abrir VideoWriter. Probando sin codec específico...")
-                fourcc = -1  # Dejar que OpenCV elija
-                out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+                # Crear directorio de salida si no existe
+                Path(output_path).parent.mkdir(parents=True, exist_ok=True)
                 
-            if not out.isOpened():
-                raise Exception(f"No se pudo crear VideoWriter para: {output_path}")
+                renderer = AnnotationRenderer(scale=preview_scale or settings.annotation_preview_scale)
+                out = open_video_writer(output_path, fps, renderer.output_size(width, height))
+            else:
+                output_path = None
+            
+            sidecar = SidecarWriter(sidecar_path, fps, width, height) if sidecar_path else None
+            index = VideoIndexBuilder(
+                index_dir,
+                fps,
+                width,
+                height,
+                thumbnail_interval_ms=int(settings.thumbnail_interval_seconds * 1000),
+                thumbnail_width=settings.thumbnail_width
+            ) if index_dir else None
+            # Los tracks terminados se eliminan del tracker; el sidecar necesita todos
+            seen_tracks = {}
             
-            self.person_tracker = PersonTracker()
+            # Tracker propio de esta llamada: varios videos pueden procesarse a la vez
+            person_tracker = PersonTracker()
+            person_tracker.zone_map = zone_registry.get(camera_id, width, height)
+            zone_dwell_frames = defaultdict(int)
+            rule_engine = rule_engine or load_configured_rules()
+            flagged_tracks = set()
+            rule_matches = []
             frame_idx = 0
             high_risk_frames = 0
             
@@ -280,73 +540,84 @@ class YOLOv8Detector:
                 if frame_idx % 50 == 0:
                     logger.info(f"Procesados {frame_idx}/{total_frames} frames ({int(100*frame_idx/total_frames)}%)")
                 
-                # Detectar personas cada frame
-                results = self.model(
-                    frame,
-                    conf=0.5,
-                    iou=0.45,
-                    max_det=300,
-                    classes=[0],  # Solo personas
-                    verbose=False,
-                    device='0' if settings.use_gpu else 'cpu'
-                )
-                
-                # Extraer detecciones
-                detections = []
-                if results[0].boxes:
-                    for box in results[0].boxes:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        conf = box.conf[0].item()
-                        
-                        detections.append({
-                            'bbox': (int(x1), int(y1), int(x2), int(y2)),
-                            'confidence': conf,
-                            'class_name': 'person'
-                        })
+                # Detectar personas cada frame (solo en las ROI de la cámara si existen)
+                detections = self.detect_frame(frame, camera_id)
                 
                 # Actualizar tracking
-                tracked_detections = self.person_tracker.update(detections)
+                tracked = person_tracker.update(detections)
+                for zone in tracked.zones or ():
+                    if zone:
+                        zone_dwell_frames[zone] += 1
+                
+                # Evaluar reglas solo sobre transiciones del tracker (tiempo de video)
+                for match in rule_engine.update(camera_id, person_tracker, frame_idx / fps):
+                    if match.track_id is not None:
+                        flagged_tracks.add(match.track_id)
+                    rule_matches.append({
+                        'rule_id': match.rule.rule_id,
+                        'rule_type': match.rule.rule_type,
+                        'risk_level': match.rule.risk_level,
+                        'track_id': match.track_id,
+                        'zone': match.zone,
+                        'frame': frame_idx,
+                        'description': match.description
+                    })
+                
+                track_ids = tracked.track_ids.tolist()
+                for track_id in person_tracker.started_tracks:
+                    track = person_tracker.tracks[track_id]
+                    seen_tracks[track_id] = {"name": track['name'], "color": track['color']}
                 
-                # Dibujar en frame
-                for det in tracked_detections:
-                    x1, y1, x2, y2 = det['bbox']
-                    name = det['name']
-                    duration = det['duration_seconds']
-                    color = det.get('color', (0, 255, 0))
-                    
-                    # Detectar riesgo por duración (convertir a int antes de comparar)
-                    is_high_risk = int(duration) > 300  # Más de 5 minutos
-                    if is_high_risk:
+                colors, labels, seconds = [], [], []
+                for track_id in track_ids:
+                    track = person_tracker.tracks[track_id]
+                    duration = person_tracker.duration(track_id, fps)
+                    seconds.append(int(duration))
+                    labels.append(track_label(track['name'], duration))
+                    # Track marcado por alguna regla (p.ej. permanencia > 5 minutos): rojo
+                    if track_id in flagged_tracks:
                         high_risk_frames += 1
-                        color = (0, 0, 255)  # Rojo para alto riesgo
-                    
-                    # Dibujar bounding box
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    
-                    # Dibujar etiqueta con nombre y duración
-                    minutes = int(duration // 60)
-                    seconds = int(duration % 60)
-                    label = f"{name} {minutes}m {seconds}s"
-                    
-                    # Fondo para texto
-                    label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
-                    cv2.rectangle(frame, (x1, y1 - label_size[1] - 4), (x1 + label_size[0], y1), color, -1)
-                    cv2.putText(frame, label, (x1, y1 - 2), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                        colors.append(HIGH_RISK_COLOR)
+                    else:
+                        colors.append(track['color'])
+                
+                if index is not None:
+                    # Antes de dibujar: las miniaturas son del video original
+                    index.add_frame(frame, cap.get(cv2.CAP_PROP_POS_MSEC), track_ids)
+                
+                if sidecar is not None and track_ids:
+                    sidecar.write_frame(
+                        frame_idx,
+                        tracked.int_boxes(),
+                        track_ids,
+                        seconds,
+                        [track_id for track_id in track_ids if track_id in flagged_tracks]
+                    )
+                
+                if out is not None:
+                    # Dibujar en frame: un cv2.rectangle por caja y etiquetas desde sprites cacheados
+                    out.write(renderer.render(frame, tracked.boxes, colors, labels))
                 
-                # Escribir frame procesado
-                success = out.write(frame)
-                if not success:
-                    logger.warning(f"Error escribiendo frame {frame_idx}")
+                if progress is not None:
+                    progress(frame_idx, total_frames)
             
             cap.release()
-            out.release()
+            if out is not None:
+                out.release()
+            if sidecar is not None:
+                sidecar.close(seen_tracks, frame_idx)
+            index_path = None
+            if index is not None:
+                index_path = index.close(video_path, {track_id: info["name"] for track_id, info in seen_tracks.items()})
             
             # Generar resumen
-            summary = self.person_tracker.get_summary(fps)
+            summary = person_tracker.get_summary(fps)
             
             return {
                 "success": True,
                 "video_path": output_path,
+                "sidecar_path": sidecar_path,
+                "index_path": index_path,
                 "video_info": {
                     "fps": fps,
                     "width": width,
@@ -358,7 +629,12 @@ class YOLOv8Detector:
                     "total_persons": len(summary),
                     "high_risk_persons": sum(1 for p in summary if p['risk_level'] == 'crítico'),
                     "high_risk_frames": high_risk_frames,
-                    "persons_tracked": summary
+                    "persons_tracked": summary,
+                    "rule_matches": rule_matches,
+                    "zones": {
+                        zone: {"dwell_seconds": round(frames / fps, 2)}
+                        for zone, frames in zone_dwell_frames.items()
+                    }
                 }
             }
         
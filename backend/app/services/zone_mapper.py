@@ -0,0 +1,176 @@
+"""Polygon Zones rasterized into label masks for O(1) zone lookup"""
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ZoneMap:
+    """
+    Label mask for one camera at one resolution
+
+    Polygons use normalized [0, 1] coordinates so the same definition works
+    for any stream resolution. Label 0 means outside every zone; zone i is
+    stored as label i + 1. Later zones overwrite earlier ones where they
+    overlap.
+    """
+
+    def __init__(self, zones: List[dict], width: int, height: int):
+        """
+        Rasterize zones once
+
+        Args:
+            zones: [{"name": str, "polygon": [[x, y], ...]}] normalized coordinates
+            width: Stream width in pixels
+            height: Stream height in pixels
+        """
+        if len(zones) > 255:
+            raise ValueError("Máximo 255 zonas por cámara")
+
+        self.width = width
+        self.height = height
+        self.names: List[Optional[str]] = [None] + [z["name"] for z in zones]
+        self.mask = np.zeros((height, width), dtype=np.uint8)
+        self._centroids = None
+
+        scale = np.array([width - 1, height - 1], dtype=np.float32)
+        for label, zone in enumerate(zones, start=1):
+            points = np.round(np.asarray(zone["polygon"], dtype=np.float32) * scale).astype(np.int32)
+            cv2.fillPoly(self.mask, [points], label)
+
+    def zone_at(self, x: float, y: float) -> Optional[str]:
+        """Zone containing a pixel (clipped to the frame)"""
+        xi = min(max(int(x), 0), self.width - 1)
+        yi = min(max(int(y), 0), self.height - 1)
+        return self.names[self.mask[yi, xi]]
+
+    def labels_for_boxes(self, boxes) -> np.ndarray:
+        """
+        Zone labels for the foot point (bottom-center) of each box
+
+        Args:
+            boxes: N x 4 array-like of (x1, y1, x2, y2)
+
+        Returns:
+            N uint8 labels (0 = no zone)
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        xs = np.clip(((boxes[:, 0] + boxes[:, 2]) * 0.5).astype(np.int32), 0, self.width - 1)
+        ys = np.clip(boxes[:, 3].astype(np.int32), 0, self.height - 1)
+        return self.mask[ys, xs]
+
+    def zones_for_boxes(self, boxes) -> List[Optional[str]]:
+        """Zone names for the foot point of each box"""
+        return [self.names[label] for label in self.labels_for_boxes(boxes)]
+
+    def centroids(self) -> Dict[str, Tuple[float, float]]:
+        """Pixel centroid of every zone (for heatmap markers, computed once)"""
+        if self._centroids is None:
+            self._centroids = {}
+            for label, name in enumerate(self.names[1:], start=1):
+                ys, xs = np.nonzero(self.mask == label)
+                if len(xs):
+                    self._centroids[name] = (float(xs.mean()), float(ys.mean()))
+        return self._centroids
+
+
+class ZoneRegistry:
+    """Caches one ZoneMap per (camera, resolution); rebuilt when the zone config changes"""
+
+    def __init__(self):
+        # (camera, width, height) -> (zones config object, serialized config, mask)
+        self._maps: Dict[Tuple[str, int, int], tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def zones_for_camera(camera_id: str) -> List[dict]:
+        """Configured zone polygons for a camera"""
+        from app.data import SYSTEM_CONFIG
+
+        return SYSTEM_CONFIG.get("zones", {}).get("cameras", {}).get(camera_id, [])
+
+    def get(self, camera_id: str, width: int, height: int) -> Optional[ZoneMap]:
+        """Get the label mask for a camera, or None if it has no zones"""
+        zones = self.zones_for_camera(camera_id)
+        if not zones:
+            return None
+
+        key = (camera_id, width, height)
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] is zones:
+            return cached[2]
+
+        version = json.dumps(zones, sort_keys=True)
+        if cached is not None and cached[1] == version:
+            self._maps[key] = (zones, version, cached[2])
+            return cached[2]
+
+        with self._lock:
+            zone_map = ZoneMap(zones, width, height)
+            self._maps[key] = (zones, version, zone_map)
+        logger.info(f"🗺️ Zonas rasterizadas para {camera_id} ({width}x{height}): {len(zones)}")
+        return zone_map
+
+    def clear(self):
+        """Drop every cached mask"""
+        with self._lock:
+            self._maps.clear()
+
+
+class ZoneStatistics:
+    """Per-camera, per-zone entries and accumulated dwell time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.dwell_seconds: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def record_entry(self, camera_id: str, zone: Optional[str]):
+        """Count a track entering a zone"""
+        if zone is None:
+            return
+        with self._lock:
+            self.entries[camera_id][zone] += 1
+
+    def record_frame(self, camera_id: str, zone_map: ZoneMap, labels: np.ndarray, frame_seconds: float):
+        """Add one frame of dwell time for every tracked person (vectorized)"""
+        if not len(labels):
+            return
+        counts = np.bincount(labels, minlength=len(zone_map.names))
+        with self._lock:
+            camera_dwell = self.dwell_seconds[camera_id]
+            for label in np.flatnonzero(counts[1:]) + 1:
+                camera_dwell[zone_map.names[label]] += float(counts[label]) * frame_seconds
+
+    def camera_summary(self, camera_id: str) -> Dict[str, dict]:
+        """{zone: {entries, dwell_seconds}} for one camera"""
+        with self._lock:
+            zones = set(self.entries.get(camera_id, {})) | set(self.dwell_seconds.get(camera_id, {}))
+            return {
+                zone: {
+                    "entries": self.entries.get(camera_id, {}).get(zone, 0),
+                    "dwell_seconds": round(self.dwell_seconds.get(camera_id, {}).get(zone, 0.0), 2)
+                }
+                for zone in zones
+            }
+
+    def dwell_by_zone(self, camera_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Total dwell seconds per zone name across every camera, or only camera_ids"""
+        totals: Dict[str, float] = defaultdict(float)
+        with self._lock:
+            for camera_id, camera_dwell in self.dwell_seconds.items():
+                if camera_ids is not None and camera_id not in camera_ids:
+                    continue
+                for zone, seconds in camera_dwell.items():
+                    totals[zone] += seconds
+        return dict(totals)
+
+
+zone_registry = ZoneRegistry()
+zone_statistics = ZoneStatistics()
@@ -0,0 +1,141 @@
+"""Bounding box helpers (NumPy, vectorized)"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def normalized_to_pixels(rect: Sequence[float], width: int, height: int) -> Tuple[int, int, int, int]:
+    """
+    Convert a normalized [x1, y1, x2, y2] rectangle to clipped pixel coordinates
+
+    Args:
+        rect: Rectangle in [0, 1] coordinates
+        width: Frame width
+        height: Frame height
+
+    Returns:
+        (x1, y1, x2, y2) integer pixel rectangle, at least 1 px wide/high
+    """
+    x1 = int(np.clip(rect[0], 0, 1) * width)
+    y1 = int(np.clip(rect[1], 0, 1) * height)
+    x2 = int(np.clip(rect[2], 0, 1) * width)
+    y2 = int(np.clip(rect[3], 0, 1) * height)
+    return x1, y1, max(x2, x1 + 1), max(y2, y1 + 1)
+
+
+def _intersections(boxes_a, boxes_b) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pairwise intersection areas plus the area of every box"""
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+
+    lt = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    rb = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    wh = np.clip(rb - lt, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    return inter, area_a, area_b
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU matrix
+
+    Args:
+        boxes_a: N x 4 (x1, y1, x2, y2)
+        boxes_b: M x 4 (x1, y1, x2, y2)
+
+    Returns:
+        N x M IoU matrix
+    """
+    inter, area_a, area_b = _intersections(boxes_a, boxes_b)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.45) -> np.ndarray:
+    """
+    Greedy non-maximum suppression
+
+    Args:
+        boxes: N x 4 (x1, y1, x2, y2)
+        scores: N confidences
+        iou_threshold: Boxes overlapping a kept box above this IoU are removed
+
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    order = np.argsort(-scores, kind="stable")
+    keep: List[int] = []
+
+    while order.size:
+        best = order[0]
+        keep.append(int(best))
+        if order.size == 1:
+            break
+        ious = box_iou(boxes[best:best + 1], boxes[order[1:]])[0]
+        order = order[1:][ious <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def box_ios(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise intersection over the smaller box
+
+    Unlike IoU this is high when a box is a truncated part of another, which
+    is what a person cut by a tile border looks like.
+    """
+    inter, area_a, area_b = _intersections(boxes_a, boxes_b)
+    return inter / np.maximum(np.minimum(area_a[:, None], area_b[None, :]), 1e-9)
+
+
+def fast_nms(boxes: np.ndarray, scores: np.ndarray, threshold: float = 0.5, metric: str = "iou") -> np.ndarray:
+    """
+    Fully vectorized NMS: a box is dropped if any higher-scoring box overlaps it
+
+    Slightly more aggressive than greedy NMS (a suppressed box can still
+    suppress others) but needs a single N x N matrix and no Python loop.
+
+    Args:
+        boxes: N x 4 (x1, y1, x2, y2)
+        scores: N confidences
+        threshold: Overlap above which the lower-scoring box is removed
+        metric: "iou" or "ios" (intersection over smaller)
+
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    if not len(boxes):
+        return np.zeros(0, dtype=np.int64)
+
+    order = np.argsort(-scores, kind="stable")
+    ordered = boxes[order]
+    overlap = box_ios(ordered, ordered) if metric == "ios" else box_iou(ordered, ordered)
+    overlap = np.triu(overlap, k=1)
+    return order[overlap.max(axis=0) <= threshold]
+
+
+def tile_grid(width: int, height: int, tile_size: int, overlap: float) -> np.ndarray:
+    """
+    Overlapping square tiles covering a width x height area
+
+    The last row/column is aligned to the far edge, so every tile has the
+    full size (unless the area itself is smaller).
+
+    Returns:
+        T x 4 int array of (x1, y1, x2, y2)
+    """
+    def starts(length: int) -> np.ndarray:
+        if length <= tile_size:
+            return np.zeros(1, dtype=np.int64)
+        stride = max(int(tile_size * (1 - overlap)), 1)
+        positions = np.arange(0, length - tile_size, stride)
+        return np.append(positions, length - tile_size)
+
+    xs, ys = np.meshgrid(starts(width), starts(height))
+    xs, ys = xs.ravel(), ys.ravel()
+    return np.stack([xs, ys, np.minimum(xs + tile_size, width), np.minimum(ys + tile_size, height)], axis=1)
@@ -0,0 +1,89 @@
+"""Columnar detection results (one NumPy array per field instead of a dict per box)"""
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+CLASS_NAMES = {0: "person"}
+
+
+@dataclass
+class Detections:
+    """
+    Detections of one frame as columns; row i of every array is box i
+
+    The detector, tracker and rule engine pass this object around; dicts are
+    built only at the JSON boundary with to_dicts().
+    """
+    boxes: np.ndarray  # N x 4 float32 (x1, y1, x2, y2) in frame pixels
+    confidences: np.ndarray  # N float32
+    class_ids: np.ndarray  # N int32
+    track_ids: Optional[np.ndarray] = None  # N int64, set by PersonTracker.update()
+    zones: Optional[List[Optional[str]]] = None  # zone name per box, if the camera has zones
+
+    @classmethod
+    def empty(cls) -> "Detections":
+        """No detections"""
+        return cls.from_arrays(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32))
+
+    @classmethod
+    def from_arrays(cls, boxes, confidences, class_id: int = 0) -> "Detections":
+        """Wrap inference output (boxes N x 4, confidences N) of a single class"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        return cls(
+            boxes=boxes,
+            confidences=np.asarray(confidences, dtype=np.float32).reshape(-1),
+            class_ids=np.full(len(boxes), class_id, dtype=np.int32)
+        )
+
+    @classmethod
+    def from_dicts(cls, detections: Sequence[Dict]) -> "Detections":
+        """Build from the legacy list of {bbox, confidence, class_id} dicts"""
+        if not detections:
+            return cls.empty()
+        return cls(
+            boxes=np.array([d["bbox"] for d in detections], dtype=np.float32).reshape(-1, 4),
+            confidences=np.array([d.get("confidence", 1.0) for d in detections], dtype=np.float32),
+            class_ids=np.array([d.get("class_id", 0) for d in detections], dtype=np.int32)
+        )
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def select(self, index) -> "Detections":
+        """Subset of rows (index array or boolean mask)"""
+        return replace(
+            self,
+            boxes=self.boxes[index],
+            confidences=self.confidences[index],
+            class_ids=self.class_ids[index],
+            track_ids=None if self.track_ids is None else self.track_ids[index],
+            zones=None if self.zones is None else [self.zones[i] for i in np.arange(len(self))[index]]
+        )
+
+    def centroids(self) -> np.ndarray:
+        """N x 2 box centers"""
+        return (self.boxes[:, :2] + self.boxes[:, 2:]) * 0.5
+
+    def int_boxes(self) -> List[tuple]:
+        """Boxes as (x1, y1, x2, y2) integer tuples (drawing, JSON)"""
+        return [tuple(box) for box in self.boxes.astype(np.int32).tolist()]
+
+    def to_dicts(self) -> List[Dict]:
+        """One dict per box, for API responses"""
+        rows = [
+            {
+                "bbox": bbox,
+                "confidence": conf,
+                "class_name": CLASS_NAMES.get(class_id, str(class_id)),
+                "class_id": class_id
+            }
+            for bbox, conf, class_id in zip(self.int_boxes(), self.confidences.tolist(), self.class_ids.tolist())
+        ]
+        if self.track_ids is not None:
+            for row, track_id in zip(rows, self.track_ids.tolist()):
+                row["track_id"] = track_id
+        if self.zones is not None:
+            for row, zone in zip(rows, self.zones):
+                row["zone"] = zone
+        return rows
@@ -1,6 +1,6 @@
 """Helper utility functions"""
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 
 def calculate_roi(
@@ -37,6 +37,16 @@ def calculate_roi(
     }
 
 
+def camera_resolution(camera_id: str) -> Tuple[int, int]:
+    """Configured (width, height) of a camera (1920x1080 if unknown)"""
+    from app.data import CAMERAS_DATA
+    
+    camera = next((cam for cam in CAMERAS_DATA if cam["id"] == camera_id), None)
+    resolution = camera["resolution"] if camera else "1920x1080"
+    width, height = resolution.split("x")
+    return int(width), int(height)
+
+
 def get_time_range(days: int = 7) -> tuple:
     """Get start and end datetime for period"""
     end_time = datetime.utcnow()
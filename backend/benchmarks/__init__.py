@@ -0,0 +1 @@
+"""Performance Benchmarks (run from backend/ with python -m benchmarks.<name>)"""
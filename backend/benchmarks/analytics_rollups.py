@@ -0,0 +1,126 @@
+"""
+Benchmark: analytics window totals from rollups vs aggregating the raw detections table
+
+Usage (from backend/):
+    python -m benchmarks.analytics_rollups --days 365 --rows-per-hour 500
+
+Seeds a temporary SQLite file with a year of synthetic detections (5
+cameras, 6 zones) and the rollups DetectionWriter would have maintained
+for them, then times the dashboard-style query "detections per zone over
+the last N days" both ways: GROUP BY over the detections rows in the window
+(using the (timestamp) index) and rollups.totals(), which reads whole
+days, hours and edge minutes. Both answers are checked to be equal.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import build_engine
+from app.database.models import Detection
+from app.services import rollups
+from benchmarks.common import latency_summary
+
+CAMERAS = [f"CAM-00{i}" for i in range(5)]
+ZONES = ["Entrada", "Caja", "Pasillo", "Almacén", "Estacionamiento", None]
+
+
+async def seed(factory, days: int, rows_per_hour: int, now: datetime) -> int:
+    rng = np.random.default_rng(0)
+    rows_total = 0
+    start = rollups.truncate(now - timedelta(days=days + 1), "hour")
+    hours = int((now - start).total_seconds() // 3600)
+    for day in range(0, hours, 24):
+        rows = []
+        for hour in range(day, min(day + 24, hours)):
+            offsets = np.sort(rng.uniform(0, 3600, rows_per_hour))
+            cameras = rng.integers(0, len(CAMERAS), rows_per_hour)
+            zones = rng.integers(0, len(ZONES), rows_per_hour)
+            base = start + timedelta(hours=hour)
+            rows.extend(
+                {
+                    "camera_id": CAMERAS[c], "timestamp": base + timedelta(seconds=o), "class_name": "person",
+                    "confidence": 0.9, "x1": 0.0, "y1": 0.0, "x2": 1.0, "y2": 1.0, "track_id": 1, "zone": ZONES[z],
+                }
+                for o, c, z in zip(offsets.tolist(), cameras.tolist(), zones.tolist())
+            )
+        async with factory() as session:
+            async with session.begin():
+                await session.execute(insert(Detection.__table__), rows)
+                await rollups.apply(session, rollups.count_detections(rows))
+        rows_total += len(rows)
+    return rows_total
+
+
+async def raw_totals(session, start: datetime, end: datetime) -> dict:
+    table = Detection.__table__
+    query = select(func.coalesce(table.c.zone, ""), func.count()).where(
+        table.c.timestamp >= start, table.c.timestamp < end
+    ).group_by(func.coalesce(table.c.zone, ""))
+    return dict((await session.execute(query)).all())
+
+
+async def rollup_totals(session, start: datetime, end: datetime) -> dict:
+    by_zone = await rollups.totals(session, start, end, by=("zone",))
+    return {zone: counters["detections"] for (zone,), counters in by_zone.items()}
+
+
+async def run(days: int, rows_per_hour: int, windows: list, repeat: int) -> dict:
+    now = datetime.utcnow().replace(microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'analytics.db'}")
+        factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: Detection.__table__.create(sync_conn))
+        async with factory() as session:
+            await rollups.create_tables(session)
+            await session.commit()
+
+        started = time.perf_counter()
+        rows = await seed(factory, days, rows_per_hour, now)
+        report = {"detections": rows, "seed_seconds": round(time.perf_counter() - started, 1), "windows": {}}
+        try:
+            for window in windows:
+                # Mismo inicio para ambas consultas (a la hora fuera de la retención de minutos)
+                start = rollups.effective_start(now - timedelta(days=window))
+                timings = {"raw": [], "rollups": []}
+                results = {}
+                for _ in range(repeat):
+                    for name, query in (("raw", raw_totals), ("rollups", rollup_totals)):
+                        async with factory() as session:
+                            t0 = time.perf_counter()
+                            results[name] = await query(session, start, now)
+                            timings[name].append((time.perf_counter() - t0) * 1000)
+                report["windows"][f"{window}d"] = {
+                    "raw": latency_summary(timings["raw"]),
+                    "rollups": latency_summary(timings["rollups"]),
+                    "speedup": round(np.median(timings["raw"]) / np.median(timings["rollups"]), 1),
+                    "same_result": results["raw"] == results["rollups"],
+                }
+        finally:
+            await engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=365, help="days of synthetic history")
+    parser.add_argument("--rows-per-hour", type=int, default=500)
+    parser.add_argument("--window", type=int, action="append", help="query window in days (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    windows = args.window or [1, 7, 30, 365]
+    print(json.dumps(asyncio.run(run(args.days, args.rows_per_hour, windows, args.repeat)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: per-track cv2 drawing vs AnnotationRenderer with 50 simultaneous tracks
+
+Usage (from backend/):
+    python -m benchmarks.annotation --tracks 50 --frames 300 --width 1920 --height 1080
+
+Tracks walk across the frame and their "Persona N Xm Ys" labels change
+once per second of video, as in process_video_with_tracking. The legacy
+loop calls cv2.getTextSize, two cv2.rectangle and cv2.putText per track per
+frame; the renderer converts the box array to Python ints once, draws
+each outline with a single cv2.rectangle (a NumPy outline store was slower
+at 1080p) and pastes cached label sprites instead of rendering text. A
+downscaled preview mode is measured as well.
+"""
+import argparse
+import json
+
+import cv2
+import numpy as np
+
+from app.services.annotation_renderer import AnnotationRenderer
+from benchmarks.common import latency_summary, time_call
+
+
+def synthetic_tracks(count: int, frames: int, width: int, height: int, seed: int = 0):
+    """Boxes (frames x count x 4), colors and names of tracks moving across the frame"""
+    rng = np.random.default_rng(seed)
+    size = rng.uniform([40, 90], [110, 260], size=(count, 2))
+    start = rng.uniform([0, 0], [width - 110, height - 260], size=(count, 2))
+    velocity = rng.uniform(-3, 3, size=(count, 2))
+    t = np.arange(frames)[:, None, None]
+    # Rebote en los bordes: onda triangular entre 0 y el límite de cada track
+    limit = np.array([width, height]) - size
+    top_left = (start + velocity * t) % (2 * limit)
+    top_left = np.where(top_left > limit, 2 * limit - top_left, top_left)
+    boxes = np.concatenate([top_left, top_left + size], axis=2).astype(np.int32)
+    colors = [tuple(int(c) for c in rng.integers(0, 255, 3)) for _ in range(count)]
+    names = [f"Persona {i + 1}" for i in range(count)]
+    return boxes, colors, names
+
+
+def labels_at(names, frame_index: int, fps: int):
+    """Labels as the tracker formats them (duration changes once per second)"""
+    seconds = frame_index // fps
+    return [f"{name} {seconds // 60}m {seconds % 60}s" for name in names]
+
+
+def draw_legacy(frame, boxes, colors, labels):
+    """Previous render loop of process_video_with_tracking"""
+    for (x1, y1, x2, y2), color, label in zip(boxes.tolist(), colors, labels):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
+        cv2.rectangle(frame, (x1, y1 - label_size[1] - 4), (x1 + label_size[0], y1), color, -1)
+        cv2.putText(frame, label, (x1, y1 - 2), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    return frame
+
+
+def run(tracks: int, frames: int, width: int, height: int, fps: int = 30, preview_scale: float = 0.5) -> dict:
+    """Time every mode on the same frames and tracks"""
+    boxes, colors, names = synthetic_tracks(tracks, frames, width, height)
+    background = np.random.default_rng(1).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    renderer = AnnotationRenderer()
+    preview = AnnotationRenderer(scale=preview_scale)
+
+    modes = {
+        "legacy_cv2": lambda frame, i: draw_legacy(frame, boxes[i], colors, labels_at(names, i, fps)),
+        "renderer": lambda frame, i: renderer.render(frame, boxes[i], colors, labels_at(names, i, fps)),
+        f"renderer_preview_{preview_scale}": lambda frame, i: preview.render(frame, boxes[i], colors, labels_at(names, i, fps)),
+    }
+    report = {"tracks": tracks, "frames": frames, "resolution": f"{width}x{height}"}
+    for name, draw in modes.items():
+        latencies = []
+        for i in range(frames):
+            frame = background.copy()
+            ms, _ = time_call(draw, frame, i)
+            latencies.append(ms)
+        report[name] = latency_summary(latencies)
+
+    report["sprite_hit_rate"] = round(
+        renderer.stats["sprite_hits"] / max(renderer.stats["sprite_hits"] + renderer.stats["sprite_misses"], 1), 3
+    )
+    report["speedup"] = round(report["legacy_cv2"]["p50_ms"] / max(report["renderer"]["p50_ms"], 1e-6), 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tracks", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--preview-scale", type=float, default=0.5)
+    args = parser.parse_args()
+
+    report = run(args.tracks, args.frames, args.width, args.height, preview_scale=args.preview_scale)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Shared helpers for benchmarks: synthetic high-resolution frames and scoring"""
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.utils.boxes import box_iou
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_SOURCE = BACKEND_DIR.parent / "frontend" / "public" / "videos" / "stay_duration_analysis2_web.mp4"
+
+
+def read_frames(source: str, max_frames: int = 60, stride: int = 10) -> List[np.ndarray]:
+    """Read every stride-th frame of a video (or a single image)"""
+    image = cv2.imread(str(source))
+    if image is not None:
+        return [image]
+
+    cap = cv2.VideoCapture(str(source))
+    frames = []
+    index = 0
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % stride == 0:
+            frames.append(frame)
+        index += 1
+    cap.release()
+    return frames
+
+
+def harvest_person_patches(detector, frames: Sequence[np.ndarray], min_height: int = 80) -> List[np.ndarray]:
+    """
+    Cut confident person detections out of real footage
+
+    The patches are pasted onto synthetic frames, so ground truth is known
+    exactly while the model still sees real people.
+    """
+    patches = []
+    for frame in frames:
+        detections = detector.detect_frame(frame)
+        for (x1, y1, x2, y2), conf in zip(detections.int_boxes(), detections.confidences.tolist()):
+            if conf >= 0.6 and y2 - y1 >= min_height:
+                patches.append(frame[y1:y2, x1:x2].copy())
+    return patches
+
+
+def build_synthetic_frames(
+    patches: List[np.ndarray],
+    backgrounds: List[np.ndarray],
+    count: int = 30,
+    size: Tuple[int, int] = (2560, 1440),
+    persons_per_frame: int = 8,
+    region: Optional[Tuple[int, int, int, int]] = None,
+    inside_fraction: float = 0.8,
+    height_range: Tuple[int, int] = (60, 220),
+    seed: int = 0
+) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Compose high-resolution frames with people at known positions
+
+    Args:
+        patches: Person crops to paste
+        backgrounds: Frames used (blurred) as background
+        count: Number of frames
+        size: (width, height) of every frame
+        persons_per_frame: People pasted per frame
+        region: Pixel rectangle where most people are placed (e.g. the camera ROI)
+        inside_fraction: Share of people placed inside region
+        height_range: Min/max person height in pixels (small people are hard at 640)
+        seed: RNG seed
+
+    Returns:
+        [(frame, ground truth boxes N x 4, inside-region mask N)]
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    region = region or (0, 0, width, height)
+    samples = []
+
+    for i in range(count):
+        background = backgrounds[i % len(backgrounds)]
+        frame = cv2.GaussianBlur(cv2.resize(background, (width, height)), (0, 0), 25)
+        boxes, inside = [], []
+
+        for _ in range(persons_per_frame):
+            patch = patches[rng.integers(len(patches))]
+            h = int(rng.integers(*height_range))
+            w = max(int(patch.shape[1] * h / patch.shape[0]), 8)
+            in_region = rng.random() < inside_fraction
+            rx1, ry1, rx2, ry2 = region if in_region else (0, 0, width, height)
+            x1 = int(rng.integers(rx1, max(rx2 - w, rx1 + 1)))
+            y1 = int(rng.integers(ry1, max(ry2 - h, ry1 + 1)))
+            box = np.array([x1, y1, x1 + w, y1 + h], dtype=np.float32)
+            if boxes and box_iou(box, np.array(boxes)).max() > 0.1:
+                continue  # evitar oclusiones: el GT sería ambiguo
+
+            frame[y1:y1 + h, x1:x1 + w] = cv2.resize(patch, (w, h))
+            boxes.append(box)
+            rx1, ry1, rx2, ry2 = region
+            inside.append(x1 >= rx1 and y1 >= ry1 and x1 + w <= rx2 and y1 + h <= ry2)
+
+        samples.append((frame, np.array(boxes, dtype=np.float32).reshape(-1, 4), np.array(inside, dtype=bool)))
+    return samples
+
+
+def match_detections(pred_boxes, gt_boxes, iou_threshold: float = 0.5) -> Tuple[np.ndarray, int]:
+    """
+    Greedy one-to-one matching of predictions to ground truth
+
+    Returns:
+        (matched mask over ground truth, number of unmatched predictions)
+    """
+    pred_boxes = np.asarray(pred_boxes, dtype=np.float32).reshape(-1, 4)
+    matched = np.zeros(len(gt_boxes), dtype=bool)
+    if not len(pred_boxes) or not len(gt_boxes):
+        return matched, len(pred_boxes)
+
+    ious = box_iou(pred_boxes, gt_boxes)
+    false_positives = 0
+    for p in range(len(pred_boxes)):
+        candidates = np.where(~matched & (ious[p] >= iou_threshold))[0]
+        if len(candidates):
+            matched[candidates[np.argmax(ious[p, candidates])]] = True
+        else:
+            false_positives += 1
+    return matched, false_positives
+
+
+def time_call(fn: Callable, *args) -> Tuple[float, object]:
+    """Run fn(*args) and return (milliseconds, result)"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def latency_summary(samples_ms: List[float]) -> dict:
+    """p50 / p95 / mean latency in milliseconds"""
+    ordered = sorted(samples_ms)
+    return {
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 2),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+    }
+
+
+def evaluate(
+    detect: Callable[[np.ndarray], list],
+    samples: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+    warmup: int = 3,
+    small_height: int = 64
+) -> dict:
+    """
+    Latency and accuracy of one detection mode over synthetic samples
+
+    Args:
+        detect: frame -> Detections
+        samples: Output of build_synthetic_frames
+        warmup: Frames run before timing
+        small_height: People shorter than this count as "small"
+
+    Returns:
+        Latency summary plus recall (in region, overall, small people) and precision
+    """
+    for frame, _, _ in samples[:warmup]:
+        detect(frame)
+
+    latencies, matched_all, inside_all, small_all = [], [], [], []
+    false_positives = 0
+    for frame, gt, inside in samples:
+        ms, detections = time_call(detect, frame)
+        latencies.append(ms)
+        matched, fp = match_detections(detections.boxes, gt)
+        matched_all.append(matched)
+        inside_all.append(inside)
+        small_all.append((gt[:, 3] - gt[:, 1]) < small_height)
+        false_positives += fp
+
+    matched = np.concatenate(matched_all)
+    inside = np.concatenate(inside_all)
+    small = np.concatenate(small_all)
+    true_positives = int(matched.sum())
+
+    def recall(mask):
+        return round(float(matched[mask].mean()), 3) if mask.any() else None
+
+    return {
+        **latency_summary(latencies),
+        "recall_in_region": recall(inside),
+        "recall_overall": recall(np.ones_like(matched)),
+        "recall_small": recall(small),
+        "precision": round(true_positives / max(true_positives + false_positives, 1), 3),
+    }
@@ -0,0 +1,88 @@
+"""
+Benchmark: decoding from the start vs keyframe-indexed seeks to a timestamp
+
+Usage (from backend/):
+    python -m benchmarks.seek --source ../frontend/public/videos/stay_duration_analysis2_web.mp4 --seeks 20
+
+Builds the video index once (as ingest does), then fetches random
+timestamps both by reading frames from the beginning and with
+read_frame_at(), and checks that both return the same frame.
+"""
+import argparse
+import json
+import tempfile
+
+import cv2
+import numpy as np
+
+from app.services.video_index import VideoIndexBuilder, frame_at, load_index, read_frame_at
+from benchmarks.common import DEFAULT_SOURCE, latency_summary, time_call
+
+
+def build_index(source: str, index_dir: str) -> dict:
+    """Index a video the way process_video_with_tracking does"""
+    cap = cv2.VideoCapture(source)
+    builder = VideoIndexBuilder(
+        index_dir,
+        cap.get(cv2.CAP_PROP_FPS) or 30,
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    )
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        builder.add_frame(frame, cap.get(cv2.CAP_PROP_POS_MSEC), [])
+    cap.release()
+    builder.close(source, {})
+    return load_index(index_dir)
+
+
+def decode_from_start(source: str, position: int) -> np.ndarray:
+    """Previous approach: read every frame up to the target"""
+    cap = cv2.VideoCapture(source)
+    for _ in range(position):
+        cap.grab()
+    _, frame = cap.read()
+    cap.release()
+    return frame
+
+
+def run(source: str, seeks: int, seed: int = 0) -> dict:
+    with tempfile.TemporaryDirectory() as index_dir:
+        index_ms, index = time_call(build_index, source, index_dir)
+    targets = np.random.default_rng(seed).uniform(0, index["duration_ms"], seeks)
+
+    sequential, indexed, mismatches = [], [], 0
+    for t_ms in targets:
+        ms, expected = time_call(decode_from_start, source, frame_at(index, t_ms))
+        sequential.append(ms)
+        ms, (_, _, frame) = time_call(read_frame_at, source, index, t_ms)
+        indexed.append(ms)
+        mismatches += not np.array_equal(expected, frame)
+
+    report = {
+        "source": source,
+        "frames": index["frames"],
+        "duration_ms": index["duration_ms"],
+        "keyframes": len(index["keyframes"]) if index["keyframes"] is not None else None,
+        "index_build_ms": round(index_ms, 1),
+        "decode_from_start": latency_summary(sequential),
+        "indexed_seek": latency_summary(indexed),
+        "mismatches": mismatches
+    }
+    report["speedup"] = round(report["decode_from_start"]["p50_ms"] / max(report["indexed_seek"]["p50_ms"], 1e-6), 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default=str(DEFAULT_SOURCE))
+    parser.add_argument("--seeks", type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.source, args.seeks), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
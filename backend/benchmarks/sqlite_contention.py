@@ -0,0 +1,139 @@
+"""
+Benchmark: SQLite read/write contention, default engine vs WAL + PRAGMAs + pooled connections
+
+Usage (from backend/):
+    python -m benchmarks.sqlite_contention --seconds 10 --readers 4
+
+One writer inserts detection batches (DetectionWriter-sized transactions)
+in a loop while several readers run the dashboard-style queries
+(recent detections of a camera, counts per camera). The default engine is
+what database.py created before: rollback journal, synchronous=FULL and
+NullPool (a new connection per session). The tuned engine is
+build_engine(): WAL, synchronous=NORMAL, mmap, cache_size and a pool.
+Each engine gets a fresh database file seeded with the same rows.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database.database import build_engine
+from app.database.models import Detection
+from benchmarks.common import latency_summary
+
+CAMERAS = [f"CAM-00{i}" for i in range(5)]
+
+
+def detection_batch(rng, rows: int, start: datetime) -> list:
+    xy = rng.uniform(0, 1800, (rows, 2))
+    return [
+        {
+            "camera_id": CAMERAS[i % len(CAMERAS)],
+            "timestamp": start + timedelta(milliseconds=i * 10),
+            "class_name": "person",
+            "confidence": 0.9,
+            "x1": x, "y1": y, "x2": x + 80, "y2": y + 200,
+            "track_id": i % 40,
+            "zone": None,
+        }
+        for i, (x, y) in enumerate(xy.tolist())
+    ]
+
+
+async def writer(engine, stop: asyncio.Event, batch_rows: int, stats: dict):
+    rng = np.random.default_rng(1)
+    while not stop.is_set():
+        rows = detection_batch(rng, batch_rows, datetime.utcnow())
+        started = time.perf_counter()
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(insert(Detection.__table__), rows)
+        except OperationalError:
+            stats["write_errors"] += 1
+            continue
+        stats["write_ms"].append((time.perf_counter() - started) * 1000)
+        stats["rows"] += batch_rows
+        await asyncio.sleep(0)
+
+
+async def reader(engine, stop: asyncio.Event, index: int, stats: dict):
+    table = Detection.__table__
+    queries = [
+        select(table).where(table.c.camera_id == CAMERAS[index % len(CAMERAS)]).order_by(table.c.id.desc()).limit(100),
+        select(table.c.camera_id, func.count()).group_by(table.c.camera_id),
+    ]
+    turn = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            async with engine.connect() as conn:
+                (await conn.execute(queries[turn % 2])).all()
+        except OperationalError:
+            stats["read_errors"] += 1
+            continue
+        stats["read_ms"].append((time.perf_counter() - started) * 1000)
+        turn += 1
+
+
+async def run_engine(engine, seconds: float, readers: int, batch_rows: int, seed_rows: int) -> dict:
+    async with engine.begin() as conn:
+        await conn.run_sync(Detection.__table__.create)
+        rng = np.random.default_rng(0)
+        for _ in range(seed_rows // 5000):
+            await conn.execute(insert(Detection.__table__), detection_batch(rng, 5000, datetime.utcnow()))
+
+    stats = {"rows": 0, "write_ms": [], "read_ms": [], "write_errors": 0, "read_errors": 0}
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(writer(engine, stop, batch_rows, stats))]
+    tasks += [asyncio.create_task(reader(engine, stop, i, stats)) for i in range(readers)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    await engine.dispose()
+
+    return {
+        "rows_written_per_second": round(stats["rows"] / seconds),
+        "write_transaction": latency_summary(stats["write_ms"]) if stats["write_ms"] else None,
+        "reads_per_second": round(len(stats["read_ms"]) / seconds, 1),
+        "read": latency_summary(stats["read_ms"]) if stats["read_ms"] else None,
+        "read_max_ms": round(max(stats["read_ms"]), 2) if stats["read_ms"] else None,
+        "locked_errors": stats["write_errors"] + stats["read_errors"],
+    }
+
+
+async def run(seconds: float, readers: int, batch_rows: int, seed_rows: int) -> dict:
+    report = {"seconds": seconds, "readers": readers, "batch_rows": batch_rows, "seed_rows": seed_rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        default_url = f"sqlite+aiosqlite:///{Path(tmp) / 'default.db'}"
+        tuned_url = f"sqlite+aiosqlite:///{Path(tmp) / 'tuned.db'}"
+        report["default"] = await run_engine(
+            create_async_engine(default_url, connect_args={"check_same_thread": False}),
+            seconds, readers, batch_rows, seed_rows
+        )
+        report["tuned"] = await run_engine(build_engine(tuned_url), seconds, readers, batch_rows, seed_rows)
+    for key in ("rows_written_per_second", "reads_per_second"):
+        report[f"{key}_gain"] = round(report["tuned"][key] / max(report["default"][key], 1e-6), 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batch-rows", type=int, default=400, help="rows per write transaction")
+    parser.add_argument("--seed-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.seconds, args.readers, args.batch_rows, args.seed_rows)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from benchmarks.startup import import_probe
 
 client = TestClient(app)
 
@@ -24,6 +25,18 @@ class TestHealthEndpoints:
         data = response.json()
         assert "api" in data
         assert "database" in data
+        assert data["yolov8"] == data["model"]["state"]
+    
+    def test_readiness_until_model_warm(self):
+        """Test readiness probe fails while the model is not ready"""
+        response = client.get("/api/v1/health/ready")
+        data = response.json()
+        assert response.status_code == (200 if data["ready"] else 503)
+        assert data["ready"] == (data["yolov8"] == "ready")
+    
+    def test_app_import_defers_heavy_modules(self):
+        """Test importing the app does not load cv2, numpy, the model or the ORM"""
+        assert import_probe()["heavy"] == []
 
 
 class TestVideoEndpoints:
@@ -47,6 +60,58 @@ class TestVideoEndpoints:
         })
         assert response.status_code == 200
     
+    @pytest.mark.asyncio
+    async def test_stream_frames_become_incidents(self, tmp_path, monkeypatch):
+        """Test frames of a started stream reach the pipeline and publish an incident"""
+        import asyncio
+        import cv2
+        import httpx
+        import numpy as np
+        from app.api.routes.video import video_processor
+        from app.config import settings
+        from app.services.alert_service import AlertService
+        from app.services.detection_pipeline import DetectionPipeline
+        from app.services.event_bus import EventBus, IncidentCreatedEvent
+        from app.services.incident_logger import IncidentLogger
+        from app.services.rule_engine import PersonCountRule, RuleEngine
+        
+        video = str(tmp_path / "camera.avi")
+        writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+        for _ in range(20):
+            writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        writer.release()
+        
+        class TwoPeople:
+            def detect_objects(self, frame, camera_id=None, columnar=False):
+                return {"success": True, "detections": [
+                    {"bbox": (2, 2, 12, 30), "confidence": 0.9, "class_name": "person"},
+                    {"bbox": (40, 2, 50, 30), "confidence": 0.9, "class_name": "person"},
+                ]}
+        
+        monkeypatch.setattr(settings, "frame_processing_interval", 0)
+        monkeypatch.setattr(settings, "clip_recording_enabled", False)
+        bus = EventBus()
+        pipeline = DetectionPipeline(
+            TwoPeople(), bus, IncidentLogger(), AlertService(),
+            rule_engine=RuleEngine([PersonCountRule("crowd", max_persons=1)])
+        )
+        incidents = bus.subscribe("test", IncidentCreatedEvent)
+        await pipeline.start()
+        monkeypatch.setattr(app.state, "detection_pipeline", pipeline, raising=False)
+        
+        async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+            response = await http.post("/api/v1/video/stream/start", json={"camera_id": "cam-route", "stream_url": video})
+            assert response.status_code == 200
+            assert (await http.post("/api/v1/video/stream/start", json={"camera_id": "cam-route", "stream_url": video})).status_code == 409
+            
+            event = await asyncio.wait_for(incidents.get(), timeout=10)
+            response = await http.post("/api/v1/video/stream/stop", json={"camera_id": "cam-route"})
+        await pipeline.stop()
+        
+        assert event.camera_id == "cam-route"
+        assert response.json()["message"] == "Video stream stopped"
+        assert "cam-route" not in video_processor.tasks and "cam-route" not in video_processor.active_streams
+    
     def test_list_streams(self):
         """Test listing active streams"""
         response = client.get("/api/v1/video/streams")
@@ -77,6 +142,17 @@ class TestIncidentEndpoints:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
     
+    def test_get_incidents_with_offset(self):
+        """Test that offset clients still get offset and total"""
+        client.post("/api/v1/incidents/report", json={
+            "camera_id": "CAM-001",
+            "incident_type": "suspicious_behavior",
+            "risk_level": "high"
+        })
+        data = client.get("/api/v1/incidents", params={"offset": 0, "limit": 1}).json()
+        assert data["offset"] == 0 and data["total"] >= 1 and len(data["incidents"]) == 1
+        assert "total" not in client.get("/api/v1/incidents").json()
+    
     def test_get_incident_detail(self):
         """Test getting incident details"""
         # First create an incident
@@ -91,6 +167,39 @@ class TestIncidentEndpoints:
         response = client.get(f"/api/v1/incidents/{incident_id}")
         assert response.status_code == 200
         assert response.json()["id"] == incident_id
+    
+    def test_confirm_incident(self):
+        """Test confirming an incident"""
+        create_resp = client.post("/api/v1/incidents/report", json={
+            "camera_id": "CAM-001",
+            "incident_type": "suspicious_behavior",
+            "risk_level": "high"
+        })
+        incident_id = create_resp.json()["id"]
+        
+        response = client.put(f"/api/v1/incidents/{incident_id}/confirm", json={"confirmed": True})
+        assert response.status_code == 200
+        assert response.json()["id"] == incident_id and response.json()["confirmed"] is True
+        
+        missing = client.put("/api/v1/incidents/INC-MISSING/confirm", json={"confirmed": True})
+        assert missing.status_code == 404
+    
+    def test_clip_falls_back_to_raw_h264(self, tmp_path):
+        """Test the clip endpoint serves the raw H.264 when the MP4 remux failed"""
+        from app.api.routes.incidents import incident_logger
+        
+        incident_id = incident_logger.log_incident(
+            camera_id="CAM-001",
+            incident_type="loitering",
+            risk_level="high",
+            detection_data={"clip_path": str(tmp_path / "clip.mp4")}
+        )
+        assert client.get(f"/api/v1/incidents/{incident_id}/clip").headers.get("Retry-After") == "10"
+        
+        (tmp_path / "clip.h264").write_bytes(b"\x00\x00\x00\x01")
+        response = client.get(f"/api/v1/incidents/{incident_id}/clip")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "video/h264"
 
 
 class TestAnalyticsEndpoints:
@@ -112,6 +221,22 @@ class TestAnalyticsEndpoints:
         assert "heatmap" in data
         assert "high_risk_zones" in data
     
+    def test_heatmap_uses_configured_zones(self):
+        """Test heatmap markers come from the camera's polygon zones"""
+        response = client.get("/api/v1/analytics/heatmap?camera_id=cam-004&days=7")
+        assert response.status_code == 200
+        zones = response.json()["high_risk_zones"]
+        assert [z["zone_name"] for z in zones] == ["Almacén"]
+    
+    def test_risk_patterns_ignore_other_stores(self, monkeypatch):
+        """Test live dwell of cameras outside the store is not used as its risk"""
+        from app.services.zone_mapper import zone_statistics
+        
+        monkeypatch.setattr(zone_statistics, "dwell_seconds", {"cam-004": {"Almacén": 120.0}})
+        response = client.get("/api/v1/analytics/risk-patterns?store_id=STORE-OTHER&days=7")
+        assert response.status_code == 200
+        assert "Almacén" not in response.json()["patterns"]["risk_by_zone"]
+    
     def test_get_metrics(self):
         """Test detection metrics endpoint"""
         response = client.get("/api/v1/analytics/detection-metrics?camera_id=CAM-001")
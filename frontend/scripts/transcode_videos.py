@@ -1,49 +1,182 @@
+"""
+Convierte public/videos/*.mp4 a H.264/AAC con faststart (<nombre>_web.mp4)
+
+Uso:
+    python scripts/transcode_videos.py [--jobs N] [--hash] [--force]
+
+Incremental: un manifiesto (public/videos/.transcode_manifest.json) guarda
+tamaño y mtime (o hash con --hash) de cada fuente y los parámetros de
+codificación; si no cambiaron y la salida existe, el archivo se omite.
+Los videos pendientes se convierten en paralelo con N procesos de ffmpeg.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
 import subprocess
+import time
 import imageio_ffmpeg
 
 ROOT = Path(__file__).resolve().parents[1]
 VIDEOS_DIR = ROOT / "public" / "videos"
+MANIFEST_PATH = VIDEOS_DIR / ".transcode_manifest.json"
 
-ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
-
-video_files = [
-    file_path
-    for file_path in sorted(VIDEOS_DIR.glob("*.mp4"))
-    if "_web" not in file_path.stem and "_backup_original" not in file_path.stem
+ENCODE_ARGS = [
+    "-map", "0:v:0",
+    "-map", "0:a?",
+    "-c:v", "libx264",
+    "-preset", "veryfast",
+    "-crf", "23",
+    "-pix_fmt", "yuv420p",
+    "-movflags", "+faststart",
+    "-c:a", "aac",
+    "-b:a", "128k",
 ]
-if not video_files:
-    print("No se encontraron videos en:", VIDEOS_DIR)
-    raise SystemExit(0)
-
-print("FFmpeg:", ffmpeg)
-for source in video_files:
-    temp_output = source.with_name(source.stem + "_web.mp4")
-    cmd = [
-        ffmpeg,
-        "-y",
-        "-i",
-        str(source),
-        "-map", "0:v:0",
-        "-map", "0:a?",
-        "-c:v", "libx264",
-        "-preset", "veryfast",
-        "-crf", "23",
-        "-pix_fmt", "yuv420p",
-        "-movflags", "+faststart",
-        "-c:a", "aac",
-        "-b:a", "128k",
-        str(temp_output),
-    ]
+# Cambiar los parámetros invalida todas las entradas del manifiesto
+ENCODE_SIGNATURE = hashlib.sha1(" ".join(ENCODE_ARGS).encode()).hexdigest()[:12]
+
+
+def output_for(source):
+    return source.with_name(source.stem + "_web.mp4")
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(source, use_hash):
+    stat = source.stat()
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "encode": ENCODE_SIGNATURE}
+    if use_hash:
+        entry["sha1"] = file_hash(source)
+    return entry
+
+
+def is_up_to_date(source, previous, use_hash):
+    """La salida existe y la fuente no cambió desde la última conversión"""
+    if previous is None or not output_for(source).exists():
+        return False
+    if previous.get("encode") != ENCODE_SIGNATURE:
+        return False
+    stat = source.stat()
+    if stat.st_size != previous.get("size"):
+        return False
+    if stat.st_mtime_ns == previous.get("mtime_ns"):
+        return True
+    # Con --hash, un mtime distinto (checkout, copia) no obliga a reconvertir
+    return use_hash and previous.get("sha1") == file_hash(source)
+
+
+def load_manifest():
+    try:
+        return json.loads(MANIFEST_PATH.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
 
-    print(f"\nConvirtiendo: {source.name}")
+def save_manifest(manifest):
+    temp = MANIFEST_PATH.with_suffix(".tmp")
+    temp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    temp.replace(MANIFEST_PATH)
+
+
+def transcode(ffmpeg, source, threads):
+    """Convierte un video; escribe a un temporal y renombra al terminar"""
+    output = output_for(source)
+    temp_output = output.with_name("." + output.stem + ".part.mp4")
+    cmd = [ffmpeg, "-y", "-i", str(source), *ENCODE_ARGS, "-threads", str(threads), str(temp_output)]
+
+    start = time.perf_counter()
     result = subprocess.run(cmd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
 
     if result.returncode != 0:
-        print("Error convirtiendo", source.name)
-        print(result.stderr[-1200:])
-        continue
+        temp_output.unlink(missing_ok=True)
+        return source, elapsed, result.stderr[-1200:]
+    temp_output.replace(output)
+    return source, elapsed, None
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=max(1, cpu_count // 2), help="procesos de ffmpeg en paralelo")
+    parser.add_argument("--hash", action="store_true", help="comparar contenido (sha1) cuando cambia el mtime")
+    parser.add_argument("--force", action="store_true", help="reconvertir aunque la salida esté al día")
+    args = parser.parse_args()
+
+    video_files = [
+        file_path
+        for file_path in sorted(VIDEOS_DIR.glob("*.mp4"))
+        if "_web" not in file_path.stem and "_backup_original" not in file_path.stem
+    ]
+    if not video_files:
+        print("No se encontraron videos en:", VIDEOS_DIR)
+        raise SystemExit(0)
+
+    manifest = load_manifest()
+    pending = [
+        source for source in video_files
+        if args.force or not is_up_to_date(source, manifest.get(source.name), args.hash)
+    ]
+    skipped = len(video_files) - len(pending)
+
+    # Fuentes con mtime nuevo pero mismo contenido: guardar el mtime para no volver a hashear
+    refreshed = False
+    for source in video_files:
+        previous = manifest.get(source.name)
+        if source not in pending and previous and previous.get("mtime_ns") != source.stat().st_mtime_ns:
+            previous["mtime_ns"] = source.stat().st_mtime_ns
+            refreshed = True
+    if refreshed:
+        save_manifest(manifest)
+
+    print(f"{len(video_files)} videos: {skipped} al día, {len(pending)} por convertir")
+    if not pending:
+        raise SystemExit(0)
+
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+    jobs = max(1, min(args.jobs, len(pending)))
+    # Repartir los núcleos entre los procesos para no sobresuscribir la CPU
+    threads = max(1, cpu_count // jobs)
+    print("FFmpeg:", ffmpeg)
+    print(f"Paralelo: {jobs} procesos x {threads} hilos")
+
+    start = time.perf_counter()
+    total_bytes = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(transcode, ffmpeg, source, threads) for source in pending]
+        for future in as_completed(futures):
+            source, elapsed, error = future.result()
+            if error:
+                failed += 1
+                print(f"\nError convirtiendo {source.name}")
+                print(error)
+                continue
+
+            size_mb = source.stat().st_size / 1e6
+            total_bytes += source.stat().st_size
+            print(f"OK: {output_for(source).name} ({size_mb:.1f} MB en {elapsed:.1f} s, {size_mb / max(elapsed, 1e-6):.1f} MB/s)")
+            manifest[source.name] = fingerprint(source, args.hash)
+            save_manifest(manifest)
+
+    elapsed = time.perf_counter() - start
+    converted = len(pending) - failed
+    print(
+        f"\nProceso terminado: {converted} convertidos, {skipped} omitidos, {failed} con error "
+        f"en {elapsed:.1f} s ({total_bytes / 1e6 / max(elapsed, 1e-6):.1f} MB/s, "
+        f"{converted / max(elapsed, 1e-6):.2f} videos/s)"
+    )
+    if failed:
+        raise SystemExit(1)
 
-    print(f"OK: {temp_output.name}")
 
-print("\nProceso terminado.")
+if __name__ == "__main__":
+    main()
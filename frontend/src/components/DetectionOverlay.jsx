@@ -0,0 +1,114 @@
+import React, { useEffect, useRef, useState } from 'react';
+
+const HIGH_RISK_COLOR = '#ff0000';
+
+// Parse the gzip'd JSON-lines sidecar (the browser already decompressed it)
+const parseSidecar = (text) => {
+  const sidecar = { header: {}, frames: new Map(), tracks: {} };
+  for (const line of text.split('\n')) {
+    if (!line) continue;
+    const record = JSON.parse(line);
+    if (record.type === 'header') sidecar.header = record;
+    else if (record.type === 'tracks') sidecar.tracks = record.tracks;
+    else sidecar.frames.set(record.f, record);
+  }
+  return sidecar;
+};
+
+const formatLabel = (name, seconds) => `${name} ${Math.floor(seconds / 60)}m ${seconds % 60}s`;
+
+/**
+ * Video player with the tracked boxes drawn on a canvas overlay.
+ * Boxes come from the detection sidecar, so the original video is played
+ * as uploaded instead of a re-encoded copy with the boxes burned in.
+ */
+const DetectionOverlay = ({ src, sidecarUrl, className = '', videoRef: externalRef }) => {
+  const ownRef = useRef(null);
+  const videoRef = externalRef || ownRef;
+  const canvasRef = useRef(null);
+  const [sidecar, setSidecar] = useState(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    fetch(sidecarUrl)
+      .then((response) => (response.ok ? response.text() : Promise.reject(new Error(response.statusText))))
+      .then((text) => !cancelled && setSidecar(parseSidecar(text)))
+      .catch((err) => console.error('Sidecar error:', err));
+    return () => {
+      cancelled = true;
+    };
+  }, [sidecarUrl]);
+
+  useEffect(() => {
+    const video = videoRef.current;
+    const canvas = canvasRef.current;
+    if (!video || !canvas || !sidecar) return undefined;
+
+    const ctx = canvas.getContext('2d');
+    const { fps = 30, width = video.videoWidth, height = video.videoHeight } = sidecar.header;
+    let handle = null;
+
+    const draw = () => {
+      const rect = video.getBoundingClientRect();
+      if (canvas.width !== rect.width || canvas.height !== rect.height) {
+        canvas.width = rect.width;
+        canvas.height = rect.height;
+      }
+      ctx.clearRect(0, 0, canvas.width, canvas.height);
+
+      const record = sidecar.frames.get(Math.floor(video.currentTime * fps) + 1);
+      if (!record || !width || !height) return;
+
+      // object-contain: the video is letterboxed inside the element
+      const scale = Math.min(canvas.width / width, canvas.height / height);
+      const offsetX = (canvas.width - width * scale) / 2;
+      const offsetY = (canvas.height - height * scale) / 2;
+      const flagged = new Set(record.r || []);
+
+      ctx.lineWidth = 2;
+      ctx.font = '12px sans-serif';
+      ctx.textBaseline = 'bottom';
+      record.b.forEach(([x1, y1, x2, y2], i) => {
+        const trackId = record.t[i];
+        const track = sidecar.tracks[trackId] || { name: `Persona ${trackId}`, color: '#00ff00' };
+        const color = flagged.has(trackId) ? HIGH_RISK_COLOR : track.color;
+        const x = offsetX + x1 * scale;
+        const y = offsetY + y1 * scale;
+
+        ctx.strokeStyle = color;
+        ctx.strokeRect(x, y, (x2 - x1) * scale, (y2 - y1) * scale);
+
+        const label = formatLabel(track.name, record.s[i]);
+        const labelWidth = ctx.measureText(label).width + 4;
+        ctx.fillStyle = color;
+        ctx.fillRect(x, y - 16, labelWidth, 16);
+        ctx.fillStyle = '#ffffff';
+        ctx.fillText(label, x + 2, y - 2);
+      });
+    };
+
+    // Redraw on every presented frame when supported, otherwise on animation frames
+    const hasFrameCallback = 'requestVideoFrameCallback' in HTMLVideoElement.prototype;
+    const loop = () => {
+      draw();
+      handle = hasFrameCallback ? video.requestVideoFrameCallback(loop) : requestAnimationFrame(loop);
+    };
+    loop();
+    video.addEventListener('seeked', draw);
+
+    return () => {
+      video.removeEventListener('seeked', draw);
+      if (hasFrameCallback) video.cancelVideoFrameCallback(handle);
+      else cancelAnimationFrame(handle);
+    };
+  }, [sidecar]);
+
+  return (
+    <div className={`relative ${className}`}>
+      <video ref={videoRef} controls className="w-full h-full object-contain" src={src} />
+      <canvas ref={canvasRef} className="absolute inset-0 w-full h-full pointer-events-none" />
+    </div>
+  );
+};
+
+export default DetectionOverlay;
@@ -0,0 +1,126 @@
+import React, { useEffect, useRef } from 'react';
+
+const POLL_MS = 2000;
+
+// Segment URIs of a media playlist, plus the init segment and end marker
+const parsePlaylist = (text) => {
+  const lines = text.split('\n').map((line) => line.trim());
+  const map = lines.find((line) => line.startsWith('#EXT-X-MAP:'));
+  return {
+    init: map ? map.match(/URI="([^"]+)"/)[1] : null,
+    segments: lines.filter((line) => line && !line.startsWith('#')),
+    ended: lines.includes('#EXT-X-ENDLIST'),
+  };
+};
+
+const hex = (byte) => byte.toString(16).padStart(2, '0');
+
+// MIME type from the avcC box of the init segment: avc1.<profile><constraints><level>.
+// The backend picks the H.264 level from the video resolution, so it is read, not assumed.
+const mimeCodecFromInit = (buffer) => {
+  const bytes = new Uint8Array(buffer);
+  for (let i = 4; i + 7 < bytes.length; i += 1) {
+    // 'avcC' followed by configurationVersion = 1
+    if (bytes[i] === 0x61 && bytes[i + 1] === 0x76 && bytes[i + 2] === 0x63 && bytes[i + 3] === 0x43
+        && bytes[i + 4] === 1) {
+      return `video/mp4; codecs="avc1.${hex(bytes[i + 5])}${hex(bytes[i + 6])}${hex(bytes[i + 7])}"`;
+    }
+  }
+  return null;
+};
+
+const waitForUpdate = (sourceBuffer) =>
+  new Promise((resolve) => sourceBuffer.addEventListener('updateend', resolve, { once: true }));
+
+/**
+ * Plays the fMP4 HLS output of a video that may still be under analysis.
+ * Browsers with native HLS get the playlist directly; elsewhere the playlist
+ * is polled and each new segment is appended through Media Source Extensions,
+ * so playback can start as soon as the first segment is analyzed.
+ */
+const HlsPlayer = ({ playlistUrl, className = '', videoRef: externalRef }) => {
+  const ownRef = useRef(null);
+  const videoRef = externalRef || ownRef;
+
+  useEffect(() => {
+    const video = videoRef.current;
+    if (!video) return undefined;
+
+    if (video.canPlayType('application/vnd.apple.mpegurl')) {
+      video.src = playlistUrl;
+      return undefined;
+    }
+    if (!('MediaSource' in window)) {
+      console.error('HLS playback not supported in this browser');
+      return undefined;
+    }
+
+    const base = playlistUrl.slice(0, playlistUrl.lastIndexOf('/') + 1);
+    const mediaSource = new MediaSource();
+    const objectUrl = URL.createObjectURL(mediaSource);
+    let cancelled = false;
+    let timer = null;
+    video.src = objectUrl;
+
+    const fetchBuffer = async (uri) => {
+      const response = await fetch(base + uri);
+      if (!response.ok) throw new Error(`${uri}: ${response.status}`);
+      return response.arrayBuffer();
+    };
+
+    mediaSource.addEventListener('sourceopen', async () => {
+      // Created once the init segment tells which codec to declare
+      let sourceBuffer = null;
+      let appended = 0;
+
+      const append = async (data) => {
+        sourceBuffer.appendBuffer(data);
+        await waitForUpdate(sourceBuffer);
+      };
+
+      const poll = async () => {
+        try {
+          const response = await fetch(playlistUrl, { cache: 'no-store' });
+          // 404 until the first segment has been analyzed
+          if (response.ok) {
+            const playlist = parsePlaylist(await response.text());
+            if (!sourceBuffer && playlist.init) {
+              const init = await fetchBuffer(playlist.init);
+              const mimeCodec = mimeCodecFromInit(init);
+              if (!mimeCodec || !MediaSource.isTypeSupported(mimeCodec)) {
+                console.error(`HLS codec not supported in this browser: ${mimeCodec}`);
+                return;
+              }
+              if (cancelled) return;
+              sourceBuffer = mediaSource.addSourceBuffer(mimeCodec);
+              await append(init);
+            }
+            while (!cancelled && sourceBuffer && appended < playlist.segments.length) {
+              await append(await fetchBuffer(playlist.segments[appended]));
+              appended += 1;
+            }
+            if (playlist.ended) {
+              if (!cancelled && mediaSource.readyState === 'open') mediaSource.endOfStream();
+              return;
+            }
+          }
+        } catch (err) {
+          console.error('HLS error:', err);
+        }
+        if (!cancelled) timer = setTimeout(poll, POLL_MS);
+      };
+
+      poll();
+    });
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+      URL.revokeObjectURL(objectUrl);
+    };
+  }, [playlistUrl]);
+
+  return <video ref={videoRef} controls className={className} />;
+};
+
+export default HlsPlayer;
@@ -0,0 +1,117 @@
+import React, { useEffect, useRef, useState } from 'react';
+import { User } from 'lucide-react';
+import { API_BASE_URL } from '../config/api';
+
+const formatTime = (ms) => {
+  const seconds = Math.floor(ms / 1000);
+  return `${Math.floor(seconds / 60)}m ${seconds % 60}s`;
+};
+
+// Last thumbnail taken at or before t
+const thumbnailAt = (thumbnails, t) => {
+  const { times_ms: times } = thumbnails;
+  let lo = 0;
+  let hi = times.length - 1;
+  while (lo < hi) {
+    const mid = Math.ceil((lo + hi) / 2);
+    if (times[mid] <= t) lo = mid;
+    else hi = mid - 1;
+  }
+  return lo;
+};
+
+/**
+ * Scrub bar with sprite thumbnails and "jump to" buttons per tracked person,
+ * driven by the video index built at ingest time.
+ */
+const VideoTimeline = ({ indexUrl, videoRef }) => {
+  const [index, setIndex] = useState(null);
+  const [hover, setHover] = useState(null);
+  const barRef = useRef(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    fetch(indexUrl)
+      .then((response) => (response.ok ? response.json() : Promise.reject(new Error(response.statusText))))
+      .then((data) => !cancelled && setIndex(data))
+      .catch((err) => console.error('Index error:', err));
+    return () => {
+      cancelled = true;
+    };
+  }, [indexUrl]);
+
+  if (!index || !index.duration_ms) return null;
+
+  const seek = (ms) => {
+    if (videoRef.current) videoRef.current.currentTime = ms / 1000;
+  };
+
+  const timeAt = (event) => {
+    const rect = barRef.current.getBoundingClientRect();
+    const ratio = Math.min(Math.max((event.clientX - rect.left) / rect.width, 0), 1);
+    return { ratio, ms: ratio * index.duration_ms };
+  };
+
+  const { thumbnails } = index;
+  let preview = null;
+  if (hover && thumbnails.sheets.length) {
+    const i = thumbnailAt(thumbnails, hover.ms);
+    const cell = i % thumbnails.per_sheet;
+    preview = {
+      backgroundImage: `url(${API_BASE_URL}${thumbnails.sheets[Math.floor(i / thumbnails.per_sheet)]})`,
+      backgroundPosition: `-${(cell % thumbnails.columns) * thumbnails.width}px -${Math.floor(cell / thumbnails.columns) * thumbnails.height}px`,
+      width: thumbnails.width,
+      height: thumbnails.height,
+      left: `calc(${hover.ratio * 100}% - ${thumbnails.width / 2}px)`,
+    };
+  }
+
+  return (
+    <div className="p-3 border-t border-gray-700 space-y-3">
+      <div
+        ref={barRef}
+        className="relative h-3 bg-gray-700 rounded cursor-pointer"
+        onMouseMove={(event) => setHover(timeAt(event))}
+        onMouseLeave={() => setHover(null)}
+        onClick={(event) => seek(timeAt(event).ms)}
+      >
+        {Object.entries(index.tracks).map(([trackId, track]) => (
+          <div
+            key={trackId}
+            className="absolute top-0 h-full bg-blue-500/40"
+            style={{
+              left: `${(track.first_ms / index.duration_ms) * 100}%`,
+              width: `${Math.max(((track.last_ms - track.first_ms) / index.duration_ms) * 100, 0.5)}%`,
+            }}
+          />
+        ))}
+        {preview && (
+          <div className="absolute bottom-5 pointer-events-none">
+            <div className="absolute border border-gray-500 rounded shadow-lg" style={preview} />
+          </div>
+        )}
+        {hover && (
+          <span className="absolute -top-5 text-xs text-gray-300" style={{ left: `${hover.ratio * 100}%` }}>
+            {formatTime(hover.ms)}
+          </span>
+        )}
+      </div>
+
+      <div className="flex flex-wrap gap-2">
+        {Object.entries(index.tracks).map(([trackId, track]) => (
+          <button
+            key={trackId}
+            onClick={() => seek(track.first_ms)}
+            className="bg-gray-700 hover:bg-gray-600 text-gray-200 px-3 py-1 rounded text-xs flex items-center gap-1 transition"
+            title={`Visible hasta ${formatTime(track.last_ms)}`}
+          >
+            <User className="w-3 h-3" />
+            {track.name} · {formatTime(track.first_ms)}
+          </button>
+        ))}
+      </div>
+    </div>
+  );
+};
+
+export default VideoTimeline;
@@ -1,6 +1,9 @@
-import React, { useState } from 'react';
-import { Upload, FileVideo, CheckCircle, AlertCircle, Loader, User, Clock, AlertTriangle } from 'lucide-react';
-import { API_V1_URL } from '../config/api';
+import React, { useEffect, useRef, useState } from 'react';
+import { Upload, FileVideo, CheckCircle, AlertCircle, Loader, User, Clock, AlertTriangle, Download } from 'lucide-react';
+import { API_BASE_URL, API_V1_URL } from '../config/api';
+import DetectionOverlay from './DetectionOverlay';
+import HlsPlayer from './HlsPlayer';
+import VideoTimeline from './VideoTimeline';
 
 const VideoUpload = () => {
   const [selectedFile, setSelectedFile] = useState(null);
@@ -8,6 +11,10 @@ const VideoUpload = () => {
   const [analysis, setAnalysis] = useState(null);
   const [videoId, setVideoId] = useState(null);
   const [error, setError] = useState(null);
+  const [exporting, setExporting] = useState(false);
+  const [outputMode, setOutputMode] = useState('');
+  const [progress, setProgress] = useState(null);
+  const playerRef = useRef(null);
 
   const handleFileSelect = (event) => {
     const file = event.target.files[0];
@@ -30,9 +37,10 @@ const VideoUpload = () => {
 
     const formData = new FormData();
     formData.append('file', selectedFile);
+    const query = outputMode ? `?mode=${outputMode}` : '';
 
     try {
-      const response = await fetch(`${API_V1_URL}/video/upload`, {
+      const response = await fetch(`${API_V1_URL}/video/upload${query}`, {
         method: 'POST',
         body: formData,
       });
@@ -54,6 +62,47 @@ const VideoUpload = () => {
     }
   };
 
+  // HLS mode: the response arrives before the analysis; poll until it finishes
+  useEffect(() => {
+    if (analysis?.status !== 'processing') return undefined;
+    const timer = setInterval(async () => {
+      try {
+        const response = await fetch(`${API_BASE_URL}${analysis.status_url}`);
+        const job = await response.json();
+        if (!response.ok) throw new Error(job.detail || 'Error consultando análisis');
+        setProgress(job.total_frames ? Math.round((100 * job.frames) / job.total_frames) : 0);
+        if (job.state === 'done') {
+          setAnalysis((current) => ({ ...current, ...job.analysis, status: 'success' }));
+        } else if (job.state === 'error') {
+          throw new Error(job.error);
+        }
+      } catch (err) {
+        setError(err.message);
+        setAnalysis((current) => ({ ...current, status: 'error' }));
+      }
+    }, 2000);
+    return () => clearInterval(timer);
+  }, [analysis?.status, analysis?.status_url]);
+
+  // Burn the boxes into an MP4 on demand (from the sidecar, no re-detection)
+  const handleExport = async () => {
+    setExporting(true);
+    setError(null);
+    try {
+      const response = await fetch(`${API_V1_URL}/video/export/${videoId}`, { method: 'POST' });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.detail || 'Error al exportar video');
+      }
+      window.open(`${API_BASE_URL}${data.video_url}`, '_blank');
+    } catch (err) {
+      setError(err.message);
+      console.error('Export error:', err);
+    } finally {
+      setExporting(false);
+    }
+  };
+
   const getRiskColor = (risk_level) => {
     switch (risk_level?.toLowerCase()) {
       case 'crítico':
@@ -122,6 +171,16 @@ const VideoUpload = () => {
                 <p className="text-xs text-gray-500 mb-4">
                   Tamaño: {(selectedFile.size / 1024 / 1024).toFixed(2)} MB
                 </p>
+                <select
+                  value={outputMode}
+                  onChange={(event) => setOutputMode(event.target.value)}
+                  className="mb-4 bg-gray-800 border border-gray-600 text-gray-300 text-sm rounded-lg px-3 py-2"
+                >
+                  <option value="">Salida por defecto</option>
+                  <option value="sidecar">Cajas sobre el video original</option>
+                  <option value="hls">Segmentos (ver mientras se analiza)</option>
+                  <option value="video">Video anotado</option>
+                </select>
                 <button
                   onClick={handleUpload}
                   disabled={uploading}
@@ -166,12 +225,49 @@ const VideoUpload = () => {
           {/* Video Player */}
           <div className="bg-gray-800 rounded-lg border border-gray-700 overflow-hidden">
             <div className="aspect-video bg-black flex items-center justify-center">
-              <video
-                controls
-                className="w-full h-full"
-                src={`${API_V1_URL}/video/video/${videoId}`}
-              />
+              {analysis.mode === 'hls' ? (
+                <HlsPlayer
+                  className="w-full h-full"
+                  playlistUrl={`${API_BASE_URL}${analysis.playlist_url}`}
+                  videoRef={playerRef}
+                />
+              ) : analysis.sidecar_url && analysis.mode === 'sidecar' ? (
+                <DetectionOverlay
+                  className="w-full h-full"
+                  src={`${API_V1_URL}/video/video/${videoId}`}
+                  sidecarUrl={`${API_BASE_URL}${analysis.sidecar_url}`}
+                  videoRef={playerRef}
+                />
+              ) : (
+                <video
+                  ref={playerRef}
+                  controls
+                  className="w-full h-full"
+                  src={`${API_V1_URL}/video/video/${videoId}`}
+                />
+              )}
             </div>
+            {analysis.index_url && analysis.status !== 'processing' && (
+              <VideoTimeline indexUrl={`${API_BASE_URL}${analysis.index_url}`} videoRef={playerRef} />
+            )}
+            {analysis.status === 'processing' && (
+              <div className="p-3 border-t border-gray-700 flex items-center gap-2 text-sm text-gray-300">
+                <Loader className="w-4 h-4 animate-spin" />
+                Analizando... {progress ?? 0}% (los segmentos analizados ya se pueden reproducir)
+              </div>
+            )}
+            {analysis.mode === 'sidecar' && (
+              <div className="p-3 border-t border-gray-700 flex justify-end">
+                <button
+                  onClick={handleExport}
+                  disabled={exporting}
+                  className="bg-gray-700 hover:bg-gray-600 disabled:opacity-50 text-white px-4 py-2 rounded-lg text-sm font-semibold transition flex items-center gap-2"
+                >
+                  {exporting ? <Loader className="w-4 h-4 animate-spin" /> : <Download className="w-4 h-4" />}
+                  Exportar video anotado
+                </button>
+              </div>
+            )}
           </div>
 
           {/* Video Info and Summary */}
@@ -277,6 +373,7 @@ const VideoUpload = () => {
           <button
             onClick={() => {
               setAnalysis(null);
+              setProgress(null);
               setVideoId(null);
               setSelectedFile(null);
             }}
@@ -10,3 +10,6 @@ export { default as CameraGrid } from './CameraGrid';
 export { default as SystemSettings } from './SystemSettings';
 export { default as UserManagement } from './UserManagement';
 export { default as VideoUpload } from './VideoUpload';
+export { default as DetectionOverlay } from './DetectionOverlay';
+export { default as HlsPlayer } from './HlsPlayer';
+export { default as VideoTimeline } from './VideoTimeline';
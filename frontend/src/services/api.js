@@ -31,9 +31,11 @@ export const reportIncident = (cameraId, incidentType, riskLevel, description) =
     description: description,
   });
 
-export const getIncidents = (cameraId, riskLevel, limit = 50, offset = 0) =>
+// Keyset pagination: pass the next_cursor of the previous response (null on
+// the last page) to get the following page.
+export const getIncidents = (cameraId, severity, limit = 50, cursor = null) =>
   api.get('/incidents', {
-    params: { camera_id: cameraId, risk_level: riskLevel, limit, offset },
+    params: { camera_id: cameraId, severity, limit, cursor: cursor || undefined },
   });
 
 export const getIncident = (incidentId) => api.get(`/incidents/${incidentId}`);
@@ -57,4 +59,21 @@ export const getRiskPatterns = (storeId, days = 30) =>
 export const getOperationalSuggestions = (storeId) =>
   api.get('/analytics/operational-suggestions', { params: { store_id: storeId } });
 
+// Live events (Server-Sent Events). EventSource reconnects and resumes
+// from Last-Event-ID automatically.
+export const subscribeToEvents = ({ cameraId, storeId, onIncident, onAlert } = {}) => {
+  const params = new URLSearchParams();
+  if (cameraId) params.append('camera_id', cameraId);
+  if (storeId) params.append('store_id', storeId);
+
+  const source = new EventSource(`${API_BASE_URL}/events/stream?${params.toString()}`);
+  if (onIncident) {
+    source.addEventListener('incident', (event) => onIncident(JSON.parse(event.data)));
+  }
+  if (onAlert) {
+    source.addEventListener('alert', (event) => onAlert(JSON.parse(event.data)));
+  }
+  return source;
+};
+
 export default api;
@@ -0,0 +1,209 @@
+"""YOLOv8 INT8 Post-Training Quantization for CPU inference (ONNX Runtime / OpenVINO)"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import cv2
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from ultralytics import YOLO
+
+# El preprocesado de calibración debe ser idéntico al del backend en producción
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.inference_backends import exported_model_path, letterbox, to_input_tensor  # noqa: E402
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def sample_frames(sources, count: int = 300, seed: int = 0):
+    """
+    Sample frames uniformly from stored videos and images
+
+    Args:
+        sources: Files or directories (e.g. backend/uploads/videos)
+        count: Number of frames to return
+        seed: RNG seed
+
+    Returns:
+        List of BGR frames
+    """
+    files = []
+    for source in map(Path, sources):
+        candidates = sorted(source.rglob("*")) if source.is_dir() else [source]
+        files.extend(f for f in candidates if f.suffix.lower() in VIDEO_EXTENSIONS | IMAGE_EXTENSIONS)
+    if not files:
+        raise FileNotFoundError(f"No se encontraron videos ni imágenes en {sources}")
+
+    rng = random.Random(seed)
+    per_file = max(count // len(files), 1)
+    frames = []
+    for path in files:
+        if path.suffix.lower() in IMAGE_EXTENSIONS:
+            image = cv2.imread(str(path))
+            if image is not None:
+                frames.append(image)
+            continue
+
+        cap = cv2.VideoCapture(str(path))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for index in sorted(rng.sample(range(total), min(per_file, total))):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        cap.release()
+
+    rng.shuffle(frames)
+    return frames[:count]
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """Feeds letterboxed frames to the ONNX Runtime calibrator one at a time"""
+
+    def __init__(self, frames, input_name: str, image_size: int = 640):
+        self.input_name = input_name
+        self.image_size = image_size
+        self._frames = iter(frames)
+
+    def get_next(self):
+        frame = next(self._frames, None)
+        if frame is None:
+            return None
+        padded, _, _ = letterbox(frame, self.image_size)
+        return {self.input_name: to_input_tensor([padded])}
+
+
+def head_nodes(onnx_path: Path):
+    """
+    Decode nodes of the detection head (DFL, box math, concat, sigmoid)
+
+    They turn raw logits into pixel coordinates and scores; keeping them in
+    FP32 avoids most of the box-regression accuracy loss of INT8.
+    """
+    import onnx
+
+    graph = onnx.load(str(onnx_path)).graph
+    head = max(
+        (node.name.split("/")[1] for node in graph.node if node.name.startswith("/model.")),
+        key=lambda name: int(name.split(".")[1])
+    )
+    return [
+        node.name for node in graph.node
+        if node.name.startswith(f"/{head}/") and node.op_type != "Conv"
+    ]
+
+
+def quantize_yolov8(
+    weights: str,
+    calibration_sources,
+    calibration_frames: int = 300,
+    image_size: int = 640,
+    method: str = "minmax",
+    per_channel: bool = True
+) -> Path:
+    """
+    Produce <weights>.int8.onnx calibrated on stored frames
+
+    Args:
+        weights: YOLOv8 weights (exported to ONNX once if needed)
+        calibration_sources: Videos/images/directories to sample frames from
+        calibration_frames: Frames used for calibration
+        image_size: Model input size
+        method: Calibration method (minmax, entropy, percentile)
+        per_channel: Per-channel weight quantization
+
+    Returns:
+        Path of the INT8 model
+    """
+    import onnx
+
+    fp32_path = exported_model_path(weights, "onnx", image_size)
+    int8_path = fp32_path.with_suffix(".int8.onnx")
+    input_name = onnx.load(str(fp32_path)).graph.input[0].name
+
+    frames = sample_frames(calibration_sources, calibration_frames)
+    print(f"Calibrando con {len(frames)} frames...")
+
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        FrameCalibrationReader(frames, input_name, image_size),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel,
+        calibrate_method={
+            "minmax": CalibrationMethod.MinMax,
+            "entropy": CalibrationMethod.Entropy,
+            "percentile": CalibrationMethod.Percentile,
+        }[method],
+        nodes_to_exclude=head_nodes(fp32_path),
+    )
+    return int8_path
+
+
+def evaluate_quantization(fp32_path: Path, int8_path: Path, data_path: str, image_size: int = 640) -> dict:
+    """
+    Compare mAP and CPU latency of the FP32 and INT8 models on a held-out set
+
+    Args:
+        fp32_path: FP32 ONNX model
+        int8_path: INT8 ONNX model
+        data_path: Dataset YAML whose 'val' split is the held-out set
+        image_size: Model input size
+
+    Returns:
+        Report dict (also written next to the INT8 model as .json)
+    """
+    report = {"data": str(data_path), "image_size": image_size, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    for name, path in (("fp32", fp32_path), ("int8", int8_path)):
+        metrics = YOLO(str(path), task="detect").val(
+            data=data_path, imgsz=image_size, batch=1, device="cpu", plots=False, verbose=False
+        )
+        report[name] = {
+            "model": str(path),
+            "size_mb": round(path.stat().st_size / 1e6, 2),
+            "map50": round(float(metrics.box.map50), 4),
+            "map50_95": round(float(metrics.box.map), 4),
+            "inference_ms": round(float(metrics.speed["inference"]), 2),
+        }
+
+    report["map50_drop"] = round(report["fp32"]["map50"] - report["int8"]["map50"], 4)
+    report["speedup"] = round(report["fp32"]["inference_ms"] / max(report["int8"]["inference_ms"], 1e-6), 2)
+
+    report_path = int8_path.with_suffix(".json")
+    report_path.write_text(json.dumps(report, indent=2))
+    print(f"Reporte guardado en {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    # Ejemplo:
+    #   python ml_models/training/quantize.py --weights yolov8m.pt \
+    #       --frames backend/uploads/videos --data path/to/holdout.yaml
+    # Después: INFERENCE_BACKEND=onnxruntime INFERENCE_PRECISION=int8
+    parser = argparse.ArgumentParser(description="INT8 post-training quantization for YOLOv8")
+    parser.add_argument("--weights", default="yolov8m.pt")
+    parser.add_argument("--frames", nargs="+", default=[str(BACKEND_DIR / "uploads" / "videos")],
+                        help="Videos/imágenes almacenados para calibración")
+    parser.add_argument("--data", required=True, help="YAML del conjunto de validación reservado")
+    parser.add_argument("--calibration-frames", type=int, default=300)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--method", choices=["minmax", "entropy", "percentile"], default="minmax")
+    args = parser.parse_args()
+
+    int8_model = quantize_yolov8(args.weights, args.frames, args.calibration_frames, args.imgsz, args.method)
+    fp32_model = exported_model_path(args.weights, "onnx", args.imgsz)
+    print(json.dumps(evaluate_quantization(fp32_model, int8_model, args.data, args.imgsz), indent=2))